@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+账号轮换
+accounts.txt 里的账号多于能同时运行的游戏窗口时，
+固定数量的窗口槽位轮流跑所有账号：一批账号全部完成后退出登录，
+下一批账号通过现有的登录 FSM 登入，整天保持满载
+"""
+
+import os
+import time
+from datetime import datetime
+
+from app.logger import get_logger
+
+log = get_logger()
+
+
+def load_accounts(cfg_mgr):
+    """读取 accounts.txt：每行 "用户名,密码"，返回 [{"username", "password"}]"""
+    accounts = []
+    path = cfg_mgr.get_path('accounts')
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if "," in line:
+                    u, p = line.strip().split(",", 1)
+                    accounts.append({"username": u, "password": p})
+    return accounts
+
+
+def account_name(acc):
+    return acc.get("username") or acc.get("user") or ""
+
+
+class AccountRotation:
+    """账号队列 + 窗口槽位
+
+    同一房间内的窗口共用一份对局进度，所以按批次轮换：
+    所有窗口都领奖完成（FINISHED）后整批退出，按槽位顺序换上队列中的下一批账号
+    """
+
+    def __init__(self, config_manager, store):
+        """
+        Args:
+            config_manager: ConfigManager 实例
+            store: StateStore 实例（account_runs 表记录每个账号的运行情况）
+        """
+        self.cfg = config_manager
+        self.store = store
+
+        rot_cfg = self.cfg.get_config("account_rotation", {}) or {}
+        self.enabled = rot_cfg.get("enabled", False)
+        self.pool_size = int(rot_cfg.get("pool_size", 0))   # 0 表示窗口数 = 账号数
+        self.logout_sequence = rot_cfg.get("logout_sequence", [])
+        self.login_wait = rot_cfg.get("login_wait", 5.0)
+
+        self._runs = {}  # {hwnd: (run_id, username)}
+
+    @staticmethod
+    def today():
+        return datetime.now().strftime("%Y-%m-%d")
+
+    # ------------------ 队列 ------------------
+
+    def pending_accounts(self, exclude=()):
+        """今天还没完成、且不在 exclude 中的账号（保持 accounts.txt 顺序）"""
+        done = self.store.finished_accounts(self.today())
+        exclude = set(exclude)
+        return [a for a in load_accounts(self.cfg)
+                if a["username"] not in done and a["username"] not in exclude]
+
+    def launch_accounts(self, accounts):
+        """启动器使用的账号列表：启用轮换时只启动 pool_size 个窗口（优先今天未完成的账号）"""
+        if not self.enabled or self.pool_size <= 0:
+            return accounts
+        pending = self.pending_accounts()
+        return (pending or accounts)[:self.pool_size]
+
+    # ------------------ 运行记录 ------------------
+
+    def bind(self, windows):
+        """控制器启动时登记各槽位当前的账号"""
+        for idx, hwnd, acc in windows:
+            self._start_run(idx, hwnd, acc)
+
+    def _start_run(self, slot, hwnd, acc):
+        try:
+            run_id = self.store.start_account_run(self.today(), account_name(acc), slot, hwnd)
+            self._runs[hwnd] = (run_id, account_name(acc))
+        except Exception as e:
+            log.error(0, "[账号轮换] 写入记录失败: %s", e)
+
+    def finish_all(self):
+        """当前批次全部完成"""
+        now = time.time()
+        for run_id, _ in self._runs.values():
+            try:
+                self.store.finish_account_run(run_id, now)
+            except Exception as e:
+                log.error(0, "[账号轮换] 写入记录失败: %s", e)
+        self._runs.clear()
+
+    def next_batch(self, windows):
+        """
+        结束当前批次，并为每个槽位分配下一个账号
+
+        Args:
+            windows: [(index, hwnd, account)] 当前窗口池
+
+        Returns:
+            [(index, hwnd, account)] 换上新账号的窗口，队列为空时返回 []
+            （账号不足时只返回前几个槽位，其余窗口退出轮换）
+        """
+        self.finish_all()
+        queue = self.pending_accounts()
+        batch = []
+        for (idx, hwnd, _), acc in zip(windows, queue):
+            batch.append((idx, hwnd, acc))
+            self._start_run(idx, hwnd, acc)
+        return batch
+
+    # ------------------ 报告 ------------------
+
+    def daily_report(self, date=None):
+        """单机当天的账号吞吐：完成数 / 总数 / 每小时完成账号数"""
+        date = date or self.today()
+        runs = self.store.account_runs(date)
+        finished = [r for r in runs if r["finished_at"]]
+        done = {r["username"] for r in finished}
+        hours = None
+        if finished:
+            hours = (max(r["finished_at"] for r in finished) - min(r["started_at"] for r in runs)) / 3600.0
+        return {
+            "date": date,
+            "accounts_done": len(done),
+            "accounts_total": len(load_accounts(self.cfg)),
+            "hours": hours,
+            "per_hour": len(done) / hours if hours else None,
+        }
+
+    def format_daily_report(self, date=None):
+        r = self.daily_report(date)
+        per_hour = f"{r['per_hour']:.1f}" if r["per_hour"] else "--"
+        hours = f"{r['hours']:.1f}h" if r["hours"] else "--"
+        return f"[账号轮换] {r['date']} 已完成 {r['accounts_done']}/{r['accounts_total']} 个账号 | 用时 {hours} | 每小时 {per_hour} 个"
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+声明式检测计划
+每个 FSM 状态只检测"从该状态出发可能出现的画面"，
+转移表在启动时编译为逐状态的匹配计划，避免每帧把所有模板都跑一遍
+"""
+
+import os
+
+from app.core.fingerprint import load_fingerprints
+from app.core.metrics import get_metrics
+from app.logger import get_logger
+
+log = get_logger()
+metrics = get_metrics()
+
+
+class WindowState:
+    UNKNOWN  = "UNKNOWN"
+    LOGIN    = "LOGIN"
+    LOBBY    = "LOBBY"
+    ROOM     = "ROOM"
+    INGAME = "INGAME"
+    CLAIMING = "CLAIMING"
+    FINISHED = "FINISHED"
+
+
+# 探针定义：一个探针对应一组模板，任意一张命中即视为命中
+#   img_key: config.json 中直接存放图片名的键
+#   sources: 从这些配置段里收集每一步的 check_img（使用各步自己的 match_threshold）
+#   roi:     可选，rois 中的名字或 [x1, y1, x2, y2]
+PROBES = {
+    "room": {"img_key": "room_management_img", "threshold": 0.8},
+    "lobby": {"img_key": "lobby_entry_img", "threshold": 0.75},
+    "login_ui": {"sources": ["pre_login", "login_sequence"], "threshold": 0.7},
+}
+
+# 状态转移表：当前状态 -> [(探针, 命中后意味着的下一状态)]
+# 按顺序短路匹配；未列出的画面在该状态下不会被检测
+#   INGAME 只关心是否回到房间/大厅；LOBBY 绝不会去跑登录序列模板
+#   CLAIMING/FINISHED 由领奖流程自己管理，不做视觉推导
+TRANSITION_TABLE = {
+    WindowState.UNKNOWN:  [("room", WindowState.ROOM), ("lobby", WindowState.LOBBY), ("login_ui", WindowState.LOGIN)],
+    WindowState.LOGIN:    [("lobby", WindowState.LOBBY), ("login_ui", WindowState.LOGIN)],
+    WindowState.LOBBY:    [("room", WindowState.ROOM), ("lobby", WindowState.LOBBY)],
+    WindowState.ROOM:     [("room", WindowState.ROOM), ("lobby", WindowState.LOBBY)],
+    WindowState.INGAME:   [("room", WindowState.ROOM), ("lobby", WindowState.LOBBY)],
+    WindowState.CLAIMING: [],
+    WindowState.FINISHED: [],
+}
+
+
+class CompiledProbe:
+    """编译后的探针：已解析好路径、阈值和 ROI 的模板列表"""
+
+    __slots__ = ("name", "templates", "next_state", "fingerprint")
+
+    def __init__(self, name, templates, next_state=None, fingerprint=None):
+        self.name = name
+        self.templates = templates  # [(img_path, threshold, roi), ...]
+        self.next_state = next_state
+        self.fingerprint = fingerprint  # 同名像素指纹，命中即视为探针命中，不再跑模板
+
+    def __repr__(self):
+        return f"<Probe {self.name} -> {self.next_state} ({len(self.templates)} 模板)>"
+
+
+class DetectionPlan:
+    """把转移表编译为逐状态的匹配计划
+
+    config.json 中可选的 "detection_plan" 段可覆盖默认定义：
+        {"probes": {...}, "transitions": {"LOBBY": [["room", "ROOM"], ...]}}
+    """
+
+    def __init__(self, cfg_mgr, engine):
+        self.cfg_mgr = cfg_mgr
+        self.engine = engine
+
+        override = self.cfg_mgr.get_config("detection_plan", {}) or {}
+        probe_specs = dict(PROBES)
+        probe_specs.update(override.get("probes", {}))
+        transitions = dict(TRANSITION_TABLE)
+        for state, entries in override.get("transitions", {}).items():
+            transitions[state] = [tuple(e) for e in entries]
+
+        # 1. 每个探针只解析一次；config.json 的 fingerprints 段里有同名指纹时作为第一道检测
+        fingerprints = load_fingerprints(cfg_mgr)
+        self.probes = {name: CompiledProbe(name, self._resolve_templates(spec), None, fingerprints.get(name))
+                       for name, spec in probe_specs.items()}
+
+        # 2. 按状态展开为匹配计划，丢弃没有任何可用模板的探针
+        self.plans = {}
+        for state, entries in transitions.items():
+            plan = []
+            for probe_name, next_state in entries:
+                probe = self.probes.get(probe_name)
+                if probe is None or not probe.templates:
+                    log.warn(0, "[检测计划] 状态 %s 的探针 %s 无可用模板，已忽略", state, probe_name)
+                    continue
+                plan.append(CompiledProbe(probe_name, probe.templates, next_state, probe.fingerprint))
+            self.plans[state] = plan
+
+        summary = ", ".join(f"{s}:{len(p)}" for s, p in self.plans.items())
+        log.info(0, "[检测计划] 编译完成 | %s", summary)
+        if fingerprints:
+            used = [n for n, p in self.probes.items() if p.fingerprint]
+            log.info(0, "[检测计划] 像素指纹: %s", ", ".join(used) or "无匹配的探针")
+
+    def _resolve_roi(self, roi):
+        if isinstance(roi, str):
+            return self.cfg_mgr.get_config("rois", {}).get(roi)
+        return roi
+
+    def _resolve_templates(self, spec):
+        """把探针定义解析为 [(img_path, threshold, roi)]，启动时检查文件是否存在"""
+        default_thr = spec.get("threshold", 0.75)
+        roi = self._resolve_roi(spec.get("roi"))
+
+        candidates = []
+        if spec.get("img_key"):
+            candidates.append((self.cfg_mgr.get_config(spec["img_key"]), default_thr))
+        if spec.get("img"):
+            candidates.append((spec["img"], default_thr))
+        for section in spec.get("sources", []):
+            steps = self.cfg_mgr.get_config(section, {}) or {}
+            if isinstance(steps, dict):
+                steps = steps.values()
+            for step in steps:
+                if isinstance(step, dict) and step.get("check_img"):
+                    candidates.append((step["check_img"], step.get("match_threshold", default_thr)))
+
+        templates = []
+        for img_name, threshold in candidates:
+            path = self.cfg_mgr.get_template_path(img_name)
+            if path and os.path.exists(path):
+                templates.append((path, threshold, roi))
+        return templates
+
+    def probes_for(self, state):
+        """获取某状态下需要执行的探针列表"""
+        return self.plans.get(state, [])
+
+    def find(self, state, probe_name):
+        """按探针名取某状态计划中的探针（分片子进程只回传探针名）"""
+        for probe in self.probes_for(state):
+            if probe.name == probe_name:
+                return probe
+        return None
+
+    def _fingerprint_hit(self, hwnd, probe, screen):
+        if probe.fingerprint is None or screen is None:
+            return False
+        if self.engine.probe(hwnd, probe.fingerprint, screen):
+            metrics.inc("fingerprint_hit", probe.name)
+            return True
+        return False
+
+    def _hit(self, hwnd, probe, screen=None):
+        """指纹和模板共用同一帧（未传入时取一帧），帧拷贝 / 截图次数与模板数量无关"""
+        if screen is None:
+            screen = self.engine.current_frame(hwnd)
+        if self._fingerprint_hit(hwnd, probe, screen):
+            return True
+        return any(self.engine.match_in_frame(screen, path, threshold, roi)[0]
+                   for path, threshold, roi in probe.templates)
+
+    def match_probe(self, hwnd, probe_name):
+        """单独执行某个探针（不依赖状态）"""
+        probe = self.probes.get(probe_name)
+        return bool(probe and self._hit(hwnd, probe))
+
+    def detect_many(self, pairs):
+        """
+        批量版 detect：每个窗口只取一次画面，同状态的窗口对同一模板用 mosaic 一次匹配
+        结果与逐窗口 detect 相同（按计划顺序第一个命中的探针）
+
+        Args:
+            pairs: [(hwnd, state), ...]
+        Returns:
+            {hwnd: 命中的探针或 None}
+        """
+        frames = {hwnd: self.engine.current_frame(hwnd) for hwnd, _ in pairs}
+        hits = {hwnd: None for hwnd, _ in pairs}
+        by_state = {}
+        for hwnd, state in pairs:
+            by_state.setdefault(state, []).append(hwnd)
+
+        for state, remaining in by_state.items():
+            for probe in self.probes_for(state):
+                for hwnd in remaining:
+                    if self._fingerprint_hit(hwnd, probe, frames[hwnd]):
+                        hits[hwnd] = probe
+                remaining = [hwnd for hwnd in remaining if hits[hwnd] is None]
+                for path, threshold, roi in probe.templates:
+                    if not remaining:
+                        break
+                    results = self.engine.match_batch(remaining, path, threshold, roi, frames)
+                    for hwnd in remaining:
+                        if results[hwnd][0]:
+                            hits[hwnd] = probe
+                    remaining = [hwnd for hwnd in remaining if hits[hwnd] is None]
+        return hits
+
+    def detect(self, hwnd, state):
+        """按状态的匹配计划检测，返回第一个命中的探针，全部未命中返回 None（所有探针共用一帧）"""
+        probes = self.probes_for(state)
+        if not probes:
+            return None
+        screen = self.engine.current_frame(hwnd)
+        if screen is None:
+            return None
+        for probe in probes:
+            if self._hit(hwnd, probe, screen):
+                return probe
+        return None
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+房主识别缓存
+房主很少变化：平时只在学到的"开始"按钮位置附近做小 ROI 确认，
+只有在失效事件（房间重置、房主离开房间、Session 变化、点击开始失败）后才全量扫描
+"""
+
+from app.logger import get_logger
+
+log = get_logger()
+
+
+class HostTracker:
+    """缓存房主窗口与开始按钮位置"""
+
+    def __init__(self, room_mod, margin=40):
+        """
+        Args:
+            room_mod: RoomModule 实例（提供开始按钮定位）
+            margin: 小 ROI 在按钮四周额外保留的像素
+        """
+        self.room_mod = room_mod
+        self.margin = margin
+        self.host = None
+        self.button_center = None
+        self.sid = None
+        self._dirty = True
+
+    def invalidate(self, reason=""):
+        """标记缓存失效，下次 resolve 时全量扫描"""
+        if not self._dirty and reason:
+            log.info(0, "[房主识别] 缓存失效：%s", reason)
+        self._dirty = True
+
+    def button_roi(self):
+        """以学到的开始按钮中心为基准的小 ROI，未学到时返回 None"""
+        if not self.button_center:
+            return None
+        tw, th = self.room_mod.start_button_size()
+        if not tw:
+            return None
+        cx, cy = self.button_center
+        half_w, half_h = tw // 2 + self.margin, th // 2 + self.margin
+        return [max(0, cx - half_w), max(0, cy - half_h), cx + half_w, cy + half_h]
+
+    def resolve(self, candidates, sid=None):
+        """
+        返回当前房主窗口，找不到时返回 None
+
+        Args:
+            candidates: 处于房间状态的窗口句柄列表
+            sid: 当前 Session 的房间号，变化时视为失效
+        """
+        if sid != self.sid:
+            self.invalidate(f"Session 变化 {self.sid} -> {sid}")
+            self.sid = sid
+
+        # 1. 快速路径：缓存有效时只在小 ROI 内确认
+        if self.host and not self._dirty:
+            if self.host not in candidates:
+                self.invalidate("房主离开房间")
+            else:
+                found, center = self.room_mod.locate_start_button(self.host, self.button_roi())
+                if found:
+                    self.button_center = center
+                    return self.host
+                self.invalidate("开始按钮位置确认失败")
+
+        # 2. 失效后全量扫描（所有候选窗口一次批量匹配，上一任房主优先）
+        ordered = sorted(candidates, key=lambda h: h != self.host)
+        located = self.room_mod.locate_start_buttons(ordered)
+        for hwnd in ordered:
+            found, center = located[hwnd]
+            if found:
+                self.host = hwnd
+                self.button_center = center
+                self._dirty = False
+                return hwnd
+        return None
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+对局记录器
+跟踪每一局在各阶段花费的时间（等待准备 / 比赛 / 回房同步 / 切换模式），
+起跑和全部回房时写入状态库的 games 表
+"""
+
+import time
+
+from app.logger import get_logger
+
+log = get_logger()
+
+
+class RunRecorder:
+    """一局的时间线：
+
+        可开局 --ready_wait--> 点击开始 --(比赛)--> 首个窗口回房 --sync_wait--> 全部回房
+                   ↑ 期间的模式切换耗时单独累计为 switch_sec
+    """
+
+    def __init__(self, store, progress):
+        """
+        Args:
+            store: StateStore 实例
+            progress: ProgressService 实例（取日期和当前模式）
+        """
+        self.store = store
+        self.progress = progress
+        self.game_id = None
+        self.waiting_since = None   # 房间进入可开局状态的时间
+        self.switch_sec = 0.0       # 本局开始前累计的模式切换耗时
+        self.first_back_at = None   # 本局第一个窗口回到房间的时间
+
+    def mark_waiting(self, now=None):
+        """房主进入起跑判断（等待成员准备）时调用，只记录第一次"""
+        if self.waiting_since is None:
+            self.waiting_since = now or time.time()
+
+    def add_switch(self, seconds):
+        """累计一次模式切换耗时，切换后重新开始计算等待时间"""
+        self.switch_sec += seconds
+        self.waiting_since = None
+
+    def game_started(self, host_hwnd, windows, now=None):
+        """房主点击开始成功"""
+        now = now or time.time()
+        ready_wait = now - self.waiting_since if self.waiting_since else None
+        try:
+            self.game_id = self.store.start_game(
+                self.progress.state["update_date"], self.progress.current_mode, host_hwnd, windows,
+                started_at=now, ready_wait_sec=ready_wait, switch_sec=self.switch_sec or None)
+        except Exception as e:
+            self.game_id = None
+            log.error(0, "[对局记录] 写入失败: %s", e)
+        self.waiting_since = None
+        self.switch_sec = 0.0
+        self.first_back_at = None
+
+    def window_back(self, now=None):
+        """有窗口从比赛回到房间"""
+        if self.first_back_at is None:
+            self.first_back_at = now or time.time()
+
+    def all_back(self, now=None):
+        """所有窗口都回到房间：结束本局记录，并开始计算下一局的等待时间"""
+        now = now or time.time()
+        if self.game_id is not None:
+            sync_wait = now - self.first_back_at if self.first_back_at else None
+            try:
+                self.store.finish_game(self.game_id, ended_at=now, sync_wait_sec=sync_wait)
+            except Exception as e:
+                log.error(0, "[对局记录] 写入失败: %s", e)
+        self.game_id = None
+        self.first_back_at = None
+        self.waiting_since = now
+
+    def reset(self):
+        """房间重置：丢弃未完成的时间线（已写入的对局保留 ended_at 为空）"""
+        self.game_id = None
+        self.waiting_since = None
+        self.switch_sec = 0.0
+        self.first_back_at = None
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+分片检测进程池
+把窗口按轮询分成若干分片，每个分片一个子进程，子进程里有自己的 GameEngine 和 DetectionPlan，
+只负责"截图 + 按状态跑检测计划"这段 CPU 密集的工作，多核机器上随核数扩展
+
+主进程（TaskController）是协调者：Session、进度、房主、FSM 状态和所有键鼠输入都只在主进程，
+子进程从不操作窗口，输入不需要跨进程仲裁。每个 tick 协调者把到期窗口的 (hwnd, 状态) 一次性发给各分片，
+各分片并行检测后返回命中的探针名
+
+协议（multiprocessing.Pipe，每个分片一条）:
+    <- ("ready", pid, 0)                   子进程初始化完成（之前该分片的窗口走本地检测）
+    -> ("detect", [(hwnd, state), ...])    <- ("ok", {hwnd: 探针名或 None}, 耗时ms)
+    -> ("stop", None)
+    <- ("error", 错误信息, 0)
+
+子进程日志经队列转发到主进程的日志管线；分片无响应或已退出时，该分片的窗口回退到主进程本地检测
+"""
+
+import os
+import time
+import threading
+import traceback
+import multiprocessing as mp
+
+from app.core.metrics import get_metrics
+from app.logger import get_logger
+
+log = get_logger()
+metrics = get_metrics()
+
+
+def _forward_logs(log_queue):
+    """子进程：把本进程日志管线的记录转发到主进程"""
+    def forward(records):
+        for r in records:
+            try:
+                log_queue.put_nowait((r.hwnd, r.level, r.message))
+            except Exception:
+                pass
+    return forward
+
+
+def _shard_main(shard_id, conn, log_queue):
+    """子进程入口（spawn 方式启动，必须是模块级函数）"""
+    from app.core.config_manager import ConfigManager
+    from app.core.game_engine import GameEngine
+    from app.core.frame_bus import FrameBusClient
+    from app.controllers.detection_plan import DetectionPlan
+    from app.logger import get_pipeline
+
+    pipeline = get_pipeline()
+    # 只做检测：不打开状态库，模板只读映射主进程建好的 bundle；模板热重载照常，
+    # 替换的 PNG 在子进程里同样生效（bundle 条目 mtime 不符时回退到解码 PNG）
+    cfg_mgr = ConfigManager(with_state=False)
+    pipeline.configure(level=(cfg_mgr.get_config("logging", {}) or {}).get("level", "INFO"), console=False)
+    pipeline.subscribe(_forward_logs(log_queue))
+
+    engine = GameEngine(cfg_mgr, detection_only=True)
+    bus_cfg = cfg_mgr.get_config("frame_bus", {}) or {}
+    if bus_cfg.get("enabled", False):
+        # 主进程的帧总线生产者在截图，这里只读共享内存
+        GameEngine._frame_bus = FrameBusClient(bus_cfg.get("max_age_ms", 250) / 1000.0)
+    plan = DetectionPlan(cfg_mgr, engine)
+    log.info(0, "[分片%s] 子进程就绪 pid=%s", shard_id, os.getpid())
+    conn.send(("ready", os.getpid(), 0))
+
+    while True:
+        try:
+            cmd, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        if cmd == "stop":
+            break
+        if cmd != "detect":
+            conn.send(("error", f"未知命令: {cmd}", 0))
+            continue
+        t0 = time.perf_counter()
+        try:
+            hits = {}
+            for hwnd, state in payload:
+                probe = plan.detect(hwnd, state)
+                hits[hwnd] = probe.name if probe else None
+            conn.send(("ok", hits, (time.perf_counter() - t0) * 1000.0))
+        except Exception as e:
+            conn.send(("error", f"{e}\n{traceback.format_exc()}", 0))
+    pipeline.flush()
+
+
+class _Shard:
+    __slots__ = ("shard_id", "hwnds", "process", "conn", "alive", "ready")
+
+    def __init__(self, shard_id, hwnds, process, conn):
+        self.shard_id = shard_id
+        self.hwnds = set(hwnds)
+        self.process = process
+        self.conn = conn
+        self.alive = True
+        self.ready = False
+
+
+class ShardPool:
+    """协调者一侧：管理分片子进程，按分片并行下发检测请求"""
+
+    def __init__(self, hwnds, processes=0, timeout=3.0):
+        """
+        Args:
+            hwnds: 全部窗口句柄
+            processes: 子进程数，0 表示按 CPU 核数自动（保留 2 个核给主进程和界面）
+            timeout: 单次检测请求的等待上限（秒），超时的分片标记为失效
+        """
+        if processes <= 0:
+            processes = max((os.cpu_count() or 2) - 2, 1)
+        self.processes = max(min(processes, len(hwnds)), 1)
+        self.timeout = timeout
+        self._assign = [hwnds[i::self.processes] for i in range(self.processes)]
+        self._shards = []
+        self._by_hwnd = {}
+        self._ctx = mp.get_context("spawn")
+        self._log_queue = self._ctx.Queue(10000)
+        self._stop = threading.Event()
+        self._log_thread = None
+
+    def start(self):
+        for shard_id, hwnds in enumerate(self._assign):
+            parent_conn, child_conn = self._ctx.Pipe()
+            proc = self._ctx.Process(target=_shard_main, args=(shard_id, child_conn, self._log_queue),
+                                     name=f"shard-{shard_id}", daemon=True)
+            proc.start()
+            child_conn.close()
+            shard = _Shard(shard_id, hwnds, proc, parent_conn)
+            self._shards.append(shard)
+            for hwnd in hwnds:
+                self._by_hwnd[hwnd] = shard
+        self._log_thread = threading.Thread(target=self._drain_logs, name="shard-logs", daemon=True)
+        self._log_thread.start()
+        log.info(0, "[分片] 已启动 %s 个检测子进程 | 分配: %s", len(self._shards),
+                 " / ".join(str(len(s.hwnds)) for s in self._shards))
+
+    def _drain_logs(self):
+        while not self._stop.is_set():
+            try:
+                hwnd, level, message = self._log_queue.get(timeout=0.5)
+            except Exception:
+                continue
+            log.log(hwnd, level, "%s", message)
+
+    def detect_many(self, pairs):
+        """
+        并行检测 [(hwnd, state)]，返回 {hwnd: 探针名或 None}
+        不在任何存活分片上的窗口不会出现在结果里，由调用方本地检测
+        """
+        batches = {}
+        for hwnd, state in pairs:
+            shard = self._by_hwnd.get(hwnd)
+            if shard is not None and self._usable(shard):
+                batches.setdefault(shard, []).append((hwnd, state))
+
+        sent = []
+        for shard, batch in batches.items():
+            try:
+                shard.conn.send(("detect", batch))
+                sent.append(shard)
+            except (OSError, BrokenPipeError) as e:
+                self._mark_dead(shard, f"发送失败: {e}")
+
+        hits = {}
+        deadline = time.monotonic() + self.timeout
+        for shard in sent:
+            remaining = max(deadline - time.monotonic(), 0)
+            try:
+                if not shard.conn.poll(remaining):
+                    self._mark_dead(shard, f"{self.timeout}s 内无响应")
+                    continue
+                status, result, elapsed_ms = shard.conn.recv()
+            except (EOFError, OSError) as e:
+                self._mark_dead(shard, f"连接断开: {e}")
+                continue
+            if status == "ok":
+                hits.update(result)
+                metrics.observe("shard_detect", str(shard.shard_id), elapsed_ms)
+            else:
+                log.error(0, "[分片%s] 检测异常: %s", shard.shard_id, result)
+        return hits
+
+    def _usable(self, shard):
+        """分片存活且已完成初始化（子进程导入 OpenCV、编译检测计划需要几秒，期间不等待）"""
+        if not shard.alive:
+            return False
+        if not shard.ready:
+            try:
+                if shard.conn.poll(0) and shard.conn.recv()[0] == "ready":
+                    shard.ready = True
+            except (EOFError, OSError) as e:
+                self._mark_dead(shard, f"启动失败: {e}")
+        return shard.ready
+
+    def _mark_dead(self, shard, reason):
+        # 超时后迟到的回复会和下一次请求错位，这个分片不再使用，窗口回退到本地检测
+        shard.alive = False
+        metrics.inc("shard_failure", str(shard.shard_id))
+        log.error(0, "[分片%s] %s，该分片的 %s 个窗口改为本地检测", shard.shard_id, reason, len(shard.hwnds))
+        if shard.process.is_alive():
+            shard.process.terminate()
+
+    def remove(self, hwnd):
+        shard = self._by_hwnd.pop(hwnd, None)
+        if shard is not None:
+            shard.hwnds.discard(hwnd)
+
+    def stop(self):
+        for shard in self._shards:
+            if shard.alive:
+                try:
+                    shard.conn.send(("stop", None))
+                except (OSError, BrokenPipeError):
+                    pass
+        for shard in self._shards:
+            shard.process.join(timeout=3)
+            if shard.process.is_alive():
+                shard.process.terminate()
+            shard.conn.close()
+        self._stop.set()
+        self._shards.clear()
+        self._by_hwnd.clear()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+状态接口
+控制器进程内的本地 HTTP 服务，供外部抓取程序监控多台机器：
+
+    GET /metrics   Prometheus 文本格式
+    GET /status    JSON（窗口状态、Session、进度、最近对局、指标快照）
+    GET /healthz   存活检查
+
+默认只监听 127.0.0.1，在 config.json 的 status_server 段开启
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.core.metrics import BUCKETS_MS
+from app.logger import get_logger
+
+log = get_logger()
+
+PREFIX = "crazykart"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**kv):
+    if not kv:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in kv.items()) + "}"
+
+
+def _metric_name(name):
+    return PREFIX + "_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def to_prometheus(status):
+    """把 /status 的 JSON 转为 Prometheus 文本格式"""
+    out = []
+
+    def gauge(name, help_text, samples):
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            out.append(f"{name}{_labels(**labels)} {value}")
+
+    gauge(f"{PREFIX}_up", "控制器是否在运行", [({}, int(status["running"]))])
+    gauge(f"{PREFIX}_paused", "是否处于暂停状态", [({}, int(not status["active"]))])
+    gauge(f"{PREFIX}_window_state", "窗口当前 FSM 状态（值恒为 1）",
+          [({"index": w["index"], "hwnd": w["hwnd"], "state": w["state"]}, 1) for w in status["windows"]])
+    gauge(f"{PREFIX}_window_state_seconds", "窗口停留在当前状态的时长（按抓取时观察）",
+          [({"index": w["index"], "hwnd": w["hwnd"]}, round(w["state_sec"], 1)) for w in status["windows"]])
+    gauge(f"{PREFIX}_session_active", "是否有有效的房间 Session", [({}, int(bool(status["session"])))])
+
+    progress = status["progress"]
+    gauge(f"{PREFIX}_progress_done", "今日已完成局数",
+          [({"mode": m["id"]}, m["done"]) for m in progress["modes"]])
+    gauge(f"{PREFIX}_progress_target", "今日目标局数",
+          [({"mode": m["id"]}, m["target"]) for m in progress["modes"]])
+    gauge(f"{PREFIX}_games_last_hour", "最近一小时开局数", [({}, status["games_last_hour"])])
+    if status["last_game_at"]:
+        gauge(f"{PREFIX}_last_game_timestamp_seconds", "最近一局的开始时间",
+              [({}, round(status["last_game_at"], 3))])
+
+    metrics = status.get("metrics") or {}
+    for name, labels in sorted(metrics.get("counters", {}).items()):
+        metric = _metric_name(name) + "_total"
+        out.append(f"# TYPE {metric} counter")
+        for label, n in sorted(labels.items()):
+            out.append(f"{metric}{_labels(label=label)} {n}")
+    bounds = [b / 1000.0 for b in metrics.get("buckets_ms", BUCKETS_MS)]
+    for name, labels in sorted(metrics.get("histograms", {}).items()):
+        metric = _metric_name(name) + "_seconds"
+        out.append(f"# TYPE {metric} histogram")
+        for label, h in sorted(labels.items()):
+            cumulative = 0
+            for bound, n in zip(bounds + ["+Inf"], h["buckets"]):
+                cumulative += n
+                out.append(f"{metric}_bucket{_labels(label=label, le=bound)} {cumulative}")
+            out.append(f"{metric}_sum{_labels(label=label)} {h['sum_ms'] / 1000.0}")
+            out.append(f"{metric}_count{_labels(label=label)} {h['count']}")
+    return "\n".join(out) + "\n"
+
+
+class StatusServer:
+    """后台线程运行的 HTTP 服务，每次请求时向控制器取一次快照"""
+
+    def __init__(self, controller, host="127.0.0.1", port=9108):
+        self.controller = controller
+        self.host = host
+        self.port = port
+        self._httpd = None
+        self._seen = {}   # {hwnd: (state, 首次观察到的时间)}
+        self._lock = threading.Lock()
+
+    def status(self):
+        snap = self.controller.status_snapshot()
+        now = time.time()
+        with self._lock:
+            for w in snap["windows"]:
+                state, since = self._seen.get(w["hwnd"], (None, now))
+                if state != w["state"]:
+                    since = now
+                self._seen[w["hwnd"]] = (w["state"], since)
+                w["state_sec"] = now - since
+        return snap
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                try:
+                    if path == "/healthz":
+                        self._send(200, "text/plain; charset=utf-8", "ok\n")
+                    elif path == "/status":
+                        body = json.dumps(server.status(), ensure_ascii=False, default=str)
+                        self._send(200, "application/json; charset=utf-8", body)
+                    elif path == "/metrics":
+                        self._send(200, "text/plain; version=0.0.4; charset=utf-8",
+                                   to_prometheus(server.status()))
+                    else:
+                        self._send(404, "text/plain; charset=utf-8", "not found\n")
+                except Exception as e:
+                    self._send(500, "text/plain; charset=utf-8", f"error: {e}\n")
+
+            def _send(self, code, content_type, body):
+                data = body.encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # 抓取请求不写日志
+
+        try:
+            self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            log.error(0, "[状态接口] 启动失败 %s:%s: %s", self.host, self.port, e)
+            return False
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="status-server", daemon=True).start()
+        log.info(0, "[状态接口] 已启动: http://%s:%s/metrics", self.host, self.port)
+        return True
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
@@ -3,7 +3,6 @@ import time
 import win32con
 import os
 import re
-import json
 import traceback
 import threading
 import win32api
@@ -12,27 +11,46 @@ from app.modules.room_in_module import RoomModule
 from app.modules.module_switcher import ModeSwitcher
 from app.modules.emergency_module import EmergencyModule
 from app.modules.task_module import TaskModule
-
-class WindowState:
-    UNKNOWN  = "UNKNOWN"
-    LOGIN    = "LOGIN"
-    LOBBY    = "LOBBY"
-    ROOM     = "ROOM"
-    INGAME = "INGAME"
-    CLAIMING = "CLAIMING"
-    FINISHED = "FINISHED"
+from app.controllers.detection_plan import WindowState, DetectionPlan
+from app.controllers.host_tracker import HostTracker
+from app.controllers.run_recorder import RunRecorder
+from app.controllers.account_rotation import AccountRotation
+from app.controllers.status_server import StatusServer
+from app.controllers.shard_pool import ShardPool
+from app.core.scheduler import DeadlineScheduler
+from app.core.metrics import configure_metrics
+from app.core.frame_bus import FrameBus
+from app.core.profiler import toggle_profiler
+from app.logger import get_logger
 
 class TaskController:
+    # 调度器中全局上下文刷新任务的 key（窗口任务以 hwnd 为 key）
+    CTX_KEY = "__ctx__"
+
     def __init__(self, combined_hwnd_list, config_manager, engine):
         self.windows = combined_hwnd_list
         self.cfg_mgr = config_manager
         self.engine = engine
+        self.session = config_manager.session_store
+        self.log = get_logger()
+        # 热路径指标（config.json 的 metrics 段开启，关闭时埋点几乎无开销）
+        self.metrics = configure_metrics(config_manager)
         
         # 模块加载
         self.room_mod = RoomModule(config_manager, self.engine)
         self.switcher = ModeSwitcher(config_manager, self.engine)
         self.emergency_mod = EmergencyModule(config_manager, self.engine)
         self.task_mod = TaskModule(config_manager, self.engine)
+        # 逐状态的检测计划（启动时编译一次）
+        self.detection_plan = DetectionPlan(config_manager, self.engine)
+        # 房主识别缓存（小 ROI 确认，失效时才全量扫描）
+        self.host_tracker = HostTracker(self.room_mod)
+        # 对局记录（各阶段耗时写入状态库）
+        self.recorder = RunRecorder(config_manager.state_store, self.switcher.progress)
+        # 账号轮换（窗口数少于账号数时，整批完成后换下一批账号）
+        self.rotation = AccountRotation(config_manager, config_manager.state_store)
+        if self.rotation.enabled:
+            self.rotation.bind(self.windows)
 
         self.running = True
         self.active = True
@@ -41,10 +59,19 @@ class TaskController:
         self.last_log = {}
         self.mode_switching = {hwnd: False for _, hwnd, _ in self.windows}
 
+        # 截止时间调度：每个窗口和全局上下文各有下次到期时间，只检测到期的窗口
+        sched_cfg = self.cfg_mgr.get_config("scheduler", {}) or {}
+        self.tick_interval = sched_cfg.get("tick_interval", 0.1)
+        self.ctx_interval = sched_cfg.get("ctx_interval", 0.1)
+        self.scheduler = DeadlineScheduler()
+        self._global_ctx = None
+
         # 热键
         self.pause_key = self._get_vk_code(self.cfg_mgr.get_config("pause_hotkey", "f9"))
         self.stop_key = self._get_vk_code(self.cfg_mgr.get_config("stop_hotkey", "f10"))
         self.reset_key = self._get_vk_code(self.cfg_mgr.get_config("reset_hotkey", "f8"))
+        self.metrics_key = self._get_vk_code(self.cfg_mgr.get_config("metrics_hotkey", "f7"))
+        self.profile_key = self._get_vk_code(self.cfg_mgr.get_config("profile_hotkey", "f6"))
 
         # 初始化时不重置任务进度，支持继续任务
         self._cleanup_session(reset_progress=False)
@@ -61,35 +88,47 @@ class TaskController:
         # 【新增】记录当前房主，避免重复日志
         self._current_host = None
         
+        # 帧总线：每个窗口一个截图生产者，控制器/紧急监控/窗口监控共用同一份画面
+        self.frame_bus = None
+        bus_cfg = self.cfg_mgr.get_config("frame_bus", {}) or {}
+        if bus_cfg.get("enabled", False):
+            self.frame_bus = FrameBus(self.engine, bus_cfg.get("interval_ms", 100) / 1000.0,
+                                      bus_cfg.get("max_age_ms", 250) / 1000.0)
+            self.frame_bus.start([hwnd for _, hwnd, _ in self.windows])
+            self.engine._frame_bus = self.frame_bus
+
+        # 分片检测：窗口分给多个子进程做截图+检测，FSM/Session/输入仍在本进程
+        self.shards = None
+        shard_cfg = self.cfg_mgr.get_config("sharding", {}) or {}
+        if shard_cfg.get("enabled", False) and len(self.windows) > 1:
+            self.shards = ShardPool([hwnd for _, hwnd, _ in self.windows],
+                                    shard_cfg.get("processes", 0), shard_cfg.get("timeout_ms", 3000) / 1000.0)
+            self.shards.start()
+
+        # 线程池并行检测：本进程内按窗口并行跑检测计划（分片模式下用于回退到本地的窗口）
+        self.parallel_detect = self.cfg_mgr.get_config("parallel.enabled", False)
+        # 批量匹配：同一模板在多个窗口上拼成 mosaic 一次匹配（优先于线程池并行）
+        self.batch_match = self.cfg_mgr.get_config("batch_match.enabled", False)
+
         # 启动Emergency独立检测线程
         self.emergency_mod.start(self.windows)
+
+        # 本地状态接口（Prometheus / JSON），供外部监控
+        self.status_server = None
+        srv_cfg = self.cfg_mgr.get_config("status_server", {}) or {}
+        if srv_cfg.get("enabled", False):
+            self.status_server = StatusServer(self, srv_cfg.get("host", "127.0.0.1"), srv_cfg.get("port", 9108))
+            self.status_server.start()
         
-        print(f"调度中心就绪 | 窗口总数: {len(self.windows)}")
+        self.log.info(0, "调度中心就绪 | 窗口总数: %s", len(self.windows))
 
     def _load_session_file(self):
-        p = self.cfg_mgr.get_path("room_session")
-        if p and os.path.exists(p):
-            try:
-                with open(p, "r", encoding="utf-8") as f:
-                    d = json.load(f)
-                    if time.time() - d.get("timestamp", 0) < 600: return d
-            except: pass
-        return {}
+        """读取内存中的房间 Session（过期时间按内存时间计算，不再读盘）"""
+        return self.session.get()
 
     def _refresh_session_timestamp(self):
-        """刷新 session 文件的时间戳，防止10分钟超时"""
-        try:
-            p = self.cfg_mgr.get_path("room_session")
-            if p and os.path.exists(p):
-                with open(p, "r", encoding="utf-8") as f:
-                    d = json.load(f)
-                # 只更新 timestamp，其他内容不变
-                d["timestamp"] = time.time()
-                with open(p, "w", encoding="utf-8") as f:
-                    json.dump(d, f, indent=4)
-        except Exception as e:
-            # 刷新失败不阻塞主流程
-            pass
+        """刷新 session 有效期，防止10分钟超时"""
+        self.session.touch()
 
     def _init_window_states(self):
         for idx, hwnd, acc in self.windows:
@@ -98,7 +137,8 @@ class TaskController:
                 "account": acc,
                 "state": WindowState.UNKNOWN,
                 "login_step_idx": 0,
-                "retry_count": 0
+                "retry_count": 0,
+                "ready": False
             }
 
     def _get_vk_code(self, key_str):
@@ -110,45 +150,37 @@ class TaskController:
         """重置房间 Session，可选是否重置任务进度
         
         Args:
-            reset_progress: 是否重置任务进度（switcher_state.json）
+            reset_progress: 是否重置任务进度（ProgressService）
                              默认False，只清理房间session
                              手动重置热键或日期变更时设为True
         """
+        # 房间重置后房主需要重新识别
+        if hasattr(self, "host_tracker"):
+            self.host_tracker.invalidate("房间重置")
+        if hasattr(self, "recorder"):
+            self.recorder.reset()
+
         # 清理房间 session（总是清理，因为房间信息是临时的）
-        p = self.cfg_mgr.get_path("room_session")
-        if p and os.path.exists(p):
-            try:
-                os.remove(p)
-                print("已重置房间 Session 记录")
-            except: pass
+        if self.session.clear():
+            self.log.info(0, "已重置房间 Session 记录")
         
         # 只有当明确要求时才重置任务进度
         if reset_progress:
-            switcher_state_path = os.path.join(
-                os.path.dirname(p) if p else os.getcwd(),
-                "switcher_state.json"
-            )
-            if os.path.exists(switcher_state_path):
-                try:
-                    os.remove(switcher_state_path)
-                    print("已重置任务进度记录")
-                except: pass
-            
-            # 重新初始化 ModeSwitcher 状态
             try:
-                self.switcher.state = self.switcher._load_and_check_daily_reset()
+                self.switcher.progress.reset()
                 self.switcher.refresh_config()
-                print("任务进度已重置，可重新开始任务")
+                self.log.info(0, "任务进度已重置，可重新开始任务")
             except Exception as e:
-                print(f"重置进度时出错: {e}")
+                self.log.error(0, "重置进度时出错: %s", e)
         else:
             # 不重置进度，只刷新配置确保数据最新
             try:
                 self.switcher.refresh_config()
-                progress = self.switcher.state.get("daily_progress", {})
-                print(f"[继续任务] 当前进度 - 道具赛: {progress.get('mode_item', 0)}, 疾爽赛: {progress.get('mode_speed', 0)}")
+                snap = self.switcher.progress.snapshot()
+                parts = ", ".join(f"{m['name']}: {m['done']}" for m in snap["modes"])
+                self.log.info(0, "[继续任务] 当前进度 - %s", parts)
             except Exception as e:
-                print(f"刷新进度时出错: {e}")
+                self.log.error(0, "刷新进度时出错: %s", e)
 
     def _log(self, hwnd, msg, ctx=None):
         data = self.win_states[hwnd]
@@ -157,23 +189,34 @@ class TaskController:
             role = "host" if hwnd == ctx.get("host_h") else "member"
         else:
             role = "host" if hwnd == self._current_host else "member"
-        full = f"[窗口{data['index']}][{role}] {msg}"
-        if self.last_log.get(hwnd) != full:
-            print(full)
-            self.last_log[hwnd] = full
+        # 同一窗口重复的消息只记一次；格式化交给日志写线程
+        key = (role, msg)
+        if self.last_log.get(hwnd) != key:
+            self.log.info(hwnd, "[窗口%s][%s] %s", data['index'], role, msg)
+            self.last_log[hwnd] = key
 
     def start_monitor(self):
-        loop_count = 0
-        print("[系统] 主监控循环已启动")
+        self.log.info(0, "[系统] 主监控循环已启动")
+        self.scheduler.reset([self.CTX_KEY] + [hwnd for _, hwnd, _ in self.windows])
         
         while self.running:
-            loop_count += 1
-            
             if not self.active:
                 time.sleep(1.0); continue
 
+            # 只取出已到期的任务：冷却中的窗口既不检测也不执行
+            due = self.scheduler.pop_due()
+            if not due:
+                self.scheduler.wait()
+                continue
+
+            tick_start = time.perf_counter()
             try:
-                ctx = self._get_global_context()
+                due_hwnds = [k for k in due if k != self.CTX_KEY]
+                if self.CTX_KEY in due or self._global_ctx is None:
+                    self._refresh_global_context()
+                    self.scheduler.schedule_in(self.CTX_KEY, self.ctx_interval)
+
+                ctx = self._get_global_context(due_hwnds)
                 
                 # 检查是否所有任务都已完成且已领奖结束
                 if ctx.get("all_done"):
@@ -182,81 +225,232 @@ class TaskController:
                         for _, hwnd, _ in self.windows
                     )
                     if all_finished:
-                        print("[系统] 所有任务已完成，脚本自动停止")
+                        if self.rotation.enabled and self._rotate_accounts():
+                            continue
+                        self.log.info(0, "[系统] 所有任务已完成，脚本自动停止")
                         self.running = False
                         break
 
-                for _, hwnd, _ in self.windows:
-                    # 1. 常规逻辑的冷却判断（emergency由独立线程处理，不再重复检测）
-                    if time.time() < self.action_cd.get(hwnd, 0):
-                        continue
-
-                    self._process_fsm(hwnd, ctx)
+                for hwnd in due_hwnds:
+                    # 常规逻辑的冷却判断（emergency由独立线程处理，不再重复检测）
+                    if time.time() >= self.action_cd.get(hwnd, 0):
+                        with self.metrics.span("fsm", self.win_states[hwnd]["state"]):
+                            self._process_fsm(hwnd, ctx)
+                    self._reschedule(hwnd)
 
             except Exception as e:
-                print(f"逻辑异常: {e}")
-                traceback.print_exc()
-            
-            time.sleep(0.1)  # 加快扫描频率到0.1秒
+                self.log.error(0, "逻辑异常: %s\n%s", e, traceback.format_exc())
+            finally:
+                self.metrics.observe("tick", "", (time.perf_counter() - tick_start) * 1000.0)
+                # 异常时也要把弹出的任务放回堆里，否则窗口会永久失去调度
+                for key in due:
+                    if self.scheduler.due_time(key) is None:
+                        if key == self.CTX_KEY:
+                            self.scheduler.schedule_in(key, self.ctx_interval)
+                        elif any(h == key for _, h, _ in self.windows):
+                            self._reschedule(key)
         
         # 停止Emergency检测线程
         self.emergency_mod.stop()
-        print("[系统] 脚本已安全退出")
+        if self.shards:
+            self.shards.stop()
+        self.engine.shutdown_executor()
+        if self.frame_bus:
+            self.engine._frame_bus = None
+            self.frame_bus.stop()
+        if self.status_server:
+            self.status_server.stop()
+        self._dump_metrics()
+        self.log.info(0, "[系统] 脚本已安全退出")
+
+    def status_snapshot(self):
+        """状态接口使用的只读快照（不含账号密码）"""
+        now = time.time()
+        windows = []
+        for idx, hwnd, acc in list(self.windows):
+            data = self.win_states.get(hwnd, {})
+            windows.append({
+                "index": idx,
+                "hwnd": hwnd,
+                "username": acc.get("username") or acc.get("user") or "",
+                "state": data.get("state"),
+                "ready": data.get("ready", False),
+                "cooldown_sec": round(max(self.action_cd.get(hwnd, 0) - now, 0), 2),
+            })
+        store = self.cfg_mgr.state_store
+        recent = store.recent_games(since=now - 3600)
+        last = recent[0] if recent else (store.recent_games(limit=1) or [None])[0]
+        return {
+            "time": now,
+            "running": self.running,
+            "active": self.active,
+            "host_hwnd": self._current_host,
+            "session": self.session.get(),
+            "windows": windows,
+            "progress": self.switcher.progress.snapshot(),
+            "games_last_hour": len(recent),
+            "last_game_at": last["started_at"] if last else None,
+            "metrics": self.metrics.snapshot(),
+        }
+
+    def _dump_metrics(self):
+        """导出指标快照到 metrics.json"""
+        if not self.metrics.enabled:
+            return
+        try:
+            path = self.metrics.dump()
+            self.log.info(0, "[指标] 已导出: %s", path)
+        except Exception as e:
+            self.log.error(0, "[指标] 导出失败: %s", e)
+
+    def _rotate_accounts(self):
+        """当前批次账号全部完成：退出登录，换上队列中的下一批账号，返回是否继续运行"""
+        self.log.info(0, self.rotation.format_daily_report())
+        batch = self.rotation.next_batch(self.windows)
+        if not batch:
+            self.log.info(0, "[账号轮换] 账号队列已空")
+            return False
+
+        now = time.time()
+        kept = {hwnd for _, hwnd, _ in batch}
+        for _, hwnd, acc in batch:
+            for step in self.rotation.logout_sequence:
+                self._execute_config_step(hwnd, step)
+                time.sleep(step.get("wait", 0.8))
+            data = self.win_states[hwnd]
+            data.update({"account": acc, "state": WindowState.UNKNOWN,
+                         "login_step_idx": 0, "retry_count": 0, "ready": False})
+            # 等待登录界面出现，之后由 UNKNOWN -> LOGIN 的检测计划接管登录
+            self.action_cd[hwnd] = now + self.rotation.login_wait
+            self._log(hwnd, f"[账号轮换] 退出登录，切换到账号 {acc['username']}")
+
+        # 账号不足时多余的窗口退出轮换
+        for _, hwnd, _ in self.windows:
+            if hwnd not in kept:
+                self.scheduler.remove(hwnd)
+                if self.frame_bus:
+                    self.frame_bus.remove(hwnd)
+                if self.shards:
+                    self.shards.remove(hwnd)
+                self.log.warn(hwnd, "[账号轮换] 窗口 %s 没有可分配的账号，停止调度", hwnd)
+        self.windows = batch
+        self.mode_switching = {hwnd: False for _, hwnd, _ in self.windows}
+
+        # 新批次：清空对局同步状态，进度从 0 开始
+        self.game_start_time.clear()
+        self.back_to_room_set.clear()
+        self.waiting_for_all_back = False
+        self.host_room_enter_time.clear()
+        self._cleanup_session(reset_progress=True)
+        self._global_ctx = None
+        self.cfg_mgr.save_window_results([
+            {"index": idx, "hwnd": hwnd, "username": acc["username"], "password": acc["password"]}
+            for idx, hwnd, acc in batch
+        ])
+        self.scheduler.reset([self.CTX_KEY] + [hwnd for _, hwnd, _ in self.windows],
+                             max(self.action_cd.get(h, now) for h in kept))
+        self.log.info(0, "[账号轮换] 新一批 %s 个账号开始任务", len(batch))
+        return True
+
+    def _reschedule(self, hwnd):
+        """窗口下次到期时间 = max(下一个扫描周期, 动作冷却结束)"""
+        due = max(time.time() + self.tick_interval, self.action_cd.get(hwnd, 0))
+        self.scheduler.schedule(hwnd, due)
 
-    def _get_global_context(self):
+    def _refresh_global_context(self):
+        """刷新与具体窗口无关的全局信息（Session、任务进度、房主）"""
         session = self._load_session_file()
-        ctx = {
+        g = {
             "sid": session.get("room_id"),
             "host_h": session.get("host_hwnd"),
             "curr_mode_id": session.get("mode"),
-            "members_in_room": [],
-            "members_ready": [],
             "all_done": self.switcher.is_all_tasks_finished()
         }
         
-        # 【关键修复】动态识别房主：在房间状态下总是重新检测"开始"按钮
-        # 只在有房间相关状态时才检测房主
+        # 【关键修复】动态识别房主：有窗口在房间时由房主缓存确认"开始"按钮
+        # 缓存有效时只在学到的按钮位置附近确认，失效事件后才全量扫描房间内窗口
         detected_host = None
-        has_room_state = any(self.win_states[hwnd]["state"] == WindowState.ROOM for _, hwnd, _ in self.windows)
-        if has_room_state:
-            for _, hwnd, _ in self.windows:
-                if self.room_mod.has_start_button(hwnd):
-                    detected_host = hwnd
-                    break
+        room_hwnds = [hwnd for _, hwnd, _ in self.windows if self.win_states[hwnd]["state"] == WindowState.ROOM]
+        if room_hwnds:
+            detected_host = self.host_tracker.resolve(room_hwnds, g["sid"])
         
         # 如果检测到了新房主，更新上下文（只在真正变化时打印）
         if detected_host:
             if self._current_host != detected_host:
-                print(f"[系统] 房主识别：窗口 {detected_host} 有开始按钮，设为新房主")
+                self.log.info(detected_host, "[系统] 房主识别：窗口 %s 有开始按钮，设为新房主", detected_host)
                 self._current_host = detected_host
-            ctx["host_h"] = detected_host
+            g["host_h"] = detected_host
         
         # 记录候选房主（用于大厅状态创房）
-        ctx["candidate_host"] = ctx["host_h"] or (self.windows[0][1] if self.windows else None)
-        
-        for _, hwnd, _ in self.windows:
+        g["candidate_host"] = g["host_h"] or (self.windows[0][1] if self.windows else None)
+
+        # 房主在房间时，从房主画面单帧读取所有玩家槽位，替代逐个成员窗口的准备检测
+        g["roster"] = None
+        host = g["host_h"]
+        if host and self.win_states.get(host, {}).get("state") == WindowState.ROOM:
+            g["roster"] = self.room_mod.read_roster(host)
+            if g["roster"] is not None:
+                members = [hwnd for _, hwnd, _ in self.windows
+                           if hwnd != host and self.win_states[hwnd]["state"] == WindowState.ROOM]
+                self._reconcile_roster(g["roster"], members)
+        self._global_ctx = g
+
+    def _detect_due(self, due_hwnds):
+        """对到期窗口按各自当前状态跑检测计划，返回 {hwnd: 命中的探针或 None}"""
+        pairs = [(hwnd, self.win_states[hwnd]["state"]) for hwnd in due_hwnds]
+        hits = {}
+        if self.shards:
+            remote = self.shards.detect_many(pairs)
+            for hwnd, state in pairs:
+                if hwnd in remote:
+                    hits[hwnd] = self.detection_plan.find(state, remote[hwnd]) if remote[hwnd] else None
+        local = [(hwnd, state) for hwnd, state in pairs if hwnd not in hits]
+        if self.batch_match:
+            hits.update(self.detection_plan.detect_many(local))
+        elif self.parallel_detect:
+            hits.update(self.engine.detect_all(local, self.detection_plan))
+        else:
+            for hwnd, state in local:
+                hits[hwnd] = self.detection_plan.detect(hwnd, state)
+        return hits
+
+    def _reconcile_roster(self, roster, members):
+        """用房主画面的名单校正成员准备状态，只有名单与窗口自身状态不一致时才逐个检测成员窗口"""
+        seated = max(roster["occupied"] - 1, 0)  # 去掉房主自己的槽位
+        cached_ready = [h for h in members if self.win_states[h]["ready"]]
+        if seated == len(members):
+            if roster["ready"] == len(cached_ready):
+                return
+            # 全部准备 / 全部未准备时无需区分是谁，直接更新
+            if roster["ready"] in (0, len(members)):
+                for h in members:
+                    self.win_states[h]["ready"] = roster["ready"] > 0
+                return
+        # 名单与窗口状态不一致：只有这种情况才确认成员窗口（一次批量匹配）
+        for h, ready in self.room_mod.members_ready(members).items():
+            self.win_states[h]["ready"] = ready
+
+    def _get_global_context(self, due_hwnds=None):
+        """在缓存的全局信息上，只对到期窗口做视觉检测，再汇总所有窗口的缓存状态"""
+        if self._global_ctx is None:
+            self._refresh_global_context()
+        ctx = dict(self._global_ctx)
+        if due_hwnds is None:
+            due_hwnds = [hwnd for _, hwnd, _ in self.windows]
+
+        # --- 步骤 1： 视觉事实检测 (按检测计划只查当前状态下可能出现的画面)
+        hits = self._detect_due(due_hwnds)
+
+        for hwnd in due_hwnds:
             state_data = self.win_states[hwnd]
             prev_state = state_data["state"] # 记录上一次的状态，用于逻辑推导
-
-            # --- 步骤 1： 视觉事实检测 (依靠图片匹配)
-            # 优化：LOGIN状态只检测大厅不检测房间，UNKNOWN状态只检测大厅（减少截图开销）
-            if state_data["state"] == WindowState.LOGIN:
-                # LOGIN状态只检测大厅，不检测房间（避免截图开销）
-                is_room = False
-                is_lobby = self.room_mod.is_in_lobby(hwnd)
-            elif state_data["state"] == WindowState.UNKNOWN:
-                # UNKNOWN状态检测大厅，用于识别登录完成后进入大厅的情况
-                is_room = False
-                is_lobby = self.room_mod.is_in_lobby(hwnd)
-            else:
-                # 其他状态正常检测
-                is_room = self.room_mod.is_in_room(hwnd)
-                is_lobby = self.room_mod.is_in_lobby(hwnd)
+            hit = hits.get(hwnd)
+            next_state = hit.next_state if hit else None
 
             # --- 步骤 2： 状态机判定逻辑 ---
             
             # A. 确定在房间里
-            if is_room:
+            if next_state == WindowState.ROOM:
                 # 【修复】检测窗口是否在游戏中且现在回到了房间
                 # 记录该窗口已回到房间（无论从什么状态过来）
                 # 简化逻辑：只要 waiting_for_all_back 为 True，说明上一局刚结束，此时在房间的都算回来了
@@ -266,6 +460,7 @@ class TaskController:
                 
                 if should_record and hwnd not in self.back_to_room_set:
                     self.back_to_room_set.add(hwnd)
+                    self.recorder.window_back()
                     # 检查是否所有窗口都已回到房间
                     total_windows = len(self.windows)
                     back_count = len(self.back_to_room_set)
@@ -276,6 +471,7 @@ class TaskController:
                         for _, h, _ in self.windows:
                             if h in self.game_start_time:
                                 del self.game_start_time[h]
+                        self.recorder.all_back()
                         # 清空集合，为下一局做准备
                         self.back_to_room_set.clear()
                         self.waiting_for_all_back = False
@@ -284,19 +480,24 @@ class TaskController:
                         self.waiting_for_all_back = True
                         self._log(hwnd, f"游戏结束，等待其他窗口回到房间 ({back_count}/{total_windows})...", ctx)
                 state_data["state"] = WindowState.ROOM
-                # 【修复】基于动态识别的房主判断成员（非房主即为成员）
-                if hwnd != ctx.get("host_h"):
-                    ctx["members_in_room"].append(hwnd)
-                    if self.room_mod.is_member_ready(hwnd):
-                        ctx["members_ready"].append(hwnd)
+                # 【修复】基于动态识别的房主判断成员（非房主即为成员），准备状态缓存到窗口数据中
+                # 有房主名单时由名单统一校正，不再逐个检测成员窗口
+                if hwnd == ctx.get("host_h"):
+                    state_data["ready"] = False
+                elif ctx.get("roster") is None:
+                    state_data["ready"] = self.room_mod.is_member_ready(hwnd)
 
             # B. 确定在大厅里
-            elif is_lobby:
+            elif next_state == WindowState.LOBBY:
                 # 【修复】不覆盖领奖中和已完成的状态，避免视觉检测干扰领奖流程
                 if state_data["state"] not in [WindowState.CLAIMING, WindowState.FINISHED]:
                     state_data["state"] = WindowState.LOBBY
 
-            # C. 视觉匹配失败时的【逻辑推导】
+            # C. 识别到登录界面（仅 UNKNOWN/LOGIN 状态会检测登录模板）
+            elif next_state == WindowState.LOGIN:
+                state_data["state"] = WindowState.LOGIN
+
+            # D. 视觉匹配失败时的【逻辑推导】
             else:
                 # 情况 1：从房间突然消失 -> 说明"开跑了" (INGAME)
                 if prev_state == WindowState.ROOM:
@@ -313,44 +514,31 @@ class TaskController:
                     else:
                         state_data["state"] = WindowState.INGAME # 保持
 
-                # 情况 3：既不是开跑，也不在大厅房间 -> 尝试识别登录界面
-                # LOGIN/UNKNOWN状态都需要检测，避免卡死
+                # 情况 3：领奖中/已完成由领奖流程自己维护，不做推导
+                elif prev_state in (WindowState.CLAIMING, WindowState.FINISHED):
+                    pass
+
+                # 情况 4：检测计划内的画面都没命中 -> 回到未知，下一轮按 UNKNOWN 计划重新识别
                 else:
-                    if self._check_is_login_ui(hwnd):
-                        state_data["state"] = WindowState.LOGIN
-                    else:
-                        state_data["state"] = WindowState.UNKNOWN
+                    state_data["state"] = WindowState.UNKNOWN
+
+            if state_data["state"] != WindowState.ROOM:
+                state_data["ready"] = False
 
+        # 成员/准备列表由所有窗口的缓存状态汇总（未到期窗口沿用上次检测结果）
+        ctx["members_in_room"] = [
+            hwnd for _, hwnd, _ in self.windows
+            if self.win_states[hwnd]["state"] == WindowState.ROOM and hwnd != ctx.get("host_h")
+        ]
+        ctx["members_ready"] = [hwnd for hwnd in ctx["members_in_room"] if self.win_states[hwnd]["ready"]]
         return ctx
 
     def _check_is_login_ui(self, hwnd):
         """
-        【修复核心】检查是否在登录流程中 (包括：账号输入、登录序列中的任意一步)
+        检查是否在登录流程中 (包括：账号输入、登录序列中的任意一步)
         只要匹配到配置中定义的任何一张登录相关图片，即返回 True
         """
-        # 1. 检查 pre_login (最底层：大区选择、账号输入框)
-        login_cfg = self.cfg_mgr.get_config("pre_login", {})
-        if login_cfg:
-            for key, step_cfg in login_cfg.items():
-                img_name = step_cfg.get("check_img")
-                if not img_name: continue
-                img_path = self.cfg_mgr.get_template_path(img_name)
-                threshold = step_cfg.get("match_threshold", 0.7)
-                if self.engine.match_template(hwnd, img_path, threshold)[0]:
-                    return True
-        
-        # 2. 【关键新增】检查 login_sequence (登录按钮、服务器、进入游戏等)
-        # 如果游戏停在登录序列的任何一步，都 应该被识别为 LOGIN，否则会变成 UNKNOWN 卡死
-        seq = self.cfg_mgr.get_config("login_sequence", [])
-        for step in seq:
-            img_name = step.get("check_img")
-            if not img_name: continue
-            img_path = self.cfg_mgr.get_template_path(img_name)
-            threshold = step.get("match_threshold", 0.7)
-            if self.engine.match_template(hwnd, img_path, threshold)[0]:
-                return True
-
-        return False
+        return self.detection_plan.match_probe(hwnd, "login_ui")
 
     def _process_fsm(self, hwnd, ctx):
         data = self.win_states[hwnd]
@@ -379,36 +567,14 @@ class TaskController:
                 return
 
         if s == WindowState.INGAME:
-            # 检查游戏是否结束（回到房间）
-            is_room = self.room_mod.is_in_room(hwnd)
-            is_lobby = self.room_mod.is_in_lobby(hwnd)
-            
-            # 如果不在房间且不在大厅，尝试等待一小段时间后再检测
-            if not is_room and not is_lobby:
-                # 快速重试检测（游戏结束画面加载可能有延迟）
-                time.sleep(0.3)
-                is_room = self.room_mod.is_in_room(hwnd)
-                if not is_room:
-                    is_lobby = self.room_mod.is_in_lobby(hwnd)
-            
-            if is_room or is_lobby:
-                self._log(hwnd, f"游戏结束，回到{'房间' if is_room else '大厅'}", ctx)
-                data["state"] = WindowState.ROOM if is_room else WindowState.LOBBY
-                # 重置游戏开始时间
-                for _, h, _ in self.windows:
-                    if h in self.game_start_time:
-                        del self.game_start_time[h]
-                return
-            else:
-                # 如果游戏开始时间超过一定时间，强制重置为ROOM（防止卡死）
-                if hwnd in self.game_start_time:
-                    elapsed = time.time() - self.game_start_time[hwnd]
-                    if elapsed > 360:  # 6分钟超时（游戏正常4-5分钟）
-                        self._log(hwnd, "游戏超时，重置状态为房间", ctx)
-                        del self.game_start_time[hwnd]
-                        data["state"] = WindowState.ROOM  # 超时后假定回到房间
-                        return
-                return
+            # 回到房间/大厅已由 _get_global_context 按检测计划识别，这里只做超时保护
+            if hwnd in self.game_start_time:
+                elapsed = time.time() - self.game_start_time[hwnd]
+                if elapsed > 360:  # 6分钟超时（游戏正常4-5分钟）
+                    self._log(hwnd, "游戏超时，重置状态为房间", ctx)
+                    del self.game_start_time[hwnd]
+                    data["state"] = WindowState.ROOM  # 超时后假定回到房间
+            return
         if s == WindowState.ROOM:
             self._handle_room(hwnd, data, ctx)
         elif s == WindowState.LOBBY:
@@ -417,18 +583,7 @@ class TaskController:
             self._handle_login(hwnd, data, ctx)
         elif s == WindowState.CLAIMING:
             self._handle_claiming(hwnd, data, ctx)
-        elif s == WindowState.UNKNOWN:
-            # UNKNOWN 状态尝试识别当前界面
-            if self._check_is_login_ui(hwnd):
-                data["state"] = WindowState.LOGIN
-            else:
-                # 尝试检测房间或大厅
-                is_room = self.room_mod.is_in_room(hwnd)
-                is_lobby = self.room_mod.is_in_lobby(hwnd)
-                if is_room:
-                    data["state"] = WindowState.ROOM
-                elif is_lobby:
-                    data["state"] = WindowState.LOBBY
+        # UNKNOWN 状态的界面识别已在 _get_global_context 中按检测计划完成
 
     def _handle_login(self, hwnd, data, ctx):
         """修复登录流程，添加诊断日志"""
@@ -547,13 +702,19 @@ class TaskController:
             # 每次房主在房间且确认房间信息有效时，刷新timestamp
             if ctx["sid"] and ctx.get("host_h"):
                 self._refresh_session_timestamp()
-            # 2. 判断是否需要切换模型 (由 Switcher 内部状态决定)
+            # 2. 判断是否需要切换模型 (按模式规划器给出的顺序)
             should_switch, target_cfg = self.switcher.check_switch_condition()
             
             # 关键：识别到当前在跑的模式确实和目标不一样，才切
             if should_switch and ctx['curr_mode_id'] and target_cfg and target_cfg['id'] != ctx['curr_mode_id']:
                 self._log(hwnd, f"切换模式: {ctx['curr_mode_id'] or '未知'} -> {target_cfg['id']}", ctx)
-                if self._perform_mode_switch(hwnd, target_cfg):
+                switch_begin = time.time()
+                switched = self._perform_mode_switch(hwnd, target_cfg)
+                switch_sec = time.time() - switch_begin
+                self.recorder.add_switch(switch_sec)
+                if switched:
+                    # 实测切换耗时反馈给模式规划器
+                    self.switcher.planner.observe_switch(ctx['curr_mode_id'], target_cfg['id'], switch_sec)
                     # 切换成功后手动更新 Session 里的模式，防止下一秒又切
                     if ctx["sid"]:
                         self.save_room_session(ctx["sid"], hwnd, target_cfg['id'])
@@ -565,6 +726,7 @@ class TaskController:
                 self.action_cd[hwnd] = time.time() + 5.0
                 return
             # 3. 起跑逻辑
+            self.recorder.mark_waiting()
             needed = len(self.windows) - 1
             if len(ctx["members_in_room"]) >= needed and len(ctx["members_ready"]) >= needed:
                 # 获取模式中文名
@@ -574,14 +736,19 @@ class TaskController:
                         mode_name = m["name"]
                         break
                 self._log(hwnd, f"确认无误，房主起跑 ({mode_name})", ctx)
-                if self.room_mod.click_start(hwnd):
+                start_roi = self.host_tracker.button_roi() if hwnd == self.host_tracker.host else None
+                if self.room_mod.click_start(hwnd, start_roi):
                     # 广播开始时间
                     for _, h, _ in self.windows: 
                         self.game_start_time[h] = time.time()
+                    self.recorder.game_started(hwnd, [h for _, h, _ in self.windows])
                     self.switcher.report_game_finished()
                     # 清除房间进入计时器
                     self.host_room_enter_time.pop(hwnd, None)
                     self.action_cd[hwnd] = time.time() + 8.0
+                else:
+                    # 开始按钮没找到，房主可能已经变了
+                    self.host_tracker.invalidate("点击开始失败")
             else:
                 self._log(hwnd, f"等待准备: {len(ctx['members_ready'])}/{needed}", ctx)
         else:
@@ -597,10 +764,14 @@ class TaskController:
                 self._log(hwnd, "检测到游戏已开始，跳过准备操作", ctx)
                 return
                 
-            # 双重检查：既要在房间内，又不能是准备状态
-            if data["state"] == WindowState.ROOM and not self.room_mod.is_member_ready(hwnd):
+            # 双重检查：既要在房间内，又不能是准备状态（缓存已准备的成员不再重复截图确认）
+            if data["state"] == WindowState.ROOM and not data["ready"]:
+                if self.room_mod.is_member_ready(hwnd):
+                    data["ready"] = True
+                    return
                 # 点击准备按钮并检查是否成功
                 if self.room_mod.click_ready(hwnd):
+                    data["ready"] = True
                     self._log(hwnd, "准备成功", ctx)
                 else:
                     self._log(hwnd, "准备点击失败，重试中", ctx)
@@ -673,7 +844,7 @@ class TaskController:
             self._log(hwnd, "领奖完成，任务结束。", ctx)
         except Exception as e:
             self._log(hwnd, f"领奖过程出错: {e}", ctx)
-            traceback.print_exc()
+            self.log.error(hwnd, "%s", traceback.format_exc())
         # 领奖完成后设置冷却时间，防止重复执行
         self.action_cd[hwnd] = time.time() + 10.0
 
@@ -797,31 +968,37 @@ class TaskController:
         return rid_list[-1] if rid_list else None
     
     def save_room_session(self, rid, hwnd, mode):
-        p = self.cfg_mgr.get_path("room_session")
-        with open(p, "w", encoding="utf-8") as f:
-            json.dump({"room_id": str(rid), "host_hwnd": int(hwnd), "mode": mode, "timestamp": time.time()}, f)
+        # 内存立即生效，写盘由 SessionStore 在后台合并完成
+        self.session.save(rid, hwnd, mode)
+        # 广播给本轮上下文，不必等下一次全局刷新
+        if self._global_ctx is not None:
+            self._global_ctx.update({"sid": str(rid), "host_h": int(hwnd), "curr_mode_id": mode})
         self._log(hwnd, f"广播 Session: {rid}")
 
     def _start_hotkey_listener(self):
         def listener():
             last_p = False
             last_r = False
+            last_m = False
+            last_f = False
             while self.running:
                 # 暂停/恢复热键
                 p_down = win32api.GetAsyncKeyState(self.pause_key) & 0x8000
                 if p_down and not last_p:
                     self.active = not self.active
-                    print(f"\n[系统] {'恢复' if self.active else '暂停'}")
+                    self.log.info(0, "[系统] %s", '恢复' if self.active else '暂停')
                 last_p = bool(p_down)
                 
                 # 停止热键
                 if win32api.GetAsyncKeyState(self.stop_key) & 0x8000:
+                    self.log.info(0, "[系统] 停止热键，立即退出")
+                    self.log.pipeline.flush()
                     os._exit(0)
                 
                 # 【新增】重置任务热键
                 r_down = win32api.GetAsyncKeyState(self.reset_key) & 0x8000
                 if r_down and not last_r:
-                    print("\n[系统] 重置任务进度...")
+                    self.log.info(0, "[系统] 重置任务进度...")
                     # 手动热键时重置任务进度
                     self._cleanup_session(reset_progress=True)
                     # 重置所有窗口状态
@@ -830,14 +1007,29 @@ class TaskController:
                             self.win_states[hwnd]["state"] = WindowState.UNKNOWN
                             self.win_states[hwnd]["login_step_idx"] = 0
                             self.win_states[hwnd]["retry_count"] = 0
+                            self.win_states[hwnd]["ready"] = False
                         if hwnd in self.action_cd:
                             del self.action_cd[hwnd]
                         if hwnd in self.game_start_time:
                             del self.game_start_time[hwnd]
                         if hwnd in self.host_room_enter_time:
                             del self.host_room_enter_time[hwnd]
-                    print("[系统] 任务已重置，将重新开始")
+                    # 冷却已清空，所有窗口立即重新调度
+                    self.scheduler.reset([self.CTX_KEY] + [hwnd for _, hwnd, _ in self.windows])
+                    self.log.info(0, "[系统] 任务已重置，将重新开始")
                 last_r = bool(r_down)
+
+                # 导出指标热键
+                m_down = win32api.GetAsyncKeyState(self.metrics_key) & 0x8000
+                if m_down and not last_m:
+                    self._dump_metrics()
+                last_m = bool(m_down)
+
+                # 性能采样热键：开始 / 提前结束
+                f_down = win32api.GetAsyncKeyState(self.profile_key) & 0x8000
+                if f_down and not last_f:
+                    toggle_profiler(self.cfg_mgr)
+                last_f = bool(f_down)
                 
                 time.sleep(0.05)
-        threading.Thread(target=listener, daemon=True).start()
+        threading.Thread(target=listener, name="hotkey", daemon=True).start()
@@ -2,8 +2,19 @@
 import os
 import json
 
+from app.core.state_store import StateStore
+from app.core.session_store import SessionStore
+from app.core.progress_service import ProgressService
+from app.logger import get_logger
+
+log = get_logger()
+
 class ConfigManager:
-    def __init__(self):
+    def __init__(self, with_state=True):
+        """
+        Args:
+            with_state: False 时不打开运行时状态库（只读配置的进程，如分片检测子进程）
+        """
         # 基础目录定位
         # __file__ 是 app/core/config_manager.py
         self.CORE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -19,9 +30,7 @@ class ConfigManager:
             "config": os.path.join(self.DATA_DIR, "config.json"),
             "user_config": os.path.join(self.DATA_DIR, "user_config.json"),
             "accounts": os.path.join(self.DATA_DIR, "accounts.txt"),
-            "window_results": os.path.join(self.DATA_DIR, "window_results.json"),
-            "room_session": os.path.join(self.DATA_DIR, "room_session.json"),
-            "mode_counts": os.path.join(self.DATA_DIR, "mode_counts.json"),
+            "state_db": os.path.join(self.DATA_DIR, "state.db"),
             "templates": os.path.join(self.APP_DIR, "templates")
         }
 
@@ -29,6 +38,16 @@ class ConfigManager:
         self.config_data = self._load_json(self.paths["config"])
         self.user_config_data = self._load_json(self.paths["user_config"])
 
+        # 运行时状态库（Session / 进度 / 窗口绑定 / 对局记录），首次启用时导入旧 JSON 文件
+        self.state_store = None
+        if with_state:
+            self.state_store = StateStore(self.paths["state_db"])
+            self.state_store.import_legacy(self.DATA_DIR)
+
+        # 运行时共享状态（按需创建，同一个 ConfigManager 下的所有组件共用）
+        self._session_store = None
+        self._progress = None
+
     def _load_json(self, path):
         if os.path.exists(path):
             with open(path, 'r', encoding='utf-8') as f:
@@ -61,7 +80,7 @@ class ConfigManager:
             json.dump(self.user_config_data, f, indent=4, ensure_ascii=False)
 
     def get_path(self, name):
-        """快速获取文件路径，如 cfg.get_path('window_results')"""
+        """快速获取文件路径，如 cfg.get_path('accounts')"""
         return self.paths.get(name)
 
     def get_template_path(self, img_name):
@@ -93,14 +112,45 @@ class ConfigManager:
         """优先取用户设置的密码"""
         return self.user_config_data.get('room_password', self.config_data.get('room_password', '1234'))
 
+    @property
+    def session_store(self):
+        """内存中的房间 Session（状态库中的 session 表仅作崩溃恢复）"""
+        if self._session_store is None:
+            self._session_store = SessionStore(self.state_store)
+        return self._session_store
+
+    @property
+    def progress(self):
+        """每日任务进度服务（唯一数据源，变更时推送给订阅者）"""
+        if self._progress is None:
+            self._progress = ProgressService(self, self.state_store)
+        return self._progress
+
+    def load_window_results(self):
+        """已启动的窗口列表 [{"index", "hwnd", "username", "password"}]，没有时返回 []"""
+        try:
+            return self.state_store.load_window_bindings()
+        except Exception as e:
+            log.error(0, "读取窗口记录失败: %s", e)
+            return []
+
+    def save_window_results(self, items):
+        """保存启动器产生的窗口列表（整体替换）"""
+        self.state_store.save_window_bindings(items)
+
+    def clear_window_results(self):
+        """清空窗口记录，返回清空前是否有记录"""
+        try:
+            had_data = bool(self.state_store.load_window_bindings())
+            self.state_store.clear_window_bindings()
+            return had_data
+        except Exception:
+            return False
+
     def reset_session(self):
-        """重置房间会话文件"""
-        p = self.get_path("room_session")
-        if p and os.path.exists(p):
-            try:
-                os.remove(p)
-                return True
-            except:
-                return False
-        return False
+        """重置房间会话（内存 + 恢复文件）"""
+        try:
+            return self.session_store.clear()
+        except:
+            return False
     
\ No newline at end of file
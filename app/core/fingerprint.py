@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+像素指纹
+用几个固定位置的像素颜色区分游戏画面（登录、大厅、房间、准备、领奖页等），检查一次只需读几个像素，
+作为模板匹配之前的第一道检测；指纹由 derive_fingerprints.py 在录制画面上推导后写入 config.json：
+
+    "fingerprints": {"screens": {"room": {"probes": [[x, y, "#RRGGBB", tol], ...], "min_match": 6}}}
+
+tol 为每个通道允许的最大色差；命中的探针数达到 min_match（缺省为全部）即视为该画面
+"""
+
+import numpy as np
+
+
+def hex_to_bgr(hex_str):
+    h = hex_str.lstrip("#")
+    r, g, b = int(h[0:2], 16), int(h[2:4], 16), int(h[4:6], 16)
+    return b, g, r
+
+
+def bgr_to_hex(bgr):
+    b, g, r = (int(v) for v in bgr)
+    return f"#{r:02X}{g:02X}{b:02X}"
+
+
+class Fingerprint:
+    """编译后的指纹：坐标 / 颜色 / 容差转为 numpy 数组，一次花式索引读出全部探针像素"""
+
+    __slots__ = ("name", "xs", "ys", "colors", "tols", "min_match")
+
+    def __init__(self, name, probes, min_match=None):
+        self.name = name
+        self.xs = np.array([p[0] for p in probes], dtype=np.intp)
+        self.ys = np.array([p[1] for p in probes], dtype=np.intp)
+        self.colors = np.array([hex_to_bgr(p[2]) for p in probes], dtype=np.int16)
+        self.tols = np.array([p[3] if len(p) > 3 else 20 for p in probes], dtype=np.int16)
+        self.min_match = len(probes) if min_match is None else min_match
+
+    @classmethod
+    def from_config(cls, name, spec):
+        probes = spec.get("probes") or []
+        if not probes:
+            return None
+        return cls(name, probes, spec.get("min_match"))
+
+    def matches(self, screen):
+        """基准分辨率画面（BGR 或 BGRA）是否符合该指纹"""
+        if screen is None or screen.ndim != 3:
+            return False
+        h, w = screen.shape[:2]
+        if self.xs.max() >= w or self.ys.max() >= h:
+            return False
+        px = screen[self.ys, self.xs, :3].astype(np.int16)
+        ok = (np.abs(px - self.colors).max(axis=1) <= self.tols).sum()
+        return int(ok) >= self.min_match
+
+    def __repr__(self):
+        return f"<Fingerprint {self.name} ({len(self.xs)} 探针, 需 {self.min_match})>"
+
+
+def load_fingerprints(cfg_mgr):
+    """读取 config.json 的 fingerprints 段，未开启时返回空字典"""
+    fp_cfg = cfg_mgr.get_config("fingerprints", {}) or {}
+    if not fp_cfg.get("enabled", False):
+        return {}
+    result = {}
+    for name, spec in (fp_cfg.get("screens") or {}).items():
+        fp = Fingerprint.from_config(name, spec)
+        if fp is not None:
+            result[name] = fp
+    return result
@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+共享内存帧总线
+每个窗口只有一个截图生产者，按固定间隔截图并发布到 multiprocessing.shared_memory 中的环形缓冲；
+控制器、紧急监控、窗口监控等消费者（任意线程或进程）直接复制最新一帧，不再各自 PrintWindow，
+截图次数与检测方数量无关
+
+共享内存布局（每个窗口一块，名称 ckframe_<hwnd>）:
+
+    header: latest(int64) + SLOTS 个槽位头 [seq(uint64), ts(float64), h, w, c(int32)]
+    slots:  SLOTS 个像素区，每个按基准分辨率 x 4 通道预留
+
+写入顺序：槽位 seq 置 0 -> 像素 -> 槽位头(seq 最后写) -> latest；生产者总是写下一个槽位。
+读者不持有槽位视图：snapshot() 把最新一帧复制到调用方的缓冲（GameEngine 用截图缓冲池），
+复制前后的 seq 一致且非 0 才算完整，否则重试，拿到的画面之后不会被生产者覆盖
+"""
+
+import time
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.logger import get_logger
+
+log = get_logger()
+
+SLOTS = 3
+HEADER_ALIGN = 64
+SNAPSHOT_RETRIES = 3
+
+_SLOT_DTYPE = np.dtype([("seq", "<u8"), ("ts", "<f8"), ("h", "<i4"), ("w", "<i4"), ("c", "<i4"), ("pad", "<i4")])
+_HEADER_DTYPE = np.dtype([("latest", "<i8"), ("max_h", "<i4"), ("max_w", "<i4"), ("slots", _SLOT_DTYPE, (SLOTS,))])
+_HEADER_SIZE = (_HEADER_DTYPE.itemsize + HEADER_ALIGN - 1) // HEADER_ALIGN * HEADER_ALIGN
+
+
+def shm_name(hwnd):
+    return f"ckframe_{hwnd}"
+
+
+# close() 时仍有其他线程持有视图的共享内存块，之后每次 close 时重试
+_deferred = []
+_deferred_lock = threading.Lock()
+
+
+def _close_shm(shm=None):
+    with _deferred_lock:
+        if shm is not None:
+            _deferred.append(shm)
+        for item in list(_deferred):
+            try:
+                item.close()
+                _deferred.remove(item)
+            except BufferError:
+                pass
+
+
+class FrameRef:
+    """一帧：latest() 只带元数据（frame 为 None），snapshot() 带复制出的画面"""
+
+    __slots__ = ("frame", "seq", "ts", "_ring", "_slot")
+
+    def __init__(self, frame, seq, ts, ring, slot):
+        self.frame = frame
+        self.seq = seq
+        self.ts = ts
+        self._ring = ring
+        self._slot = slot
+
+    @property
+    def age(self):
+        return time.time() - self.ts
+
+    def valid(self):
+        """该帧所在槽位是否仍是这一帧（未被生产者覆盖）"""
+        return self._ring.seq_of(self._slot) == self.seq
+
+
+class FrameRing:
+    """一个窗口的共享内存环形缓冲（生产者 create=True，读者 create=False）"""
+
+    def __init__(self, hwnd, max_w=1920, max_h=1080, create=False):
+        self.hwnd = hwnd
+        self.owner = create
+        self.closed = False
+        # 读写和 close 互斥：close 时本进程内不会有正在使用的视图
+        self._lock = threading.Lock()
+        if create:
+            self.shm = self._create(hwnd, _HEADER_SIZE + SLOTS * max_w * max_h * 4)
+        else:
+            self.shm = shared_memory.SharedMemory(name=shm_name(hwnd))
+        self.header = np.ndarray((), dtype=_HEADER_DTYPE, buffer=self.shm.buf)
+        if create:
+            self.header["latest"] = -1
+            self.header["max_h"], self.header["max_w"] = max_h, max_w
+            self.header["slots"]["seq"] = 0
+        # 读者按生产者写入的尺寸计算槽位偏移（基准分辨率可能不是默认值）
+        self.slot_bytes = int(self.header["max_w"]) * int(self.header["max_h"]) * 4
+        self._seq = int(self.header["slots"]["seq"].max())
+
+    @staticmethod
+    def _create(hwnd, size):
+        try:
+            return shared_memory.SharedMemory(name=shm_name(hwnd), create=True, size=size)
+        except FileExistsError:
+            pass
+        # 上次异常退出残留的同名块：够大就复用，否则（上次的基准分辨率更小）删掉重建
+        shm = shared_memory.SharedMemory(name=shm_name(hwnd))
+        if shm.size >= size:
+            return shm
+        log.warn(hwnd, "[帧总线] 残留的共享内存块过小 (%s < %s)，重新创建", shm.size, size)
+        shm.close()
+        shm.unlink()
+        return shared_memory.SharedMemory(name=shm_name(hwnd), create=True, size=size)
+
+    def _meta(self, slot):
+        """槽位头 -> (seq, ts, h, w, c)，按字段取标量，不留下指向共享内存的对象"""
+        slots = self.header["slots"]
+        return (int(slots["seq"][slot]), float(slots["ts"][slot]),
+                int(slots["h"][slot]), int(slots["w"][slot]), int(slots["c"][slot]))
+
+    def seq_of(self, slot):
+        with self._lock:
+            return 0 if self.closed else int(self.header["slots"]["seq"][slot])
+
+    def _slot_view(self, slot, h, w, c):
+        offset = _HEADER_SIZE + slot * self.slot_bytes
+        return np.ndarray((h, w, c), dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+
+    def publish(self, frame, ts=None):
+        """写入下一个槽位并设为最新（只由该窗口的生产者调用）"""
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+        if h * w * c > self.slot_bytes:
+            raise ValueError(f"帧尺寸 {w}x{h}x{c} 超过共享内存槽位")
+        with self._lock:
+            if self.closed:
+                return 0
+            slot = (int(self.header["latest"]) + 1) % SLOTS
+            slots = self.header["slots"]
+            slots["seq"][slot] = 0   # 写像素期间读者看到 seq=0 / seq 变化，丢弃这次复制
+            np.copyto(self._slot_view(slot, h, w, c), frame.reshape(h, w, c))
+            self._seq += 1
+            slots["ts"][slot], slots["h"][slot], slots["w"][slot], slots["c"][slot] = ts or time.time(), h, w, c
+            slots["seq"][slot] = self._seq
+            self.header["latest"] = slot
+            return self._seq
+
+    def latest(self):
+        """最新一帧的元数据（FrameRef.frame 为 None），还没有帧时返回 None"""
+        with self._lock:
+            if self.closed:
+                return None
+            slot = int(self.header["latest"])
+            if slot < 0:
+                return None
+            seq, ts, _, _, _ = self._meta(slot)
+            return FrameRef(None, seq, ts, self, slot)
+
+    def snapshot(self, buffer):
+        """
+        把最新一帧复制到 buffer(shape) 返回的数组（调用方私有，之后不会被覆盖）
+
+        复制后复核槽位 seq：复制期间生产者（可能在其他进程）开始覆盖该槽位时重试，
+        SNAPSHOT_RETRIES 次都没拿到完整的一帧或还没有帧时返回 None
+        """
+        for _ in range(SNAPSHOT_RETRIES):
+            with self._lock:
+                if self.closed:
+                    return None
+                slot = int(self.header["latest"])
+                if slot < 0:
+                    return None
+                seq, ts, h, w, c = self._meta(slot)
+                if seq == 0:
+                    continue
+                shape = (h, w) if c == 1 else (h, w, c)
+                out = buffer(shape)
+                np.copyto(out, self._slot_view(slot, h, w, c).reshape(shape))
+                if int(self.header["slots"]["seq"][slot]) == seq:
+                    return FrameRef(out, seq, ts, self, slot)
+        return None
+
+    def close(self):
+        """关闭映射（生产者同时删除共享内存块）；仍有视图未释放时延后关闭，不抛异常"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.header = None
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+        _close_shm(self.shm)
+
+
+class FrameProducer:
+    """单个窗口的截图线程"""
+
+    def __init__(self, hwnd, engine, ring, interval=0.1):
+        self.hwnd = hwnd
+        self.engine = engine
+        self.ring = ring
+        self.interval = interval
+        self.captures = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="capture-producer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=3)
+
+    def request(self):
+        """消费者发现帧过旧时请求立即截图"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            frame = self.engine.grab_screen(self.hwnd, rescale_to_base=True)
+            if frame is not None:
+                self.ring.publish(frame)
+                self.captures += 1
+            else:
+                self.failures += 1
+            self._wake.wait(self.interval)
+
+
+class FrameBus:
+    """进程内的帧总线：管理各窗口的生产者，并提供最新帧查询"""
+
+    def __init__(self, engine, interval=0.1, max_age=0.25):
+        """
+        Args:
+            engine: GameEngine
+            interval: 每个窗口的截图间隔（秒）
+            max_age: latest() 接受的最大帧龄（秒），超过时等待一次新截图
+        """
+        self.engine = engine
+        self.interval = interval
+        self.max_age = max_age
+        self._rings = {}
+        self._producers = {}
+        self._lock = threading.Lock()
+
+    def start(self, hwnds):
+        base_w, base_h = int(self.engine.get_base_width()), int(self.engine.get_base_height())
+        with self._lock:
+            for hwnd in hwnds:
+                if hwnd in self._producers:
+                    continue
+                try:
+                    ring = FrameRing(hwnd, base_w, base_h, create=True)
+                except (OSError, ValueError) as e:
+                    # 该窗口不走总线，检测方回退到直接截图
+                    log.error(hwnd, "[帧总线] 创建共享内存失败: %s", e)
+                    continue
+                producer = FrameProducer(hwnd, self.engine, ring, self.interval)
+                self._rings[hwnd] = ring
+                self._producers[hwnd] = producer
+                producer.start()
+        log.info(0, "[帧总线] 已启动 %s 个窗口的截图生产者，间隔 %ss", len(hwnds), self.interval)
+
+    def remove(self, hwnd):
+        with self._lock:
+            producer = self._producers.pop(hwnd, None)
+            ring = self._rings.pop(hwnd, None)
+        if producer:
+            producer.stop()
+        if ring:
+            ring.close()
+
+    def stop(self):
+        for hwnd in list(self._producers):
+            self.remove(hwnd)
+
+    def has(self, hwnd):
+        return hwnd in self._rings
+
+    def latest(self, hwnd, max_age=None):
+        """
+        最新一帧的元数据，帧龄超过 max_age 时唤醒生产者并等待至多一个截图周期；
+        该窗口不在总线上或始终拿不到新帧时返回 None，调用方应回退到直接截图
+        """
+        ring = self._rings.get(hwnd)
+        if ring is None:
+            return None
+        max_age = self.max_age if max_age is None else max_age
+        ref = ring.latest()
+        if ref is not None and ref.age <= max_age:
+            return ref
+        producer = self._producers.get(hwnd)
+        if producer is None:
+            return None
+        producer.request()
+        deadline = time.monotonic() + max(self.interval, 0.05) + 2.0   # 截图本身最多 2 秒超时
+        old_seq = ref.seq if ref is not None else 0
+        while time.monotonic() < deadline:
+            time.sleep(0.005)
+            ref = ring.latest()
+            if ref is not None and ref.seq != old_seq:
+                return ref
+        return None
+
+    def snapshot(self, hwnd, buffer, max_age=None):
+        """足够新的最新一帧复制到 buffer(shape) 返回的数组，拿不到时返回 None"""
+        ring = self._rings.get(hwnd)
+        if ring is None or self.latest(hwnd, max_age) is None:
+            return None
+        return ring.snapshot(buffer)
+
+    def stats(self):
+        return {hwnd: {"captures": p.captures, "failures": p.failures} for hwnd, p in self._producers.items()}
+
+
+def attach(hwnd):
+    """其他进程按窗口句柄挂接已存在的环形缓冲（只读）"""
+    return FrameRing(hwnd, create=False)
+
+
+class FrameBusClient:
+    """其他进程里的只读端：按需挂接各窗口的环形缓冲，接口与 FrameBus 一致（供 GameEngine._frame_bus 使用）
+
+    不能唤醒生产者：帧过旧或窗口不在总线上时返回 None，由调用方直接截图
+    """
+
+    RETRY_SEC = 5.0
+
+    def __init__(self, max_age=0.25):
+        self.max_age = max_age
+        self._rings = {}
+        self._missing = {}   # {hwnd: 下次重试挂接的时间}
+
+    def has(self, hwnd):
+        if hwnd in self._rings:
+            return True
+        if time.monotonic() < self._missing.get(hwnd, 0):
+            return False
+        try:
+            self._rings[hwnd] = attach(hwnd)
+            self._missing.pop(hwnd, None)
+            return True
+        except FileNotFoundError:
+            self._missing[hwnd] = time.monotonic() + self.RETRY_SEC
+            return False
+
+    def latest(self, hwnd, max_age=None):
+        ring = self._rings.get(hwnd)
+        if ring is None:
+            return None
+        ref = ring.latest()
+        if ref is None or ref.age > (self.max_age if max_age is None else max_age):
+            return None
+        return ref
+
+    def snapshot(self, hwnd, buffer, max_age=None):
+        ring = self._rings.get(hwnd)
+        if ring is None:
+            return None
+        ref = ring.snapshot(buffer)
+        if ref is None or ref.age > (self.max_age if max_age is None else max_age):
+            return None
+        return ref
+
+    def close(self):
+        for ring in self._rings.values():
+            ring.close()
+        self._rings.clear()
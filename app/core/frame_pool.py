@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+帧缓冲池
+截图时复用预分配的 numpy 缓冲（BGRA 原始帧 / BGR 帧 / 基准分辨率帧），
+只在窗口客户区尺寸变化时重新分配，OpenCV 通过 dst= 原地写入
+
+缓冲按 (hwnd, 调用线程, 用途) 区分：控制器和紧急监控线程同时截同一个窗口也不会互相覆盖；
+同一线程对同一窗口的下一次截图会覆盖上一帧，需要长期保留画面的调用方自行 copy()
+检测线程池（GameEngine.detect_all）的线程共用同一个 key，每个窗口同一时刻只由一个任务截图
+"""
+
+import threading
+
+import numpy as np
+
+
+class FramePool:
+    """按 key 复用的 numpy 缓冲"""
+
+    def __init__(self):
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self.allocations = 0   # 实际分配次数（尺寸变化或首次使用）
+
+    def get(self, key, shape, dtype=np.uint8):
+        """取 key 对应的缓冲，形状不符时重新分配"""
+        with self._lock:
+            buf = self._buffers.get(key)
+            if buf is None or buf.shape != shape or buf.dtype != dtype:
+                buf = np.empty(shape, dtype=dtype)
+                self._buffers[key] = buf
+                self.allocations += 1
+            return buf
+
+    def drop(self, hwnd, thread_id=None):
+        """丢弃某窗口（可限定调用线程）的全部缓冲：截图超时时卡住的线程可能仍在写入"""
+        with self._lock:
+            for key in [k for k in self._buffers if k[0] == hwnd and (thread_id is None or k[1] == thread_id)]:
+                del self._buffers[key]
+
+    def clear(self):
+        with self._lock:
+            self._buffers.clear()
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(b.nbytes for b in self._buffers.values())
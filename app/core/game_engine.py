@@ -9,15 +9,65 @@ import win32con
 import win32api
 import win32clipboard
 import ctypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.frame_pool import FramePool
+from app.core.prefilter import Prefilter
+from app.core.fingerprint import Fingerprint
+from app.core.template_registry import TemplateRegistry
+from app.core.template_bundle import TemplateBundle
+from app.core.metrics import get_metrics, timed
+from app.logger import get_logger
+
+log = get_logger()
+metrics = get_metrics()
+
+
+# 检测线程池里的线程共用一组截图缓冲：同一次 detect_all 中每个窗口只由一个任务处理，
+# 按线程区分会让缓冲数变成 线程数 x 窗口数
+_pool_owner = threading.local()
+
+
+def _init_detect_worker():
+    _pool_owner.name = "detect"
+
+
+class _BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", ctypes.c_uint32), ("biWidth", ctypes.c_int32), ("biHeight", ctypes.c_int32),
+        ("biPlanes", ctypes.c_uint16), ("biBitCount", ctypes.c_uint16), ("biCompression", ctypes.c_uint32),
+        ("biSizeImage", ctypes.c_uint32), ("biXPelsPerMeter", ctypes.c_int32), ("biYPelsPerMeter", ctypes.c_int32),
+        ("biClrUsed", ctypes.c_uint32), ("biClrImportant", ctypes.c_uint32),
+    ]
 
 
 class GameEngine:
-    _template_cache = {}
+    # 模板注册表：config.json 引用的模板启动时一次性加载（源文件未变时取 bundle 中预解码的像素），按 mtime 热重载
+    _templates = TemplateRegistry()
     _cfg_mgr = None
+    # 截图缓冲池：按窗口/线程复用帧缓冲，只在尺寸变化时重新分配
+    _frame_pool = FramePool()
+    _use_pool = True
+    # BGRA 模式：截图保留原始 BGRA 帧，不做整帧颜色转换
+    _bgra = False
+    # 帧总线：开启后各检测方从共享内存读取最新帧，不再各自截图
+    _frame_bus = None
+    # 模板预筛：按录制画面验证过的签名跳过明显不可能命中的完整匹配
+    _prefilter = None
+    # 跨窗口并行检测的有界线程池（OpenCV 匹配和截图期间释放 GIL）
+    _executor = None
+    _executor_lock = threading.Lock()
+    _max_workers = 0
     _base_width = 1920.0
     _base_height = 1080.0
 
-    def __init__(self, cfg_mgr=None):
+    def __init__(self, cfg_mgr=None, detection_only=False):
+        """
+        Args:
+            detection_only: 只做检测的进程（分片子进程）：只读映射主进程建好的模板 bundle，
+                            不检查也不重建；热重载照常（mtime 不符的条目回退到解码 PNG）
+        """
         try:
             ctypes.windll.shcore.SetProcessDpiAwareness(1)
         except:
@@ -26,6 +76,19 @@ class GameEngine:
         if cfg_mgr is not None:
             GameEngine._cfg_mgr = cfg_mgr
             GameEngine._update_resolution()
+            GameEngine._use_pool = cfg_mgr.get_config("capture.buffer_pool", True)
+            GameEngine._bgra = cfg_mgr.get_config("capture.bgra", False)
+            GameEngine._max_workers = cfg_mgr.get_config("parallel.workers", 0)
+            if cfg_mgr.get_config("template_bundle.enabled", True) and GameEngine._templates.bundle is None:
+                GameEngine._templates.bundle = TemplateBundle(
+                    os.path.join(cfg_mgr.DATA_DIR, cfg_mgr.get_config("template_bundle.file", "templates.bundle")),
+                    cfg_mgr.paths["templates"], readonly=detection_only)
+            GameEngine._templates.build(cfg_mgr)
+            if cfg_mgr.get_config("templates.hot_reload", True):
+                GameEngine._templates.start_watch(cfg_mgr.get_config("templates.watch_interval", 2.0))
+            if cfg_mgr.get_config("prefilter.enabled", False):
+                GameEngine._prefilter = Prefilter(os.path.join(
+                    cfg_mgr.DATA_DIR, cfg_mgr.get_config("prefilter.file", "prefilter.json")))
 
     @classmethod
     def _update_resolution(cls):
@@ -57,6 +120,7 @@ class GameEngine:
             return 0, 0
 
     @staticmethod
+    @timed("input", "activate")
     def activate_window(hwnd):
         """增强版窗口激活"""
         try:
@@ -120,7 +184,7 @@ class GameEngine:
                     | win32con.SWP_NOZORDER,
                 )
             except Exception as e:
-                print(f"移动窗口失败: {e}")
+                log.warn(hwnd, "移动窗口失败: %s", e)
 
     @staticmethod
     def clear_input(hwnd, x, y):
@@ -161,7 +225,7 @@ class GameEngine:
             win32api.keybd_event(win32con.VK_DELETE, 0, win32con.KEYEVENTF_KEYUP, 0)
             time.sleep(0.05)
         except Exception as e:
-            print(f"Clear Error: {e}")
+            log.error(hwnd, "Clear Error: %s", e)
 
     @staticmethod
     def type_text(hwnd, x, y, text):
@@ -172,6 +236,7 @@ class GameEngine:
         GameEngine.paste_text(hwnd, text)
 
     @staticmethod
+    @timed("input", "click")
     def click(hwnd, x, y):
         """带坐标缩放的点击"""
         try:
@@ -194,6 +259,7 @@ class GameEngine:
             pass
 
     @staticmethod
+    @timed("input", "key")
     def key_press(hwnd, vk_code):
         """
         模拟按下并松开一个虚拟键
@@ -213,7 +279,7 @@ class GameEngine:
             win32api.keybd_event(vk_code, 0, win32con.KEYEVENTF_KEYUP, 0)
             return True
         except Exception as e:
-            print(f"Key Press Error: {e}")
+            log.error(hwnd, "Key Press Error: %s", e)
             return False
 
     @staticmethod
@@ -240,11 +306,27 @@ class GameEngine:
             return False
 
     @staticmethod
-    def grab_screen(hwnd, rescale_to_base=False):
-        """后台截图 - 添加超时保护和资源清理"""
-        import threading
-        
+    def grab_screen(hwnd, rescale_to_base=False, bgra=None):
+        """后台截图 - 添加超时保护和资源清理
+
+        启用缓冲池时返回的画面是池中的缓冲：同一线程对同一窗口的下一次截图会覆盖它，
+        需要跨截图保留画面时请 copy()
+
+        Args:
+            bgra: True 返回 4 通道 BGRA（不做颜色转换），False 返回 BGR，
+                  None 跟随 capture.bgra 配置；需要保存成图片的调用方应传 False
+        """
+        if bgra is None:
+            bgra = GameEngine._bgra
+
         result = [None]
+        pool = GameEngine._frame_pool if GameEngine._use_pool else None
+        caller = getattr(_pool_owner, "name", None) or threading.get_ident()
+
+        def buffer(kind, shape):
+            if pool is None:
+                return np.empty(shape, dtype=np.uint8)
+            return pool.get((hwnd, caller, kind), shape)
         
         def capture():
             hwndDC = None
@@ -255,27 +337,30 @@ class GameEngine:
             try:
                 # 检查窗口是否有效
                 if not win32gui.IsWindow(hwnd):
-                    print(f"[截图错误] 窗口无效: {hwnd}")
+                    metrics.inc("capture_error", hwnd)
+                    log.error(hwnd, "[截图错误] 窗口无效: %s", hwnd)
                     result[0] = None
                     return
                 
                 # 检查窗口是否可见
                 if not win32gui.IsWindowVisible(hwnd):
-                    print(f"[截图警告] 窗口不可见: {hwnd}")
+                    log.warn(hwnd, "[截图警告] 窗口不可见: %s", hwnd)
                     
                 left, top, right, bot = win32gui.GetClientRect(hwnd)
                 w, h = right - left, bot - top
                 
                 # 检查窗口尺寸
                 if w <= 0 or h <= 0:
-                    print(f"[截图错误] 窗口尺寸无效: {w}x{h}")
+                    metrics.inc("capture_error", hwnd)
+                    log.error(hwnd, "[截图错误] 窗口尺寸无效: %sx%s", w, h)
                     result[0] = None
                     return
                 
                 # 分配GDI资源
                 hwndDC = win32gui.GetWindowDC(hwnd)
                 if not hwndDC:
-                    print(f"[截图错误] GetWindowDC失败")
+                    metrics.inc("capture_error", hwnd)
+                    log.error(hwnd, "[截图错误] GetWindowDC失败")
                     result[0] = None
                     return
                     
@@ -289,24 +374,38 @@ class GameEngine:
                     
                 saveBitMap = win32ui.CreateBitmap()
                 saveBitMap.CreateCompatibleBitmap(mfcDC, w, h)
-                saveDC.SelectObject(saveBitMap)
+                old_bmp = saveDC.SelectObject(saveBitMap)
                 
                 # 截图
                 ctypes.windll.user32.PrintWindow(hwnd, saveDC.GetSafeHdc(), 2)
-                bmpstr = saveBitMap.GetBitmapBits(True)
-                img = np.frombuffer(bmpstr, dtype="uint8")
-                img.shape = (h, w, 4)
+                # GetDIBits 要求位图未被选入 DC
+                saveDC.SelectObject(old_bmp)
+
+                # 位图像素直接读入复用的 BGRA 缓冲（自上而下），不再经过 bytes 中转
+                img = buffer("bgra", (h, w, 4))
+                bmi = _BITMAPINFOHEADER(ctypes.sizeof(_BITMAPINFOHEADER), w, -h, 1, 32, 0, 0, 0, 0, 0, 0)
+                lines = ctypes.windll.gdi32.GetDIBits(mfcDC.GetSafeHdc(), saveBitMap.GetHandle(), 0, h,
+                                                      img.ctypes.data, ctypes.byref(bmi), 0)
+                if lines != h:
+                    raise Exception(f"GetDIBits失败 ({lines}/{h})")
                 
-                # 处理图像
-                img_bgr = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+                # 处理图像：cvtColor / resize 原地写入池中缓冲；BGRA 模式跳过整帧颜色转换
+                if bgra:
+                    frame = img
+                else:
+                    frame = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR, dst=buffer("bgr", (h, w, 3)))
                 if rescale_to_base:
-                    base_w = GameEngine.get_base_width()
-                    base_h = GameEngine.get_base_height()
-                    img_bgr = cv2.resize(img_bgr, (int(base_w), int(base_h)))
-                result[0] = img_bgr
+                    base_w = int(GameEngine.get_base_width())
+                    base_h = int(GameEngine.get_base_height())
+                    if (w, h) != (base_w, base_h):
+                        channels = frame.shape[2]
+                        frame = cv2.resize(frame, (base_w, base_h),
+                                           dst=buffer(f"base{channels}", (base_h, base_w, channels)))
+                result[0] = frame
                 
             except Exception as e:
-                print(f"[截图错误] {e}")
+                metrics.inc("capture_error", hwnd)
+                log.error(hwnd, "[截图错误] %s", e)
                 result[0] = None
             finally:
                 # 确保所有GDI资源被释放
@@ -332,80 +431,287 @@ class GameEngine:
                     pass
         
         # 使用线程防止PrintWindow卡住
-        t = threading.Thread(target=capture)
-        t.daemon = True
-        t.start()
-        t.join(timeout=2.0)  # 2秒超时
+        with metrics.span("capture", hwnd):
+            t = threading.Thread(target=capture, name="capture")
+            t.daemon = True
+            t.start()
+            t.join(timeout=2.0)  # 2秒超时
         
         if t.is_alive():
-            print(f"[警告] 截图超时，窗口可能无响应 (hwnd: {hwnd})")
+            metrics.inc("capture_timeout", hwnd)
+            # 卡住的截图线程之后仍可能写入这些缓冲，下一次截图改用新缓冲
+            if pool is not None:
+                pool.drop(hwnd, caller)
+            log.warn(hwnd, "[警告] 截图超时，窗口可能无响应 (hwnd: %s)", hwnd)
             return None
         
         return result[0]
 
+    @staticmethod
+    def load_template(img_path):
+        """从模板注册表取 3 通道 BGR 模板（配置引用的模板已预加载），失败返回 None"""
+        data = GameEngine._templates.load(img_path)
+        return data.image if data is not None else None
+
+    @staticmethod
+    def load_template_bgra(img_path):
+        """模板的 4 通道版本（加载时转换一次），用于直接在 BGRA 画面上匹配
+
+        alpha 通道在模板和画面中都是常量，TM_CCOEFF_NORMED 去均值后该通道贡献为 0，
+        匹配分数与 3 通道一致
+        """
+        data = GameEngine._templates.load(img_path)
+        return data.bgra if data is not None else None
+
+    @staticmethod
+    def template(name):
+        """按逻辑名（config.json 中的键路径，如 room_management_img）取 Template，不存在时返回 None"""
+        return GameEngine._templates.get(name)
+
+    @staticmethod
+    def roi_to_xywh(roi):
+        """ROI 统一转换为 (x, y, w, h)
+        支持两种格式：[x, y, width, height] 或 [x1, y1, x2, y2]
+        """
+        if not roi or len(roi) != 4:
+            return None
+        # 判断格式：如果第3个值 > 第1个值 且 第4个值 > 第2个值，则是 (x1, y1, x2, y2) 格式
+        if roi[2] > roi[0] and roi[3] > roi[1]:
+            x, y, x2, y2 = roi
+            return x, y, x2 - x, y2 - y
+        return tuple(roi)
+
     @staticmethod
     def match_template(hwnd, img_path, threshold=0.75, roi=None):
-        if not img_path or not os.path.exists(img_path):
+        template = GameEngine.load_template(img_path)
+        if template is None:
             return (False, 0.0, None)
 
-        # 1. 缓存加载并强制转为 3 通道 BGR
-        if img_path not in GameEngine._template_cache:
-            tmpl = cv2.imread(img_path, cv2.IMREAD_COLOR) # 强制 3 通道
-            if tmpl is None: 
-                return (False, 0.0, None)
-            GameEngine._template_cache[img_path] = tmpl
+        screen = GameEngine.current_frame(hwnd)
+        return GameEngine.match_in_frame(screen, img_path, threshold, roi)
+
+    @staticmethod
+    def current_frame(hwnd):
+        """基准分辨率的当前画面：帧总线上有足够新的帧时复制到截图缓冲池（与 grab_screen 相同的复用规则），否则现截一张"""
+        bus = GameEngine._frame_bus
+        if bus is not None and bus.has(hwnd):
+            caller = getattr(_pool_owner, "name", None) or threading.get_ident()
+            if GameEngine._use_pool:
+                buffer = lambda shape: GameEngine._frame_pool.get((hwnd, caller, "bus"), shape)
+            else:
+                buffer = lambda shape: np.empty(shape, dtype=np.uint8)
+            ref = bus.snapshot(hwnd, buffer)
+            if ref is not None:
+                metrics.inc("frame_bus", "hit")
+                return ref.frame
+            metrics.inc("frame_bus", "miss")
+        return GameEngine.grab_screen(hwnd, rescale_to_base=True)
 
-        template = GameEngine._template_cache[img_path]
-        screen = GameEngine.grab_screen(hwnd, rescale_to_base=True)
+    @staticmethod
+    def match_in_frame(screen, img_path, threshold=0.75, roi=None):
+        """在已截好的基准分辨率画面上匹配模板（一帧可复用于多次匹配）"""
+        template = GameEngine.load_template(img_path)
+        if template is None or screen is None or screen.size == 0:
+            return (False, 0.0, None)
 
-        if screen is None or screen.size == 0:
+        # 1. 应用ROI区域搜索（切片是视图，不复制）
+        rect = GameEngine.roi_to_xywh(roi)
+        if GameEngine._reject(img_path, template, screen, rect, threshold):
             return (False, 0.0, None)
+        if rect:
+            x, y, w, h = rect
+            screen = screen[y:y+h, x:x+w]
 
-        # 2. 【关键修复】确保 screen 也是 3 通道（有时 PrintWindow 会产生异常格式）
+        # 2. 【关键修复】确保 screen 与模板通道一致（有时 PrintWindow 会产生异常格式）
         if len(screen.shape) == 2: # 灰度图转 BGR
             screen = cv2.cvtColor(screen, cv2.COLOR_GRAY2BGR)
-        elif screen.shape[2] == 4: # BGRA 转 BGR
-            screen = cv2.cvtColor(screen, cv2.COLOR_BGRA2BGR)
-
-        # 3. 应用ROI区域搜索
-        # 支持两种格式：[x, y, width, height] 或 [x1, y1, x2, y2]
-        if roi and len(roi) == 4:
-            # 判断格式：如果第3个值 > 第1个值 且 第4个值 > 第2个值，则是 (x1, y1, x2, y2) 格式
-            if roi[2] > roi[0] and roi[3] > roi[1]:
-                # [x1, y1, x2, y2] 格式
-                x, y, x2, y2 = roi
-                w, h = x2 - x, y2 - y
+        elif screen.shape[2] == 4:
+            if rect:
+                # BGRA 画面带 ROI：只转换 ROI 这一小块
+                screen = cv2.cvtColor(screen, cv2.COLOR_BGRA2BGR)
             else:
-                # [x, y, width, height] 格式
-                x, y, w, h = roi
-            screen = screen[y:y+h, x:x+w]
+                # 整帧匹配：换用 4 通道模板，画面不做转换
+                template = GameEngine.load_template_bgra(img_path)
 
-        # 4. 尺寸校验：如果模板比屏幕还大，直接返回（防止 OpenCV 崩溃）
+        # 3. 尺寸校验：如果模板比屏幕还大，直接返回（防止 OpenCV 崩溃）
         if screen.shape[0] < template.shape[0] or screen.shape[1] < template.shape[1]:
             return (False, 0.0, None)
 
         max_val = 0.0
         try:
-            res = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(res)
+            with metrics.span("match", os.path.basename(img_path)):
+                res = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+                _, max_val, _, max_loc = cv2.minMaxLoc(res)
             if max_val >= threshold:
                 h, w = template.shape[:2]
                 center_x = max_loc[0] + w // 2
                 center_y = max_loc[1] + h // 2
                 
                 # 如果使用了ROI，需要转换回全屏坐标
-                if roi and len(roi) == 4:
-                    center_x += roi[0]
-                    center_y += roi[1]
+                if rect:
+                    center_x += rect[0]
+                    center_y += rect[1]
                     
                 return (True, max_val, (center_x, center_y))
         except Exception as e:
             # 捕获 C++ 层的各种 OpenCV 异常
-            print(f"Match Error [{os.path.basename(img_path)}]: {e}")
+            log.error(0, "Match Error [%s]: %s", os.path.basename(img_path), e)
             
         return (False, max_val, None)
 
 
+    @staticmethod
+    def probe(hwnd, fingerprint, screen=None):
+        """
+        像素指纹检测：在当前画面（帧总线上的缓存帧或现截一张）上读几个像素判断是否为某个画面，耗时远低于模板匹配
+
+        Args:
+            fingerprint: Fingerprint 或 config.json 中的指纹定义 {"probes": [[x, y, "#RRGGBB", tol], ...]}
+            screen: 可选，已取好的基准分辨率画面
+        """
+        if not isinstance(fingerprint, Fingerprint):
+            fingerprint = Fingerprint.from_config("", fingerprint)
+            if fingerprint is None:
+                return False
+        if screen is None:
+            screen = GameEngine.current_frame(hwnd)
+        return fingerprint.matches(screen)
+
+    @staticmethod
+    def _reject(img_path, template, screen, rect, threshold):
+        """预筛：签名表明模板不可能出现时返回 True（跳过完整匹配）"""
+        prefilter = GameEngine._prefilter
+        if prefilter is None or not prefilter.reject(img_path, template, screen, rect, threshold):
+            return False
+        metrics.inc("prefilter_reject", os.path.basename(img_path))
+        return True
+
+    @staticmethod
+    def match_batch(hwnds, img_path, threshold=0.75, roi=None, frames=None):
+        """
+        同一模板在多个窗口上一次匹配：各窗口的 ROI 裁剪后纵向拼成一张 mosaic，只调用一次 matchTemplate，
+        再在结果图上按每块的有效区域（模板完全落在该块内的位置）分别取最大值，得分与逐窗口匹配一致
+
+        Args:
+            hwnds: 窗口句柄列表
+            frames: 可选 {hwnd: 基准分辨率画面}，同一 tick 内多次批量匹配时复用，缺省时按窗口取当前画面
+        Returns:
+            {hwnd: (是否命中, 得分, 全屏中心坐标或 None)}
+        """
+        miss = (False, 0.0, None)
+        results = {hwnd: miss for hwnd in hwnds}
+        template = GameEngine.load_template(img_path)
+        if template is None or not hwnds:
+            return results
+        th, tw = template.shape[:2]
+        rect = GameEngine.roi_to_xywh(roi)
+
+        # 1. 裁剪：切片是视图，不复制；比模板小的块直接判为未命中
+        crops = []
+        screens = {}
+        for hwnd in hwnds:
+            screen = frames.get(hwnd) if frames is not None else GameEngine.current_frame(hwnd)
+            if screen is None or screen.size == 0:
+                continue
+            screens[hwnd] = screen
+            if GameEngine._reject(img_path, template, screen, rect, threshold):
+                continue
+            if rect:
+                x, y, w, h = rect
+                screen = screen[y:y+h, x:x+w]
+            if screen.shape[0] >= th and screen.shape[1] >= tw:
+                crops.append((hwnd, screen))
+        if not crops:
+            return results
+        if len(crops) == 1:
+            hwnd = crops[0][0]
+            results[hwnd] = GameEngine.match_in_frame(screens[hwnd], img_path, threshold, roi)
+            return results
+
+        # 2. 纵向拼接为 BGR mosaic（BGRA / 灰度块在写入时转换，不产生中间数组）
+        height = sum(c.shape[0] for _, c in crops)
+        width = max(c.shape[1] for _, c in crops)
+        shape = (height, width, 3)
+        if GameEngine._use_pool:
+            owner = getattr(_pool_owner, "name", None) or threading.get_ident()
+            mosaic = GameEngine._frame_pool.get(("mosaic", owner, "bgr"), shape)
+        else:
+            mosaic = np.empty(shape, dtype=np.uint8)
+        offsets = []
+        y0 = 0
+        for hwnd, crop in crops:
+            h, w = crop.shape[:2]
+            tile = mosaic[y0:y0+h, :w]
+            if crop.ndim == 2:
+                cv2.cvtColor(crop, cv2.COLOR_GRAY2BGR, dst=tile)
+            elif crop.shape[2] == 4:
+                cv2.cvtColor(crop, cv2.COLOR_BGRA2BGR, dst=tile)
+            else:
+                tile[...] = crop
+            offsets.append((hwnd, y0, h, w))
+            y0 += h
+
+        # 3. 一次匹配，按块映射回各窗口
+        try:
+            with metrics.span("match_batch", os.path.basename(img_path)):
+                res = cv2.matchTemplate(mosaic, template, cv2.TM_CCOEFF_NORMED)
+        except Exception as e:
+            log.error(0, "Batch Match Error [%s]: %s", os.path.basename(img_path), e)
+            return results
+        for hwnd, y0, h, w in offsets:
+            # 只取模板完全落在本块内的位置，跨块和右侧补齐区域的得分不计
+            _, max_val, _, max_loc = cv2.minMaxLoc(res[y0:y0 + h - th + 1, :w - tw + 1])
+            if max_val >= threshold:
+                cx, cy = max_loc[0] + tw // 2, max_loc[1] + th // 2
+                if rect:
+                    cx += rect[0]
+                    cy += rect[1]
+                results[hwnd] = (True, max_val, (cx, cy))
+            else:
+                results[hwnd] = (False, max_val, None)
+        return results
+
+    @staticmethod
+    def executor():
+        """共享的检测线程池（首次使用时创建），workers 为 0 时按 CPU 核数"""
+        with GameEngine._executor_lock:
+            if GameEngine._executor is None:
+                workers = GameEngine._max_workers or min(os.cpu_count() or 4, 16)
+                GameEngine._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="detect",
+                                                          initializer=_init_detect_worker)
+            return GameEngine._executor
+
+    @staticmethod
+    def shutdown_executor():
+        with GameEngine._executor_lock:
+            if GameEngine._executor is not None:
+                GameEngine._executor.shutdown(wait=False)
+                GameEngine._executor = None
+
+    @staticmethod
+    def detect_all(windows, plan):
+        """
+        按窗口并行执行检测计划，一个 tick 的耗时从 N 个窗口之和降到约一个窗口
+
+        Args:
+            windows: [(hwnd, state), ...]，同一窗口只能出现一次
+            plan: DetectionPlan
+        Returns:
+            {hwnd: 命中的探针或 None}；单个窗口检测异常时记录日志并视为未命中
+        """
+        if len(windows) <= 1:
+            return {hwnd: plan.detect(hwnd, state) for hwnd, state in windows}
+        pool = GameEngine.executor()
+        futures = [(hwnd, pool.submit(plan.detect, hwnd, state)) for hwnd, state in windows]
+        hits = {}
+        for hwnd, future in futures:
+            try:
+                hits[hwnd] = future.result()
+            except Exception as e:
+                log.error(hwnd, "[并行检测] 窗口 %s 检测异常: %s", hwnd, e)
+                hits[hwnd] = None
+        return hits
+
     @staticmethod
     def ctrl_a_c(hwnd):
         """模拟全选和复制"""
@@ -474,5 +780,5 @@ class GameEngine:
             self.key_press(hwnd, win32con.VK_RETURN)
             return True
         except Exception as e:
-            print(f"盲打登录失败: {e}")
+            log.error(hwnd, "盲打登录失败: %s", e)
             return False
\ No newline at end of file
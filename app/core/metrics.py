@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+运行指标
+热路径上的计数器和耗时直方图（截图、模板匹配、输入、FSM 单窗口处理、调度 tick），
+按标签（模板名 / 窗口句柄 / FSM 状态）分组；关闭时每个埋点只有一次属性判断
+
+用法:
+    metrics = get_metrics()
+    with metrics.span("capture", hwnd):
+        ...
+    metrics.inc("capture_timeout", hwnd)
+
+    python -m app.core.metrics            # 查看最近一次导出的 metrics.json
+"""
+
+import os
+import time
+import functools
+import threading
+
+from app.core.persistence import atomic_write_json
+
+# 直方图桶上界（毫秒），最后一个桶为 +Inf
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class Histogram:
+    """固定桶直方图（毫秒）"""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def observe(self, ms):
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                return
+        self.buckets[-1] += 1
+
+    def quantile(self, q):
+        """按桶估算分位数（取所在桶的上界，不超过最大值）"""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total, 3),
+            "avg_ms": round(self.total / self.count, 3) if self.count else None,
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "buckets": self.buckets[:],
+        }
+
+
+class _NullSpan:
+    """关闭时共用的空计时器"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "label", "t0")
+
+    def __init__(self, metrics, name, label):
+        self.metrics = metrics
+        self.name = name
+        self.label = label
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, self.label, (time.perf_counter() - self.t0) * 1000.0)
+        return False
+
+
+class Metrics:
+    """计数器 + 直方图，键为 (指标名, 标签)"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self.dump_path = None
+        self.dump_interval = 0
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._dump_thread = None
+
+    # ------------------ 配置 ------------------
+
+    def configure(self, enabled=None, dump_path=None, dump_interval=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if dump_path is not None:
+            self.dump_path = dump_path
+        if dump_interval is not None:
+            self.dump_interval = dump_interval
+        if self.enabled and self.dump_path and self.dump_interval > 0 and self._dump_thread is None:
+            self._dump_thread = threading.Thread(target=self._dump_loop, name="metrics-dump", daemon=True)
+            self._dump_thread.start()
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+        self.started_at = time.time()
+
+    # ------------------ 埋点 ------------------
+
+    def span(self, name, label=""):
+        """计时上下文：with metrics.span("match", "start_btn.png"): ..."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, label)
+
+    def inc(self, name, label="", n=1):
+        if not self.enabled:
+            return
+        key = (name, label)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, name, label, ms):
+        if not self.enabled:
+            return
+        key = (name, label)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(ms)
+
+    # ------------------ 导出 ------------------
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {"enabled", "started_at", "uptime_sec",
+                   "counters": {name: {label: n}},
+                   "histograms": {name: {label: {count, sum_ms, avg_ms, max_ms, p50_ms, p95_ms, buckets}}},
+                   "buckets_ms": [...]}
+        """
+        counters, histograms = {}, {}
+        with self._lock:
+            for (name, label), n in self._counters.items():
+                counters.setdefault(name, {})[str(label)] = n
+            for (name, label), hist in self._histograms.items():
+                histograms.setdefault(name, {})[str(label)] = hist.to_dict()
+        return {
+            "enabled": self.enabled,
+            "started_at": self.started_at,
+            "uptime_sec": round(time.time() - self.started_at, 1),
+            "counters": counters,
+            "histograms": histograms,
+            "buckets_ms": list(BUCKETS_MS),
+        }
+
+    def dump(self, path=None):
+        """把当前快照写成 JSON（原子替换）"""
+        path = path or self.dump_path
+        if not path:
+            return None
+        atomic_write_json(path, self.snapshot())
+        return path
+
+    def _dump_loop(self):
+        while True:
+            time.sleep(max(self.dump_interval, 1))
+            if self.enabled:
+                try:
+                    self.dump()
+                except Exception:
+                    pass
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """进程内唯一的指标实例"""
+    return _metrics
+
+
+def timed(name, label=""):
+    """函数耗时埋点装饰器：关闭时直接调用原函数"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _metrics.enabled:
+                return fn(*args, **kwargs)
+            with _Span(_metrics, name, label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def configure_metrics(cfg_mgr):
+    """
+    按 config.json 的 "metrics" 段开启指标
+
+        {"enabled": false, "dump_interval": 60, "dump_file": "metrics.json"}
+    """
+    m_cfg = cfg_mgr.get_config("metrics", {}) or {}
+    dump_file = m_cfg.get("dump_file", "metrics.json")
+    if not os.path.isabs(dump_file):
+        dump_file = os.path.join(cfg_mgr.DATA_DIR, dump_file)
+    _metrics.configure(enabled=m_cfg.get("enabled", False), dump_path=dump_file,
+                       dump_interval=m_cfg.get("dump_interval", 60))
+    return _metrics
+
+
+def format_snapshot(snap, top=15):
+    """快照的文本形式：每个直方图按总耗时取前 top 个标签"""
+    lines = [f"运行 {snap['uptime_sec']:.0f}s"]
+    for name, labels in sorted(snap["histograms"].items()):
+        lines.append(f"[{name}]")
+        rows = sorted(labels.items(), key=lambda kv: kv[1]["sum_ms"], reverse=True)[:top]
+        for label, h in rows:
+            lines.append(f"  {label or '-'}: {h['count']} 次 | 平均 {h['avg_ms']}ms | "
+                         f"p95 {h['p95_ms']}ms | 最大 {h['max_ms']}ms | 合计 {h['sum_ms'] / 1000:.1f}s")
+    for name, labels in sorted(snap["counters"].items()):
+        lines.append(f"[{name}] " + ", ".join(f"{label or '-'}={n}" for label, n in sorted(labels.items())))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    from app.core.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="查看导出的运行指标")
+    parser.add_argument("--json", action="store_true", help="输出原始 JSON")
+    parser.add_argument("--top", type=int, default=15, help="每项最多显示多少个标签")
+    args = parser.parse_args()
+
+    cfg = ConfigManager()
+    path = configure_metrics(cfg).dump_path
+    if not os.path.exists(path):
+        print(f"没有找到指标文件: {path}（需在 config.json 中开启 metrics.enabled）")
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        print(json.dumps(data, ensure_ascii=False, indent=2) if args.json else format_snapshot(data, args.top))
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+持久化工具
+原子写 JSON（先写临时文件再替换），以及合并写入的后台写盘线程
+"""
+
+import os
+import json
+import time
+import threading
+
+from app.logger import get_logger
+
+log = get_logger()
+
+
+def atomic_write_json(path, data, indent=4):
+    """原子写入 JSON：写临时文件 -> fsync -> 替换，崩溃时不会留下半截文件"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class WriteBehind:
+    """写后持久化：mark_dirty 只做标记，后台线程在 delay 秒内把多次修改合并为一次写盘"""
+
+    def __init__(self, flush_fn, delay=1.0, name="write-behind"):
+        """
+        Args:
+            flush_fn: 无参函数，负责取当前快照并写盘
+            delay: 合并窗口（秒），从第一次标记开始计算，保证最长延迟
+            name: 后台线程名
+        """
+        self._flush_fn = flush_fn
+        self._delay = delay
+        self._cond = threading.Condition()
+        # 写盘串行：后台线程取完快照后被抢占时，同步 flush（如清空 Session）必须等它写完再写，
+        # 否则延迟写入的旧快照会覆盖较新的结果
+        self._flush_lock = threading.Lock()
+        self._dirty_since = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self):
+        with self._cond:
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+                self._cond.notify()
+
+    def flush(self):
+        """立即同步写盘（退出或需要立刻可见时调用）"""
+        with self._cond:
+            self._dirty_since = None
+        self._safe_flush()
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            pending = self._dirty_since is not None
+            self._dirty_since = None
+            self._cond.notify()
+        if pending:
+            self._safe_flush()
+
+    def _safe_flush(self):
+        with self._flush_lock:
+            try:
+                self._flush_fn()
+            except Exception as e:
+                # 写盘失败不阻塞主流程
+                log.error(0, "[持久化] 写入失败: %s", e)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._dirty_since is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                remaining = self._delay - (time.monotonic() - self._dirty_since)
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                self._dirty_since = None
+            self._safe_flush()
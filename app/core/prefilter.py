@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+模板预筛
+绝大多数 match_template 都不会命中（紧急弹窗几乎不出现，大厅里登录模板永远不会匹配），
+在做完整 NCC 之前先用模板签名做几微秒的检查，明显不可能命中时直接返回未命中：
+
+- 像素探针：模板里 9 个最有辨识度的像素，在录制画面中学到的固定位置上比对颜色，
+  超过 max_fail 个探针不符即判定不在（只用于位置固定的界面元素）
+- 颜色直方图：模板的粗粒度 BGR 直方图（每通道 8 档）被搜索区域"包含"的比例，
+  搜索区域包含模板时比例接近 1；只用于 ROI 不超过 HIST_MAX_PIXELS 的小区域（按像素精确计数）
+
+每个模板是否启用、容差多少，都由 validate_prefilter.py 在录制画面上验证后写入 prefilter.json：
+录制画面中所有 NCC 达到验证阈值的样本都必须通过预筛，否则该项不启用；
+调用阈值低于验证阈值时不做预筛。验证只覆盖录制中模板出现的位置（规则里的 box），
+搜索区域不完整包含 box 时（如 read_roster 按槽位逐个匹配）不做预筛
+"""
+
+import os
+import json
+
+import numpy as np
+
+from app.logger import get_logger
+
+log = get_logger()
+
+HIST_SHIFT = 5            # 256 >> 5 = 每通道 8 档
+HIST_BINS = 512
+HIST_MAX_PIXELS = 262144  # 直方图只在不超过该面积的 ROI 上计算
+PROBE_GRID = 3            # 模板切成 3x3 块，每块取一个探针
+
+
+def color_hist(img):
+    """BGR(A) 图像的粗粒度颜色直方图（像素计数）"""
+    q = img[..., :3] >> HIST_SHIFT
+    idx = (q[..., 0].astype(np.int32) << 6) | (q[..., 1].astype(np.int32) << 3) | q[..., 2]
+    return np.bincount(idx.ravel(), minlength=HIST_BINS)
+
+
+def containment(region_hist, tmpl_hist):
+    """模板直方图被区域直方图覆盖的比例（区域包含模板时为 1，颜色噪声会让它略低）"""
+    total = tmpl_hist.sum()
+    if total == 0:
+        return 1.0
+    return float(np.minimum(region_hist, tmpl_hist).sum()) / float(total)
+
+
+def pick_probes(template):
+    """每个网格块里取与模板平均色差最大的像素，返回 [(dx, dy, (b, g, r)), ...]"""
+    bgr = template[..., :3].astype(np.int32)
+    h, w = bgr.shape[:2]
+    mean = bgr.reshape(-1, 3).mean(axis=0)
+    dist = np.abs(bgr - mean).sum(axis=2)
+    probes = []
+    for gy in range(PROBE_GRID):
+        for gx in range(PROBE_GRID):
+            y0, y1 = h * gy // PROBE_GRID, h * (gy + 1) // PROBE_GRID
+            x0, x1 = w * gx // PROBE_GRID, w * (gx + 1) // PROBE_GRID
+            if y1 <= y0 or x1 <= x0:
+                continue
+            cell = dist[y0:y1, x0:x1]
+            cy, cx = np.unravel_index(int(cell.argmax()), cell.shape)
+            y, x = y0 + int(cy), x0 + int(cx)
+            probes.append((x, y, tuple(int(v) for v in bgr[y, x])))
+    return probes
+
+
+def probe_failures(screen, loc, probes, tol):
+    """探针在画面 loc（模板左上角）处颜色不符的个数；越界的探针计为不符"""
+    lx, ly = loc
+    h, w = screen.shape[:2]
+    fails = 0
+    for dx, dy, color in probes:
+        x, y = lx + dx, ly + dy
+        if not (0 <= x < w and 0 <= y < h):
+            fails += 1
+            continue
+        px = screen[y, x]
+        if max(abs(int(px[0]) - color[0]), abs(int(px[1]) - color[1]), abs(int(px[2]) - color[2])) > tol:
+            fails += 1
+    return fails
+
+
+def _contains(rect, box):
+    """搜索区域 rect 是否完整包含 box（都是 x, y, w, h）"""
+    return (rect[0] <= box[0] and rect[1] <= box[1]
+            and box[0] + box[2] <= rect[0] + rect[2] and box[1] + box[3] <= rect[1] + rect[3])
+
+
+class TemplateSignature:
+    """模板签名：探针 + 直方图，按模板内容计算（工具和运行时共用同一算法）"""
+
+    __slots__ = ("probes", "hist")
+
+    def __init__(self, template):
+        self.probes = pick_probes(template)
+        self.hist = color_hist(template)
+
+
+class Prefilter:
+    """运行时预筛：只对 prefilter.json 中验证通过的模板生效"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rules = {}
+        self._signatures = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            log.warn(0, "[预筛] 未找到 %s，请先运行 validate_prefilter.py", self.path)
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            log.error(0, "[预筛] 读取 %s 失败: %s", self.path, e)
+            return
+        self.rules = data.get("templates", {})
+        log.info(0, "[预筛] 已加载 %s 个模板的预筛规则", len(self.rules))
+
+    def reject(self, img_path, template, screen, rect, threshold):
+        """
+        是否可以跳过完整匹配
+
+        Args:
+            template: 已加载的 BGR 模板
+            screen: 基准分辨率的整帧画面（未裁剪）
+            rect: (x, y, w, h) 搜索区域，None 表示整帧
+            threshold: 本次调用的匹配阈值
+        """
+        rule = self.rules.get(os.path.basename(img_path))
+        if rule is None or threshold < rule.get("threshold", 1.0) or screen.ndim != 3:
+            return False
+        box = rule.get("box")
+        if box is None and rule.get("probe"):
+            # 旧版规则文件没有 box：按探针位置 + 模板尺寸
+            box = list(rule["probe"]["loc"]) + [template.shape[1], template.shape[0]]
+        if box is None or not _contains(rect or (0, 0, screen.shape[1], screen.shape[0]), box):
+            return False
+
+        cached = self._signatures.get(img_path)
+        if cached is None or cached[0] is not template:
+            # 模板热重载后图像对象会变，签名随之重算
+            cached = self._signatures[img_path] = (template, TemplateSignature(template))
+        sig = cached[1]
+
+        probe = rule.get("probe")
+        if probe and probe_failures(screen, probe["loc"], sig.probes, probe["tol"]) > probe["max_fail"]:
+            return True
+
+        hist_min = rule.get("hist_min")
+        if hist_min and rect and rect[2] * rect[3] <= HIST_MAX_PIXELS:
+            x, y, w, h = rect
+            region = screen[y:y+h, x:x+w]
+            if region.size and containment(color_hist(region), sig.hist) < hist_min:
+                return True
+        return False
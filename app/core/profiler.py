@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+采样分析器
+在运行中的进程里按固定间隔采样所有线程的调用栈（sys._current_frames），
+不需要用 cProfile 重启；结果写成 collapsed stack 格式（flamegraph.pl / speedscope 可直接打开）：
+
+    controller;task_controller.py:start_monitor;task_controller.py:_process_fsm;... 123
+
+输出目录 app/data/profiles/，由热键或界面按钮启停
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from collections import Counter
+
+from app.logger import get_logger
+
+log = get_logger()
+
+# Thread-12 (capture) -> capture，同类线程合并为一个根节点
+_THREAD_NAME = re.compile(r"^Thread-\d+(?: \((.+)\))?$")
+
+
+def _thread_label(name):
+    m = _THREAD_NAME.match(name)
+    if m:
+        return m.group(1) or "Thread"
+    return name
+
+
+class SamplingProfiler:
+    """后台线程定时采样，stop 或到时后写出结果"""
+
+    def __init__(self, out_dir, interval=0.005, max_depth=64):
+        """
+        Args:
+            out_dir: 输出目录
+            interval: 采样间隔（秒）
+            max_depth: 每个栈最多保留的帧数（从叶子往上）
+        """
+        self.out_dir = out_dir
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self.sample_count = 0
+        self.last_path = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration=30.0):
+        if self.running:
+            return False
+        self.samples.clear()
+        self.sample_count = 0
+        self._stop.clear()
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, args=(duration,), name="profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """提前结束采样（结果由采样线程写出）"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        return self.last_path
+
+    def _run(self, duration):
+        me = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                self.samples[self._collapse(names.get(ident, str(ident)), frame)] += 1
+            self.sample_count += 1
+            time.sleep(self.interval)
+        self.last_path = self._write()
+
+    def _collapse(self, thread_name, frame):
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        stack.append(_thread_label(thread_name))
+        return ";".join(reversed(stack))
+
+    def _write(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(self._started_at))
+        path = os.path.join(self.out_dir, f"profile_{stamp}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in self.samples.most_common():
+                f.write(f"{stack} {n}\n")
+        elapsed = time.time() - self._started_at
+        log.info(0, "[性能采样] 完成 %.1fs / %s 次采样 -> %s", elapsed, self.sample_count, path)
+        return path
+
+
+_profiler = None
+
+
+def toggle_profiler(cfg_mgr):
+    """开始或提前结束一次采样（热键和界面按钮共用），返回是否开始了新的采样"""
+    global _profiler
+    prof_cfg = cfg_mgr.get_config("profiler", {}) or {}
+    if _profiler is not None and _profiler.running:
+        log.info(0, "[性能采样] 手动停止，正在写出结果...")
+        threading.Thread(target=_profiler.stop, daemon=True).start()
+        return False
+    _profiler = SamplingProfiler(os.path.join(cfg_mgr.DATA_DIR, "profiles"),
+                                 interval=prof_cfg.get("interval_ms", 5) / 1000.0)
+    duration = prof_cfg.get("duration", 30)
+    _profiler.start(duration)
+    log.info(0, "[性能采样] 开始，%s 秒后自动结束（再按一次提前结束）", duration)
+    return True
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+任务进度服务
+进程内唯一的每日进度来源：持有各模式完成局数与目标，
+变更时主动推送给订阅者（UI / 工作线程 / 日志），计数按行写入状态库
+"""
+
+import threading
+from datetime import datetime
+
+from app.logger import get_logger
+
+log = get_logger()
+
+
+class ProgressService:
+    """每日任务进度（替代各处轮询 switcher_state.json 和独立的 mode_counts.json）"""
+
+    def __init__(self, config_manager, store):
+        """
+        Args:
+            config_manager: ConfigManager 实例（读取目标局数配置）
+            store: StateStore 实例（progress 表按日期保存，历史天数保留）
+        """
+        self.cfg = config_manager
+        self.store = store
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self.state = self._load_and_check_daily_reset()
+
+    # ------------------ 持久化 ------------------
+
+    def _default_state(self):
+        return {
+            "update_date": datetime.now().strftime("%Y-%m-%d"),
+            "current_mode": "mode_item",
+            # 使用字典记录每个模式的今日完成数
+            "daily_progress": {m["id"]: 0 for m in self.cfg.get_config("mode_configs", [])}
+        }
+
+    def _load_and_check_daily_reset(self):
+        """加载今天的进度，并检查是否是新的一天"""
+        state = self._default_state()
+        today = state["update_date"]
+        try:
+            # === 核心逻辑：日期比对（旧日期的记录保留在库中，今天从 0 开始）===
+            last_date = self.store.get_meta("progress_date", "")
+            if last_date != today:
+                if last_date:
+                    log.info(0, "📅 [新的一天] 检测到日期变更 (%s -> %s)，计数器已重置。", last_date, today)
+                self.store.set_meta("progress_date", today)
+                self.store.set_meta("current_mode", state["current_mode"])
+            else:
+                state["current_mode"] = self.store.get_meta("current_mode", state["current_mode"])
+
+            state["daily_progress"].update(self.store.get_progress(today))
+        except Exception as e:
+            log.error(0, "[进度] 读取状态库失败: %s", e)
+        return state
+
+    # ------------------ 订阅 ------------------
+
+    def subscribe(self, callback, replay=True):
+        """
+        订阅进度变化，callback(snapshot) 在修改进度的线程中调用，
+        UI 需要自行通过 Qt 信号切回主线程
+
+        Returns:
+            取消订阅的函数
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+        if replay:
+            self._safe_call(callback, self.snapshot())
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _safe_call(self, callback, snapshot):
+        try:
+            callback(snapshot)
+        except Exception as e:
+            log.error(0, "[进度] 订阅者回调异常: %s", e)
+
+    def _changed(self):
+        snap = self.snapshot()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for cb in subscribers:
+            self._safe_call(cb, snap)
+
+    # ------------------ 查询 ------------------
+
+    def get_mode_id(self, mode_or_name):
+        """获取模式ID映射：支持中文和英文"""
+        mode_configs = self.cfg.get_config('mode_configs', [])
+        for m in mode_configs:
+            if m['id'] == mode_or_name:
+                return m['id']
+        for m in mode_configs:
+            if m['name'] == mode_or_name:
+                return m['id']
+        return mode_or_name  # 兜底返回原值
+
+    def get_target(self, mode_id):
+        """获取指定模式的目标局数：user_config 优先，config 兜底"""
+        mode_id = self.get_mode_id(mode_id)
+
+        tasks = self.cfg.get_user_config('mode_control', {}).get('tasks', [])
+        for t in tasks:
+            if self.get_mode_id(t['id']) == mode_id:
+                return t.get('target', 5)
+
+        base_modes = self.cfg.get_config('mode_configs', [])
+        for m in base_modes:
+            if m['id'] == mode_id:
+                return m.get('target_games', 5)
+        return 5
+
+    def get_count(self, mode_id):
+        with self._lock:
+            return self.state["daily_progress"].get(mode_id, 0)
+
+    @property
+    def current_mode(self):
+        with self._lock:
+            return self.state.get("current_mode", "mode_item")
+
+    def snapshot(self):
+        """进度快照：{"date", "current_mode", "modes": [{"id", "name", "done", "target"}], "done", "target"}"""
+        with self._lock:
+            progress = dict(self.state["daily_progress"])
+            current = self.state.get("current_mode")
+            date = self.state.get("update_date")
+        modes = []
+        for m in self.cfg.get_config("mode_configs", []):
+            modes.append({
+                "id": m["id"],
+                "name": m.get("name", m["id"]),
+                "done": progress.get(m["id"], 0),
+                "target": self.get_target(m["id"]),
+            })
+        return {
+            "date": date,
+            "current_mode": current,
+            "modes": modes,
+            "done": sum(min(m["done"], m["target"]) for m in modes),
+            "target": sum(m["target"] for m in modes),
+            "all_done": all(m["done"] >= m["target"] for m in modes),
+        }
+
+    def is_all_finished(self):
+        """检查是否所有模式的任务进度都已经达到目标值"""
+        with self._lock:
+            progress = dict(self.state["daily_progress"])
+        for m in self.cfg.get_config("mode_configs", []):
+            if progress.get(m['id'], 0) < self.get_target(m['id']):
+                return False
+        return True
+
+    # ------------------ 修改 ------------------
+
+    def increment(self, mode_id=None):
+        """指定模式（默认当前模式）完成局数 +1，返回新的局数"""
+        with self._lock:
+            mode_id = mode_id or self.state['current_mode']
+            progress = self.state["daily_progress"]
+            progress[mode_id] = progress.get(mode_id, 0) + 1
+            count = progress[mode_id]
+            date = self.state["update_date"]
+        self._write(self.store.increment_progress, date, mode_id)
+        self._changed()
+        return count
+
+    def set_current_mode(self, mode_id):
+        with self._lock:
+            if self.state.get('current_mode') == mode_id:
+                return False
+            self.state['current_mode'] = mode_id
+        self._write(self.store.set_meta, "current_mode", mode_id)
+        self._changed()
+        return True
+
+    def reset(self):
+        """重置今日进度（手动重置或热键）"""
+        with self._lock:
+            self.state = self._default_state()
+            date = self.state["update_date"]
+        self._write(self.store.clear_progress, date)
+        self._write(self.store.set_meta, "progress_date", date)
+        self._write(self.store.set_meta, "current_mode", self.state["current_mode"])
+        self._changed()
+
+    def _write(self, fn, *args):
+        # 写库失败不影响内存中的计数，只打印错误
+        try:
+            fn(*args)
+        except Exception as e:
+            log.error(0, "[进度] 写入状态库失败: %s", e)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+运行分析报告
+基于状态库 games 表统计：每小时局数、各阶段耗时、按当前目标推算的预计完成时间
+
+用法:
+    python -m app.core.run_report              # 最近 24 小时
+    python -m app.core.run_report --hours 6
+    python -m app.core.run_report --json
+"""
+
+import time
+
+# 两局开始时间间隔超过该值视为中途停机，不计入单局周期
+MAX_CYCLE_SEC = 1800
+
+# (字段, 显示名)
+PHASES = [
+    ("ready_wait_sec", "等待准备"),
+    ("race_sec", "比赛(含回房)"),
+    ("sync_wait_sec", "回房同步"),
+    ("switch_sec", "切换模式"),
+]
+
+
+def _avg(values):
+    return sum(values) / len(values) if values else None
+
+
+def build_report(store, progress, hours=24.0, now=None):
+    """
+    Args:
+        store: StateStore 实例
+        progress: ProgressService 实例（目标与今日完成数）
+        hours: 统计最近多少小时的对局
+
+    Returns:
+        dict: {"games", "finished", "games_per_hour", "avg_cycle_sec", "phases", "modes", "eta_sec"}
+    """
+    now = now or time.time()
+    games = sorted(store.recent_games(since=now - hours * 3600), key=lambda g: g["started_at"])
+
+    # 1. 单局周期：相邻两局开始时间之差，归属到前一局的模式
+    cycles, mode_cycles = [], {}
+    for prev, nxt in zip(games, games[1:]):
+        gap = nxt["started_at"] - prev["started_at"]
+        if 0 < gap <= MAX_CYCLE_SEC:
+            cycles.append(gap)
+            mode_cycles.setdefault(prev["mode_id"], []).append(gap)
+    avg_cycle = _avg(cycles)
+
+    # 2. 各阶段耗时
+    phases = []
+    for key, label in PHASES:
+        values = [g[key] for g in games if g.get(key) is not None]
+        phases.append({
+            "key": key, "label": label, "count": len(values),
+            "total_sec": sum(values), "avg_sec": _avg(values),
+        })
+
+    # 3. 按模式推算剩余时间
+    snap = progress.snapshot()
+    modes, eta = [], 0.0
+    for m in snap["modes"]:
+        remaining = max(m["target"] - m["done"], 0)
+        cycle = _avg(mode_cycles.get(m["id"], [])) or avg_cycle
+        mode_eta = remaining * cycle if cycle else None
+        if remaining and mode_eta is None:
+            eta = None
+        elif eta is not None and mode_eta:
+            eta += mode_eta
+        modes.append({"id": m["id"], "name": m["name"], "done": m["done"], "target": m["target"],
+                      "remaining": remaining, "avg_cycle_sec": cycle, "eta_sec": mode_eta})
+
+    return {
+        "hours": hours,
+        "games": len(games),
+        "finished": sum(1 for g in games if g.get("ended_at")),
+        "avg_cycle_sec": avg_cycle,
+        "games_per_hour": 3600.0 / avg_cycle if avg_cycle else None,
+        "phases": phases,
+        "modes": modes,
+        "eta_sec": eta,
+    }
+
+
+def fmt_sec(sec):
+    """秒数 -> 1h02m / 3m05s / 12s，None 显示为 --"""
+    if sec is None:
+        return "--"
+    sec = int(round(sec))
+    if sec >= 3600:
+        return f"{sec // 3600}h{sec % 3600 // 60:02d}m"
+    if sec >= 60:
+        return f"{sec // 60}m{sec % 60:02d}s"
+    return f"{sec}s"
+
+
+def format_report(report):
+    """报告的文本形式（命令行和 UI 共用）"""
+    gph = report["games_per_hour"]
+    lines = [
+        f"最近 {report['hours']:g} 小时: {report['games']} 局 (已结束 {report['finished']})",
+        f"平均每局周期: {fmt_sec(report['avg_cycle_sec'])} | 每小时: {f'{gph:.1f}' if gph else '--'} 局",
+        "各阶段耗时 (平均 / 合计):",
+    ]
+    for p in report["phases"]:
+        lines.append(f"  {p['label']}: {fmt_sec(p['avg_sec'])} / {fmt_sec(p['total_sec'] if p['count'] else None)}"
+                     f" ({p['count']} 局)")
+    lines.append("剩余任务:")
+    for m in report["modes"]:
+        lines.append(f"  {m['name']}: {m['done']}/{m['target']} 剩余 {m['remaining']} 局，预计 {fmt_sec(m['eta_sec'])}")
+    lines.append(f"预计全部完成: {fmt_sec(report['eta_sec'])}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import json
+    import argparse
+
+    from app.core.config_manager import ConfigManager
+
+    parser = argparse.ArgumentParser(description="对局运行分析报告")
+    parser.add_argument("--hours", type=float, default=24.0, help="统计最近多少小时 (默认 24)")
+    parser.add_argument("--json", action="store_true", help="输出 JSON")
+    args = parser.parse_args()
+
+    cfg = ConfigManager()
+    result = build_report(cfg.state_store, cfg.progress, hours=args.hours)
+    # 启用账号轮换时附带单机当天的账号吞吐
+    from app.controllers.account_rotation import AccountRotation
+    rotation = AccountRotation(cfg, cfg.state_store)
+    if rotation.enabled:
+        result["accounts"] = rotation.daily_report()
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(result))
+        if rotation.enabled:
+            print(rotation.format_daily_report())
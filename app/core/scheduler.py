@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+截止时间调度器
+用最小堆维护每个任务(窗口/全局上下文)的下次到期时间，
+主循环只处理已到期的任务，并睡到最早的截止时间
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class DeadlineScheduler:
+    """基于最小堆的截止时间调度器（线程安全）
+
+    同一个 key 重复 schedule 时只保留最后一次的时间，
+    旧的堆条目在弹出时惰性丢弃
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}  # {key: due_time}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def schedule(self, key, due_time):
+        """设置 key 的下次到期时间"""
+        with self._lock:
+            self._due[key] = due_time
+            heapq.heappush(self._heap, (due_time, next(self._seq), key))
+        self._wakeup.set()
+
+    def schedule_in(self, key, delay):
+        self.schedule(key, time.time() + delay)
+
+    def remove(self, key):
+        with self._lock:
+            self._due.pop(key, None)
+
+    def reset(self, keys, due_time=None):
+        """把一组 key 全部重置为 due_time（默认立即到期）"""
+        due_time = time.time() if due_time is None else due_time
+        for key in keys:
+            self.schedule(key, due_time)
+
+    def due_time(self, key):
+        with self._lock:
+            return self._due.get(key)
+
+    def next_due(self):
+        """最早的到期时间，没有任务时返回 None"""
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None):
+        """弹出所有已到期的 key（按到期先后），弹出后需要重新 schedule"""
+        now = time.time() if now is None else now
+        keys = []
+        with self._lock:
+            while self._heap:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, _, key = heapq.heappop(self._heap)
+                del self._due[key]
+                keys.append(key)
+        return keys
+
+    def wait(self, max_wait=1.0):
+        """睡到最早的截止时间（最长 max_wait 秒），有新任务加入时提前唤醒"""
+        self._wakeup.clear()
+        nxt = self.next_due()
+        timeout = max_wait if nxt is None else min(max_wait, nxt - time.time())
+        if timeout <= 0:
+            return
+        self._wakeup.wait(timeout)
+
+    def _drop_stale(self):
+        # 调用方需持有锁：丢弃已被覆盖或移除的堆顶条目
+        while self._heap:
+            due, _, key = self._heap[0]
+            if self._due.get(key) == due:
+                return
+            heapq.heappop(self._heap)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+房间 Session 存储
+房间号、房主、模式保存在内存中（线程安全），
+状态库中的 session 表只作为崩溃恢复用的写后持久化，不再每帧读写
+"""
+
+import time
+import threading
+
+from app.core.persistence import WriteBehind
+
+
+class SessionStore:
+    """内存中的房间 Session"""
+
+    EXPIRE_SEC = 600        # Session 有效期（秒），按内存中的最后刷新时间计算
+    TOUCH_PERSIST_SEC = 60  # 仅刷新时间戳时，最多每隔多久写一次盘
+
+    def __init__(self, store, persist_delay=1.0):
+        """
+        Args:
+            store: StateStore 实例
+            persist_delay: 写后持久化的合并窗口（秒）
+        """
+        self.store = store
+        self._lock = threading.RLock()
+        self._data = {}
+        self._touched_at = 0.0      # time.monotonic()，用于内存中的过期判断
+        self._persisted_at = 0.0
+        self._writer = WriteBehind(self._persist, persist_delay, name="session-writer")
+        self._recover()
+
+    def _recover(self):
+        """启动时从状态库恢复未过期的 Session（上次异常退出时使用）"""
+        try:
+            d = self.store.get_session()
+            if not d:
+                return
+            age = time.time() - (d.get("timestamp") or 0)
+            if 0 <= age < self.EXPIRE_SEC:
+                with self._lock:
+                    self._data = {k: d.get(k) for k in ("room_id", "host_hwnd", "mode")}
+                    self._touched_at = time.monotonic() - age
+        except Exception:
+            pass
+
+    def get(self):
+        """返回未过期的 Session 副本，没有或已过期时返回 {}"""
+        with self._lock:
+            if self._data and time.monotonic() - self._touched_at < self.EXPIRE_SEC:
+                return dict(self._data)
+            return {}
+
+    def save(self, room_id, host_hwnd, mode):
+        with self._lock:
+            self._data = {"room_id": str(room_id), "host_hwnd": int(host_hwnd), "mode": mode}
+            self._touched_at = time.monotonic()
+        self._writer.mark_dirty()
+
+    def touch(self):
+        """刷新有效期（房主每次确认房间有效时调用），不必每次都写盘"""
+        with self._lock:
+            if not self._data:
+                return
+            self._touched_at = time.monotonic()
+            need_persist = self._touched_at - self._persisted_at > self.TOUCH_PERSIST_SEC
+        if need_persist:
+            self._writer.mark_dirty()
+
+    def clear(self):
+        """清空 Session 并同步删除恢复记录"""
+        with self._lock:
+            had_data = bool(self._data)
+            self._data = {}
+            self._touched_at = 0.0
+        self._writer.flush()
+        return had_data
+
+    def flush(self):
+        """立即写入尚未落盘的修改"""
+        self._writer.flush()
+
+    def _persist(self):
+        with self._lock:
+            data = dict(self._data)
+            age = time.monotonic() - self._touched_at
+            self._persisted_at = time.monotonic()
+        if not data:
+            self.store.clear_session()
+            return
+        self.store.save_session(data["room_id"], data["host_hwnd"], data["mode"], time.time() - age)
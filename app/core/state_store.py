@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+运行状态存储（SQLite / WAL）
+房间 Session、每日进度、窗口绑定和对局记录统一存放在 app/data/state.db，
+每个线程使用自己的连接：读不阻塞写，写操作串行化且只改动受影响的行
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from app.logger import get_logger
+
+log = get_logger()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS session (
+    id        INTEGER PRIMARY KEY CHECK (id = 1),
+    room_id   TEXT,
+    host_hwnd INTEGER,
+    mode      TEXT,
+    timestamp REAL
+);
+CREATE TABLE IF NOT EXISTS progress (
+    date    TEXT NOT NULL,
+    mode_id TEXT NOT NULL,
+    count   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, mode_id)
+);
+CREATE TABLE IF NOT EXISTS window_bindings (
+    idx      INTEGER PRIMARY KEY,
+    hwnd     INTEGER,
+    username TEXT,
+    password TEXT,
+    extra    TEXT
+);
+CREATE TABLE IF NOT EXISTS games (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    date       TEXT NOT NULL,
+    mode_id    TEXT,
+    host_hwnd  INTEGER,
+    windows    TEXT,
+    started_at REAL NOT NULL,
+    ended_at   REAL
+);
+CREATE TABLE IF NOT EXISTS account_runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    date        TEXT NOT NULL,
+    username    TEXT NOT NULL,
+    slot        INTEGER,
+    hwnd        INTEGER,
+    started_at  REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_games_started ON games (started_at);
+CREATE INDEX IF NOT EXISTS idx_account_runs_date ON account_runs (date, username);
+CREATE INDEX IF NOT EXISTS idx_games_date_mode ON games (date, mode_id);
+"""
+
+# 后续版本新增的列：旧库启动时自动 ALTER TABLE 补齐
+#   ready_wait_sec: 房间可开局 -> 房主点击开始（等待成员进房/准备）
+#   race_sec:       点击开始 -> 所有窗口回到房间
+#   sync_wait_sec:  第一个窗口回房 -> 所有窗口回房（同步屏障等待）
+#   switch_sec:     本局开始前花在切换模式上的时间
+EXTRA_COLUMNS = {
+    "games": [
+        ("ready_wait_sec", "REAL"),
+        ("race_sec", "REAL"),
+        ("sync_wait_sec", "REAL"),
+        ("switch_sec", "REAL"),
+    ],
+}
+
+
+class StateStore:
+    """SQLite 状态库的仓储接口（线程安全）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._write_lock:
+            conn = self._conn()
+            conn.executescript(SCHEMA)
+            for table, columns in EXTRA_COLUMNS.items():
+                existing = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+                for name, col_type in columns:
+                    if name not in existing:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+    # ------------------ 连接 ------------------
+
+    def _conn(self):
+        """每个线程一个连接（sqlite3 连接不能跨线程使用）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self):
+        """写事务：进程内串行化，BEGIN IMMEDIATE 避免读升级写时的死锁"""
+        conn = self._conn()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _query(self, sql, args=()):
+        return self._conn().execute(sql, args).fetchall()
+
+    # ------------------ meta ------------------
+
+    def get_meta(self, key, default=None):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return rows[0]["value"] if rows else default
+
+    def set_meta(self, key, value):
+        with self._tx() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # ------------------ 房间 Session ------------------
+
+    def get_session(self):
+        """返回 {"room_id", "host_hwnd", "mode", "timestamp"}，没有时返回 {}"""
+        rows = self._query("SELECT room_id, host_hwnd, mode, timestamp FROM session WHERE id = 1")
+        return dict(rows[0]) if rows else {}
+
+    def save_session(self, room_id, host_hwnd, mode, timestamp):
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session (id, room_id, host_hwnd, mode, timestamp) VALUES (1, ?, ?, ?, ?)",
+                (room_id, host_hwnd, mode, timestamp))
+
+    def clear_session(self):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM session")
+
+    # ------------------ 每日进度 ------------------
+
+    def get_progress(self, date):
+        """某天各模式的完成局数 {mode_id: count}"""
+        rows = self._query("SELECT mode_id, count FROM progress WHERE date = ?", (date,))
+        return {r["mode_id"]: r["count"] for r in rows}
+
+    def increment_progress(self, date, mode_id, delta=1):
+        """完成局数 +delta，返回新值"""
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT INTO progress (date, mode_id, count) VALUES (?, ?, ?) "
+                "ON CONFLICT(date, mode_id) DO UPDATE SET count = count + excluded.count",
+                (date, mode_id, delta))
+            row = conn.execute("SELECT count FROM progress WHERE date = ? AND mode_id = ?",
+                               (date, mode_id)).fetchone()
+        return row["count"]
+
+    def set_progress(self, date, counts):
+        """整体覆盖某天的进度（用于导入旧数据）"""
+        with self._tx() as conn:
+            conn.execute("DELETE FROM progress WHERE date = ?", (date,))
+            conn.executemany("INSERT INTO progress (date, mode_id, count) VALUES (?, ?, ?)",
+                             [(date, m, int(c)) for m, c in counts.items()])
+
+    def clear_progress(self, date):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM progress WHERE date = ?", (date,))
+
+    # ------------------ 窗口绑定 ------------------
+
+    def load_window_bindings(self):
+        """已启动窗口列表 [{"index", "hwnd", "username", "password", ...}]（按 index 排序）"""
+        items = []
+        for r in self._query("SELECT idx, hwnd, username, password, extra FROM window_bindings ORDER BY idx"):
+            item = json.loads(r["extra"]) if r["extra"] else {}
+            item.update({"index": r["idx"], "hwnd": r["hwnd"],
+                         "username": r["username"], "password": r["password"]})
+            items.append(item)
+        return items
+
+    def save_window_bindings(self, items):
+        """整体替换窗口列表"""
+        core = ("index", "hwnd", "username", "password")
+        rows = []
+        for i, item in enumerate(items):
+            extra = {k: v for k, v in item.items() if k not in core}
+            rows.append((item.get("index", i), item.get("hwnd"), item.get("username", ""),
+                         item.get("password", ""), json.dumps(extra, ensure_ascii=False) if extra else None))
+        with self._tx() as conn:
+            conn.execute("DELETE FROM window_bindings")
+            conn.executemany(
+                "INSERT INTO window_bindings (idx, hwnd, username, password, extra) VALUES (?, ?, ?, ?, ?)", rows)
+
+    def clear_window_bindings(self):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM window_bindings")
+
+    # ------------------ 对局记录 ------------------
+
+    def start_game(self, date, mode_id, host_hwnd, windows, started_at=None,
+                   ready_wait_sec=None, switch_sec=None):
+        """记录一局开始，返回对局 id"""
+        with self._tx() as conn:
+            cur = conn.execute(
+                "INSERT INTO games (date, mode_id, host_hwnd, windows, started_at, ready_wait_sec, switch_sec) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (date, mode_id, host_hwnd, json.dumps(list(windows)), started_at or time.time(),
+                 ready_wait_sec, switch_sec))
+            return cur.lastrowid
+
+    def finish_game(self, game_id, ended_at=None, sync_wait_sec=None):
+        """记录一局结束（所有窗口回到房间），比赛时长由开始时间推算"""
+        ended_at = ended_at or time.time()
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE games SET ended_at = ?, race_sec = ? - started_at, sync_wait_sec = ? "
+                "WHERE id = ? AND ended_at IS NULL",
+                (ended_at, ended_at, sync_wait_sec, game_id))
+
+    def recent_games(self, since=None, limit=None):
+        """按开始时间倒序返回对局记录"""
+        sql = "SELECT * FROM games"
+        args = []
+        if since is not None:
+            sql += " WHERE started_at >= ?"
+            args.append(since)
+        sql += " ORDER BY started_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        games = []
+        for r in self._query(sql, args):
+            g = dict(r)
+            g["windows"] = json.loads(g["windows"]) if g.get("windows") else []
+            games.append(g)
+        return games
+
+    # ------------------ 账号轮换 ------------------
+
+    def start_account_run(self, date, username, slot, hwnd, started_at=None):
+        """某账号开始在某个窗口槽位上跑任务，返回记录 id"""
+        with self._tx() as conn:
+            cur = conn.execute(
+                "INSERT INTO account_runs (date, username, slot, hwnd, started_at) VALUES (?, ?, ?, ?, ?)",
+                (date, username, slot, hwnd, started_at or time.time()))
+            return cur.lastrowid
+
+    def finish_account_run(self, run_id, finished_at=None):
+        with self._tx() as conn:
+            conn.execute("UPDATE account_runs SET finished_at = ? WHERE id = ? AND finished_at IS NULL",
+                         (finished_at or time.time(), run_id))
+
+    def account_runs(self, date):
+        """某天的账号运行记录（按开始时间排序）"""
+        return [dict(r) for r in self._query(
+            "SELECT * FROM account_runs WHERE date = ? ORDER BY started_at", (date,))]
+
+    def finished_accounts(self, date):
+        """某天已完成任务的账号集合"""
+        return {r["username"] for r in self._query(
+            "SELECT DISTINCT username FROM account_runs WHERE date = ? AND finished_at IS NOT NULL", (date,))}
+
+    # ------------------ 旧文件导入 ------------------
+
+    def import_legacy(self, data_dir):
+        """首次启用时导入旧的 JSON 状态文件，导入后改名为 *.migrated"""
+        def load(name):
+            path = os.path.join(data_dir, name)
+            if not os.path.exists(path):
+                return path, None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    return path, json.load(f)
+            except Exception:
+                return path, None
+
+        def retire(path):
+            try:
+                os.replace(path, path + ".migrated")
+            except OSError:
+                pass
+
+        path, data = load("switcher_state.json")
+        if isinstance(data, dict):
+            date = data.get("update_date")
+            if date and not self.get_progress(date):
+                self.set_progress(date, data.get("daily_progress", {}))
+                self.set_meta("progress_date", date)
+                self.set_meta("current_mode", data.get("current_mode", "mode_item"))
+                log.info(0, "[状态库] 已导入旧进度记录 (%s)", date)
+            retire(path)
+
+        path, data = load("window_results.json")
+        if isinstance(data, list):
+            if not self.load_window_bindings():
+                self.save_window_bindings(data)
+                log.info(0, "[状态库] 已导入旧窗口记录 (%s 个)", len(data))
+            retire(path)
+
+        path, data = load("room_session.json")
+        if isinstance(data, dict):
+            if data.get("room_id") and not self.get_session():
+                self.save_session(data.get("room_id"), data.get("host_hwnd"),
+                                  data.get("mode"), data.get("timestamp", 0))
+            retire(path)
+
+        path, data = load("mode_counts.json")
+        if data is not None:
+            retire(path)
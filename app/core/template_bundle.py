@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+模板 bundle
+把模板目录下所有 PNG（以及 config.json 引用的图片）解码后的 BGR 像素按 64 字节对齐顺序写进一个原始数据文件，
+旁边的 .json 索引记录每个文件的偏移、形状和源文件的 mtime / 大小：
+
+    templates.bundle        原始像素（uint8，行优先 h x w x 3）
+    templates.bundle.json   {"version": 1, "data_size": ..., "entries": {"box_10.png": {"offset", "shape", "mtime", "size"}}}
+
+启动时 mmap 整个数据文件，模板图像是直接指向映射内存的只读 ndarray，不做 PNG 解码，
+页面在第一次匹配时才由系统读入；分片 worker 进程映射同一个文件，共享系统页缓存。
+源文件的 mtime / 大小与索引不一致或文件增减时自动增量重建（未变的条目直接从旧映射复制，只解码变化的文件）；
+运行中被替换的 PNG 由模板热重载照常解码，下次启动时写回 bundle
+"""
+
+import os
+import json
+import mmap
+import time
+
+import cv2
+import numpy as np
+
+from app.logger import get_logger
+
+log = get_logger()
+
+
+class TemplateBundle:
+    """模板目录的预解码像素文件（mmap 只读映射）"""
+
+    VERSION = 1
+    ALIGN = 64
+
+    def __init__(self, path, root, readonly=False):
+        """readonly=True 时只映射已有 bundle，不检查也不重建（分片检测子进程，由主进程负责重建）"""
+        self.path = path
+        self.index_path = path + ".json"
+        self.root = os.path.abspath(root)
+        self.readonly = readonly
+        self._entries = {}
+        self._mm = None
+        self.hits = 0
+        self.rebuilds = 0
+
+    # ------------------ 映射 ------------------
+
+    def open(self):
+        """映射已有 bundle，索引缺失、版本不符或与数据文件不一致时视为空，返回是否可用"""
+        self.close()
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != self.VERSION:
+                return False
+            size = index.get("data_size", 0)
+            if os.path.getsize(self.path) != size:
+                return False  # 数据和索引不是同一次构建写出的
+            if size:
+                with open(self.path, "rb") as f:
+                    self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        self._entries = index.get("entries", {})
+        return True
+
+    def close(self):
+        mm, self._mm, self._entries = self._mm, None, {}
+        if mm is not None:
+            try:
+                mm.close()
+            except BufferError:
+                pass  # 仍有模板图像引用映射内存，随最后一个引用释放
+
+    def _key(self, path):
+        try:
+            rel = os.path.relpath(os.path.abspath(path), self.root)
+        except ValueError:
+            return None  # Windows 下不在同一个盘符
+        if rel.startswith(os.pardir):
+            return None
+        return rel.replace(os.sep, "/")
+
+    def _view(self, key, st):
+        entry = self._entries.get(key)
+        if entry is None or self._mm is None:
+            return None
+        if entry["size"] != st.st_size or entry["mtime"] != st.st_mtime:
+            return None
+        h, w, c = entry["shape"]
+        return np.frombuffer(self._mm, dtype=np.uint8, count=h * w * c, offset=entry["offset"]).reshape(h, w, c)
+
+    def view(self, path, st):
+        """与源文件当前 stat 一致的条目 -> 只读 BGR 图像（指向映射内存），否则返回 None"""
+        key = self._key(path)
+        image = self._view(key, st) if key else None
+        if image is not None:
+            self.hits += 1
+        return image
+
+    # ------------------ 构建 ------------------
+
+    def sync(self, paths, force=False):
+        """确保 bundle 覆盖 paths 且与源文件一致，有变化时重建，返回是否重建"""
+        if self._mm is None and not self._entries:
+            self.open()
+        if self.readonly:
+            return False
+        sources = {}
+        for path in paths:
+            key = self._key(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if key and st.st_size:
+                sources[key] = (path, st)
+        if force:
+            self.close()  # 不复用旧条目，全部重新解码
+        elif set(sources) == set(self._entries) and all(
+                self._view(key, st) is not None for key, (_, st) in sources.items()):
+            return False
+        return self._rebuild(sources)
+
+    def _rebuild(self, sources):
+        t0 = time.perf_counter()
+        tag = f".{os.getpid()}.tmp"
+        data_tmp, index_tmp = self.path + tag, self.index_path + tag
+        entries, offset, decoded = {}, 0, 0
+        try:
+            with open(data_tmp, "wb") as f:
+                for key in sorted(sources):
+                    path, st = sources[key]
+                    image = self._view(key, st)
+                    if image is None:
+                        image = cv2.imread(path, cv2.IMREAD_COLOR)
+                        decoded += 1
+                        if image is None:
+                            log.warn(0, "[模板] bundle 跳过无法解码的图片: %s", key)
+                            continue
+                    pad = -offset % self.ALIGN
+                    f.write(b"\0" * pad)
+                    offset += pad
+                    f.write(np.ascontiguousarray(image).tobytes())
+                    entries[key] = {"offset": offset, "shape": list(image.shape),
+                                    "mtime": st.st_mtime, "size": st.st_size}
+                    offset += image.nbytes
+                image = None
+            index = {
+                "version": self.VERSION,
+                "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "data_size": offset,
+                "entries": entries,
+            }
+            with open(index_tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False, indent=1)
+
+            self.close()
+            os.replace(data_tmp, self.path)
+            os.replace(index_tmp, self.index_path)
+        except OSError as e:
+            # Windows 下其他进程（另一个实例 / 仍在退出的分片）映射着旧文件时无法替换，本次沿用旧 bundle + PNG 解码
+            log.warn(0, "[模板] bundle 重建失败，本次变化的模板按 PNG 解码: %s", e)
+            for tmp in (data_tmp, index_tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            self.open()
+            return False
+
+        self.open()
+        self.rebuilds += 1
+        log.info(0, "[模板] bundle 已重建 | %s 个文件 / 解码 %s 个 / %.1f MB / %.0f ms",
+                 len(entries), decoded, offset / 1048576.0, (time.perf_counter() - t0) * 1000.0)
+        return True
+
+    def entries(self):
+        """相对路径 -> 索引条目"""
+        return dict(self._entries)
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "entries": len(self._entries),
+            "bytes": len(self._mm) if self._mm is not None else 0,
+            "hits": self.hits,
+            "rebuilds": self.rebuilds,
+        }
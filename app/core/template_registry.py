@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+模板注册表
+启动时遍历 config.json，把所有引用的图片（任意层级以 .png 结尾的值，以及紧急监控按前缀生成的图片）
+一次性解析为已加载、已校验的模板对象，带上同一配置段里的阈值（match_threshold / threshold）和 ROI：
+
+    registry.get("room_management_img")           # 按逻辑名（配置键的点分路径）O(1) 查找
+    registry.get("login_sequence.0.check_img")
+    registry.load(path)                           # 按路径取图像（GameEngine.load_template 使用）
+
+匹配时不再做 os.path.exists；文件变化由后台线程按 mtime 检查（每个文件每个周期一次 stat），
+PNG 被替换后自动重新加载，不需要重启控制器。配置之外按路径加载的模板放在有上限的 LRU 里。
+设置了 bundle（template_bundle.py）时，源文件未变的模板直接取预解码的映射内存，不做 PNG 解码
+"""
+
+import os
+import glob
+import time
+import threading
+from collections import OrderedDict
+
+import cv2
+
+from app.logger import get_logger
+
+log = get_logger()
+
+IMAGE_EXT = ".png"
+
+
+class TemplateImage:
+    """一个图片文件的解码结果（同一文件被多个逻辑名引用时共享）"""
+
+    __slots__ = ("path", "image", "mtime", "_bgra")
+
+    def __init__(self, path, image, mtime):
+        self.path = path
+        self.image = image
+        self.mtime = mtime
+        self._bgra = None
+
+    @property
+    def bgra(self):
+        """4 通道版本（首次使用时转换一次），用于直接在 BGRA 画面上匹配
+
+        缓存为 (源图像, BGRA)：热重载替换 image 后，源图像不是当前 image 的缓存一律重算，
+        转换中途被替换、晚于重载写入的旧结果也不会留下
+        """
+        image = self.image
+        cached = self._bgra
+        if cached is None or cached[0] is not image:
+            cached = (image, cv2.cvtColor(image, cv2.COLOR_BGR2BGRA))
+            self._bgra = cached
+        return cached[1]
+
+    @classmethod
+    def read(cls, path, bundle=None):
+        """读取并校验（强制 3 通道 BGR），文件缺失、为空或解码失败时返回 None；bundle 中有一致的条目时不解码"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if st.st_size == 0:
+            return None
+        image = bundle.view(path, st) if bundle is not None else None
+        if image is None:
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        return cls(path, image, st.st_mtime)
+
+
+class Template:
+    """配置中的一个模板引用：图像 + 该处配置的阈值和 ROI"""
+
+    __slots__ = ("name", "file", "threshold", "roi", "data")
+
+    def __init__(self, name, file, threshold, roi, data):
+        self.name = name
+        self.file = file
+        self.threshold = threshold
+        self.roi = roi
+        self.data = data
+
+    @property
+    def path(self):
+        return self.data.path
+
+    @property
+    def image(self):
+        return self.data.image
+
+    @property
+    def size(self):
+        """(w, h)"""
+        return self.data.image.shape[1], self.data.image.shape[0]
+
+    def __repr__(self):
+        return f"<Template {self.name} {self.file} thr={self.threshold}>"
+
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def collect_references(cfg):
+    """遍历配置，返回 [(逻辑名, 图片名, 阈值或 None, roi 或 None)]"""
+    refs = []
+
+    def walk(node, prefix, thr, roi):
+        if isinstance(node, dict):
+            thr = _number(node.get("match_threshold", node.get("threshold"))) or thr
+            roi = node.get("roi", roi)
+            items = node.items()
+        elif isinstance(node, list):
+            items = enumerate(node)
+        else:
+            return
+        for key, value in items:
+            if key == "description":
+                continue
+            name = f"{prefix}.{key}" if prefix else str(key)
+            if isinstance(value, str) and len(value) > len(IMAGE_EXT) and value.lower().endswith(IMAGE_EXT):
+                refs.append((name, value, thr, roi))
+            else:
+                walk(value, name, thr, roi)
+
+    walk(cfg, "", None, None)
+
+    # 紧急监控按 前缀+序号 生成图片名
+    em = cfg.get("emergency_handler") or {}
+    img_cfg = em.get("image_config") or {}
+    for i in range(1, int(img_cfg.get("count", 0)) + 1):
+        fname = f"{img_cfg.get('prefix', 'emergency_')}{i}{img_cfg.get('extension', IMAGE_EXT)}"
+        refs.append((f"emergency_handler.images.{i}", fname, _number(em.get("match_threshold")), None))
+    return refs
+
+
+def bundle_sources(cfg_mgr):
+    """bundle 要覆盖的图片：模板目录下所有 PNG + 配置引用的图片"""
+    paths = set(glob.glob(os.path.join(cfg_mgr.paths["templates"], "*" + IMAGE_EXT)))
+    for _, fname, _, _ in collect_references(cfg_mgr.config_data):
+        paths.add(cfg_mgr.get_template_path(fname))
+    return sorted(paths)
+
+
+class TemplateRegistry:
+    """逻辑名 / 路径 -> 已加载模板"""
+
+    MAX_EXTRA = 128      # 配置外按路径加载的模板上限
+    MISSING_RETRY = 5.0  # 缺失文件的重试间隔（秒），期间查找直接返回 None 不再 stat
+
+    def __init__(self):
+        self._names = {}            # 逻辑名 -> Template
+        self._images = {}           # 路径 -> TemplateImage（配置引用，常驻）
+        self._extra = OrderedDict() # 路径 -> TemplateImage（LRU）
+        self._missing = {}          # 路径 -> 下次重试时间
+        self._lock = threading.Lock()
+        self._watch_stop = threading.Event()
+        self._watcher = None
+        self.missing_names = []
+        self.reloads = 0
+        self._built_from = None
+        self.bundle = None          # TemplateBundle，None 时直接解码 PNG
+
+    # ------------------ 构建 ------------------
+
+    def build(self, cfg_mgr, default_threshold=0.75):
+        """按 config.json 编译全部模板（同一份配置重复调用直接返回，配置重新加载后重建）"""
+        if self._built_from is cfg_mgr.config_data:
+            return self
+        if self.bundle is not None:
+            self.bundle.sync(bundle_sources(cfg_mgr))
+        names, images, missing = {}, {}, []
+        for name, fname, thr, roi in collect_references(cfg_mgr.config_data):
+            path = cfg_mgr.get_template_path(fname)
+            data = images.get(path) or self._images.get(path) or self._read(path)
+            if data is None:
+                missing.append(name)
+                continue
+            images[path] = data
+            if isinstance(roi, str):
+                roi = (cfg_mgr.get_config("rois", {}) or {}).get(roi)
+            names[name] = Template(name, fname, thr if thr is not None else default_threshold, roi, data)
+        with self._lock:
+            self._names, self._images = names, images
+            for path in images:
+                self._extra.pop(path, None)
+                self._missing.pop(path, None)
+        self.missing_names = missing
+        self._built_from = cfg_mgr.config_data
+        log.info(0, "[模板] 注册表编译完成 | %s 个引用 / %s 个文件", len(names), len(images))
+        if missing:
+            log.warn(0, "[模板] %s 个引用的图片缺失或无法解码: %s", len(missing), ", ".join(missing))
+        return self
+
+    def _read(self, path):
+        return TemplateImage.read(path, self.bundle)
+
+    # ------------------ 查找 ------------------
+
+    def get(self, name):
+        """按逻辑名取 Template，不存在时返回 None"""
+        return self._names.get(name)
+
+    def names(self):
+        return list(self._names)
+
+    def load(self, path):
+        """按路径取 TemplateImage：配置引用的直接命中，其余按需加载进 LRU"""
+        data = self._images.get(path)
+        if data is not None:
+            return data
+        with self._lock:
+            data = self._extra.get(path)
+            if data is not None:
+                self._extra.move_to_end(path)
+                return data
+            if time.monotonic() < self._missing.get(path, 0):
+                return None
+        data = self._read(path) if path else None
+        with self._lock:
+            if data is None:
+                if path:
+                    self._missing[path] = time.monotonic() + self.MISSING_RETRY
+                return None
+            self._extra[path] = data
+            while len(self._extra) > self.MAX_EXTRA:
+                self._extra.popitem(last=False)
+        return data
+
+    # ------------------ 热重载 ------------------
+
+    def check_changes(self):
+        """stat 所有已加载的文件，mtime 变化的重新加载，返回重新加载的文件数"""
+        with self._lock:
+            tracked = list(self._images.values()) + list(self._extra.values())
+        changed = 0
+        for data in tracked:
+            try:
+                mtime = os.stat(data.path).st_mtime
+            except OSError:
+                continue  # 文件暂时不存在（正在被替换）时保留旧图像
+            if mtime == data.mtime:
+                continue
+            fresh = self._read(data.path)
+            if fresh is None:
+                continue  # 写了一半，下个周期再试
+            # 原地替换：所有 Template 和调用方持有的 TemplateImage 立即看到新图像（image 单次赋值，
+            # 读者拿到的要么是旧图像要么是新图像；bgra 缓存按源图像校验，不需要和 image 一起加锁）
+            data.mtime = fresh.mtime
+            data.image = fresh.image
+            changed += 1
+            log.info(0, "[模板] 已重新加载: %s", os.path.basename(data.path))
+        self.reloads += changed
+        return changed
+
+    def start_watch(self, interval=2.0):
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._watch_stop.clear()
+
+        def run():
+            while not self._watch_stop.wait(interval):
+                try:
+                    self.check_changes()
+                except Exception as e:
+                    log.error(0, "[模板] 检查文件变化失败: %s", e)
+
+        self._watcher = threading.Thread(target=run, name="template-watch", daemon=True)
+        self._watcher.start()
+
+    def stop_watch(self):
+        self._watch_stop.set()
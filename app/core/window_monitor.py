@@ -147,12 +147,18 @@ class WindowMonitor(QThread):
             'offline_msg.png'
         ]
 
-        for img_name in offline_images:
-            img_path = self.config_manager.get_template_path(img_name)
-            if img_path:
-                found, _, _ = self.engine.match_template(hwnd, img_path, threshold=0.8)
-                if found:
-                    return True
+        # 只在有可用模板时取一帧，所有掉线特征图在同一帧上匹配
+        img_paths = [self.config_manager.get_template_path(img_name) for img_name in offline_images]
+        img_paths = [p for p in img_paths if p and self.engine.load_template(p) is not None]
+        if not img_paths:
+            return False
+        screen = self.engine.current_frame(hwnd)
+        if screen is None:
+            return False
+        for img_path in img_paths:
+            found, _, _ = self.engine.match_in_frame(screen, img_path, threshold=0.8)
+            if found:
+                return True
         return False
 
     def mark_recovered(self, hwnd: int):
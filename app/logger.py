@@ -1,17 +1,324 @@
 # -*- coding: utf-8 -*-
 """
-简单日志记录器
-用于替代print，支持带hwnd的日志输出
+日志
+结构化异步日志：级别 + 窗口句柄字段 + 延迟格式化，
+调用方只做一次级别判断和一次无锁入队，格式化、写文件、推送 UI 都在后台写线程完成，
+日志文件按大小滚动并 gzip 压缩
 """
 
-import time
 import os
-import threading
+import io
 import sys
+import gzip
+import time
+import shutil
+import threading
+from collections import deque
+
+
+DEBUG, INFO, WARN, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARN: "WARN", ERROR: "ERROR"}
+LEVEL_VALUES = {"DEBUG": DEBUG, "INFO": INFO, "WARN": WARN, "WARNING": WARN, "ERROR": ERROR}
+
+
+def _level_value(level):
+    if isinstance(level, int):
+        return level
+    return LEVEL_VALUES.get(str(level).upper(), INFO)
+
+
+class LogRecord:
+    """一条日志；text 在写线程里才生成"""
+
+    __slots__ = ("ts", "level", "hwnd", "msg", "args", "thread", "_text")
+
+    def __init__(self, ts, level, hwnd, msg, args, thread):
+        self.ts = ts
+        self.level = level
+        self.hwnd = hwnd
+        self.msg = msg
+        self.args = args
+        self.thread = thread
+        self._text = None
+
+    @property
+    def level_name(self):
+        return LEVEL_NAMES.get(self.level, str(self.level))
+
+    @property
+    def message(self):
+        """延迟格式化：只有真正输出时才执行 msg % args"""
+        if self.args:
+            try:
+                return self.msg % self.args
+            except Exception:
+                return f"{self.msg} {self.args}"
+        return str(self.msg)
+
+    @property
+    def text(self):
+        if self._text is None:
+            ts = time.strftime("%H:%M:%S", time.localtime(self.ts))
+            if self.hwnd:
+                self._text = f"[{ts}] [{self.hwnd}] [{self.level_name}] {self.message}"
+            else:
+                self._text = f"[{ts}] [{self.level_name}] {self.message}"
+        return self._text
+
+
+class RotatingGzipFile:
+    """按大小滚动的日志文件：超过 max_bytes 时把当前文件压缩为 *.log.N.gz，只保留 backup_count 份"""
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=10):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8")
+
+    def write_lines(self, lines):
+        self._f.write("\n".join(lines) + "\n")
+        self._f.flush()
+        if self._f.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._f.close()
+        # *.log.1.gz 最新，依次后移，超出数量的删除
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}.gz"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}.gz")
+        with open(self.path, "rb") as src, gzip.open(f"{self.path}.1.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        stale = f"{self.path}.{self.backup_count + 1}.gz"
+        if os.path.exists(stale):
+            os.remove(stale)
+        self._f = open(self.path, "w", encoding="utf-8")
+
+    def close(self):
+        self._f.close()
+
+
+def log_history_files(path):
+    """当前日志及其滚动文件，按时间从旧到新"""
+    files, i = [], 1
+    while os.path.exists(f"{path}.{i}.gz"):
+        files.insert(0, f"{path}.{i}.gz")
+        i += 1
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def search_logs(path, keyword, limit=2000):
+    """在磁盘日志（含压缩的历史文件）中搜索包含 keyword 的行，返回最新的 limit 条"""
+    matches = deque(maxlen=limit)
+    for file in log_history_files(path):
+        opener = gzip.open if file.endswith(".gz") else open
+        with opener(file, "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if keyword in line:
+                    matches.append(line.rstrip("\n"))
+    return list(matches)
+
+
+class AsyncLogger:
+    """异步日志管线
+
+    - 热路径：level < self.level 直接返回；否则 deque.append（CPython 下原子，无需加锁）
+    - 队列有上限，写线程跟不上时丢弃最旧的记录并计数，绝不阻塞调用方
+    - 写线程每 flush_interval 秒批量处理：格式化 -> 控制台 -> 滚动文件 -> 订阅者（一批一次回调）
+    """
+
+    def __init__(self, level=INFO, max_queue=50000, flush_interval=0.1):
+        self.level = _level_value(level)
+        self.flush_interval = flush_interval
+        self.console = sys.__stdout__
+        self._queue = deque(maxlen=max_queue)
+        self._enqueued = 0
+        self._written = 0
+        self._file = None
+        self._subscribers = []
+        self._sub_lock = threading.Lock()
+        # flush 会被写线程和退出路径（热键、关窗、分片退出）同时调用：取队列、写文件和滚动必须串行
+        self._flush_lock = threading.RLock()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    # ------------------ 配置 ------------------
+
+    def configure(self, level=None, log_dir=None, max_bytes=None, backup_count=None, console=None):
+        if level is not None:
+            self.level = _level_value(level)
+        if console is not None:
+            self.console = sys.__stdout__ if console else None
+        if log_dir:
+            new_file = RotatingGzipFile(os.path.join(log_dir, "app.log"),
+                                        max_bytes or 5 * 1024 * 1024, backup_count or 10)
+            with self._flush_lock:
+                old, self._file = self._file, new_file
+                if old:
+                    old.close()
+
+    @property
+    def log_path(self):
+        return self._file.path if self._file else None
+
+    def subscribe(self, callback):
+        """订阅日志批次：callback(records) 在写线程中调用，records 为 LogRecord 列表"""
+        with self._sub_lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._sub_lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    # ------------------ 热路径 ------------------
+
+    def enabled_for(self, level):
+        return level >= self.level
+
+    def log(self, hwnd, level, message, *args):
+        """
+        Args:
+            hwnd: 窗口句柄（0 表示系统级日志）
+            level: DEBUG/INFO/WARN/ERROR（整数或名字）
+            message: 消息，可带 %s 占位符，配合 args 延迟格式化
+        """
+        level = _level_value(level)
+        if level < self.level:
+            return
+        self._queue.append(LogRecord(time.time(), level, hwnd, message, args,
+                                     threading.current_thread().name))
+        self._enqueued += 1
+
+    def debug(self, hwnd, message, *args):
+        if DEBUG >= self.level:
+            self.log(hwnd, DEBUG, message, *args)
+
+    def info(self, hwnd, message, *args):
+        self.log(hwnd, INFO, message, *args)
+
+    def warn(self, hwnd, message, *args):
+        self.log(hwnd, WARN, message, *args)
+
+    warning = warn
+
+    def error(self, hwnd, message, *args):
+        self.log(hwnd, ERROR, message, *args)
+
+    # ------------------ 写线程 ------------------
+
+    @property
+    def dropped(self):
+        """因队列满被丢弃的记录数"""
+        return max(self._enqueued - self._written - len(self._queue), 0)
+
+    def _drain(self):
+        batch = []
+        try:
+            while True:
+                batch.append(self._queue.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """处理队列中已有的记录（写线程周期调用，退出前也可手动调用；多线程同时调用时串行执行）"""
+        with self._flush_lock:
+            batch = self._drain()
+            if not batch:
+                return
+            self._written += len(batch)
+            lines = [r.text for r in batch]
+            if self.console:
+                try:
+                    self.console.write("\n".join(lines) + "\n")
+                except UnicodeEncodeError:
+                    self.console.write("\n".join(lines).encode("ascii", "replace").decode("ascii") + "\n")
+                except Exception:
+                    pass
+            if self._file:
+                try:
+                    # 文件里带上日期，跨天搜索历史时可区分
+                    self._file.write_lines([time.strftime("%Y-%m-%d ", time.localtime(r.ts)) + line
+                                            for r, line in zip(batch, lines)])
+                except Exception:
+                    pass
+            # 订阅者也在锁内回调，批次按入队顺序送达
+            with self._sub_lock:
+                subscribers = list(self._subscribers)
+            for cb in subscribers:
+                try:
+                    cb(batch)
+                except Exception:
+                    pass
+
+
+class StdoutToLog(io.TextIOBase):
+    """把仍在使用 print 的代码接入日志管线：按整行入队，不直接写控制台"""
+
+    def __init__(self, logger, level=INFO):
+        self._logger = logger
+        self._level = level
+        self._local = threading.local()
+
+    def write(self, text):
+        buf = getattr(self._local, "buf", "") + text
+        *lines, rest = buf.split("\n")
+        self._local.buf = rest
+        for line in lines:
+            if line.strip():
+                self._logger.log(0, self._level, line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """进程内唯一的异步日志管线"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = AsyncLogger()
+    return _pipeline
+
+
+def configure_logging(cfg_mgr, capture_stdout=True):
+    """
+    按 config.json 的 "logging" 段配置日志管线，并可选把 sys.stdout 接入管线
+
+        {"level": "INFO", "dir": "logs", "max_bytes": 5242880, "backup_count": 10, "console": true}
+    """
+    log_cfg = cfg_mgr.get_config("logging", {}) or {}
+    log_dir = log_cfg.get("dir", "logs")
+    if not os.path.isabs(log_dir):
+        log_dir = os.path.join(cfg_mgr.DATA_DIR, log_dir)
+    pipeline = get_pipeline()
+    pipeline.configure(level=log_cfg.get("level", "INFO"), log_dir=log_dir,
+                       max_bytes=log_cfg.get("max_bytes"), backup_count=log_cfg.get("backup_count"),
+                       console=log_cfg.get("console", True))
+    if capture_stdout and not isinstance(sys.stdout, StdoutToLog):
+        sys.stdout = StdoutToLog(pipeline)
+    return pipeline
 
 
 class SimpleLogger:
-    """简单日志记录器"""
+    """简单日志记录器（兼容旧接口，实际写入异步日志管线）"""
 
     def __init__(self, log_callback=None):
         """
@@ -21,9 +328,9 @@ class SimpleLogger:
             log_callback: 日志回调函数，参数为 (hwnd, level, message)
         """
         self.log_callback = log_callback
-        self.lock = threading.Lock()
+        self.pipeline = get_pipeline()
 
-    def log(self, hwnd: int, level: str, message: str):
+    def log(self, hwnd: int, level: str, message: str, *args):
         """
         记录日志
 
@@ -32,48 +339,38 @@ class SimpleLogger:
             level: 日志级别（INFO, WARN, ERROR）
             message: 日志消息
         """
-        timestamp = time.strftime("%H:%M:%S")
-
-        # 格式化消息
-        if hwnd == 0:
-            formatted_msg = f"[{timestamp}] [{level}] {message}"
-        else:
-            formatted_msg = f"[{timestamp}] [{hwnd}] [{level}] {message}"
+        if not self.pipeline.enabled_for(_level_value(level)):
+            return
 
         # 调用回调（如果有）
         if self.log_callback:
             try:
-                self.log_callback(hwnd, level, message)
+                self.log_callback(hwnd, level, message % args if args else message)
             except:
                 pass
 
-        # 控制台输出（处理中文编码）
-        try:
-            print(formatted_msg)
-        except UnicodeEncodeError:
-            # 如果编码失败，使用ASCII替代
-            ascii_msg = formatted_msg.encode('ascii', 'replace').decode('ascii')
-            print(ascii_msg)
+        self.pipeline.log(hwnd, level, message, *args)
 
-    def info(self, hwnd: int, message: str):
+    def info(self, hwnd: int, message: str, *args):
         """记录INFO级别日志"""
-        self.log(hwnd, "INFO", message)
+        self.log(hwnd, "INFO", message, *args)
 
-    def warn(self, hwnd: int, message: str):
+    def warn(self, hwnd: int, message: str, *args):
         """记录WARN级别日志"""
-        self.log(hwnd, "WARN", message)
+        self.log(hwnd, "WARN", message, *args)
 
-    def warning(self, hwnd: int, message: str):
+    def warning(self, hwnd: int, message: str, *args):
         """记录WARNING级别日志（别名）"""
-        self.log(hwnd, "WARN", message)
+        self.log(hwnd, "WARN", message, *args)
 
-    def error(self, hwnd: int, message: str):
+    def error(self, hwnd: int, message: str, *args):
         """记录ERROR级别日志"""
-        self.log(hwnd, "ERROR", message)
+        self.log(hwnd, "ERROR", message, *args)
 
-    def debug(self, hwnd: int, message: str):
-        """记录DEBUG级别日志"""
-        self.log(hwnd, "DEBUG", message)
+    def debug(self, hwnd: int, message: str, *args):
+        """记录DEBUG级别日志（未开启 DEBUG 时只有一次比较）"""
+        if self.pipeline.level <= DEBUG:
+            self.log(hwnd, "DEBUG", message, *args)
 
 
 # 全局日志实例
@@ -88,7 +385,10 @@ def set_global_logger(logger):
 
 def get_logger() -> SimpleLogger:
     """获取全局日志记录器"""
-    return _global_logger or SimpleLogger()
+    global _global_logger
+    if _global_logger is None:
+        _global_logger = SimpleLogger()
+    return _global_logger
 
 
 if __name__ == "__main__":
@@ -98,3 +398,5 @@ if __name__ == "__main__":
     logger.warn(0, "测试WARN日志")
     logger.error(0, "测试ERROR日志")
     logger.info(0, "测试中文: 游戏自动化工具有效 ✓")
+    logger.debug(0, "默认级别下不输出: %s", "debug")
+    get_pipeline().flush()
@@ -100,28 +100,19 @@ class CreateRoomModule(QThread):
         win32api.keybd_event(win32con.VK_CONTROL, 0, win32con.KEYEVENTF_KEYUP, 0)
 
     def save_session(self, room_id, host_hwnd):
-        session_data = {'room_id': str(room_id), 'host_hwnd': host_hwnd, 'timestamp': time.time()}
-        # Ensure room_session path exists before saving
-        session_path = self.config.get_path('room_session')
-        if not session_path:
-            self.log_signal.emit(host_hwnd, "ERROR", "room_session 配置缺失，无法保存会话")
-            return
-        with open(session_path, 'w', encoding='utf-8') as f:
-            json.dump(session_data, f, ensure_ascii=False, indent=4)
+        self.config.session_store.save(room_id, host_hwnd, None)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     cfg = ConfigManager()
     log = SimpleLogger()
-    res_path = cfg.get_path('window_results')
+    data = cfg.load_window_results()
     
-    if not res_path or not os.path.exists(res_path):
-        print(f"ERR: 找不到文件 {res_path}")
+    if not data:
+        print("ERR: 没有窗口记录")
         sys.exit(1)
     
-    # 读取窗口结果文件并构建列表
-    with open(res_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # 根据窗口记录构建列表
     results = [(i['index'], i['hwnd'], {"user": i['username'], "pass": i['password']}) for i in data]
     
     worker = CreateRoomModule(results, cfg, log)
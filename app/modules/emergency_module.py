@@ -4,9 +4,14 @@ import time
 import os
 import win32con
 import win32gui
-import cv2
 import threading
 
+from app.core.metrics import get_metrics
+from app.logger import get_logger
+
+log = get_logger()
+metrics = get_metrics()
+
 class EmergencyModule:
     def __init__(self, config_manager, engine):
         self.cfg_mgr = config_manager
@@ -18,26 +23,13 @@ class EmergencyModule:
         
         self.image_paths = []
         if self.enabled:
-            img_cfg = self.cfg.get("image_config", {})
-            prefix = img_cfg.get("prefix", "emergency_")
-            count = img_cfg.get("count", 0)
-            ext = img_cfg.get("extension", ".png")
-            
-            print(f"紧急监控 正在预检 {count} 张图片资源...")
-            valid_count = 0
-            
+            count = self.cfg.get("image_config", {}).get("count", 0)
+            # 图片已由模板注册表在引擎初始化时加载并校验，这里只取有效的路径
             for i in range(1, count + 1):
-                fname = f"{prefix}{i}{ext}"
-                path = self.cfg_mgr.get_template_path(fname)
-                if path and os.path.exists(path) and os.path.getsize(path) > 0:
-                    try:
-                        test_img = cv2.imread(path)
-                        if test_img is not None:
-                            self.image_paths.append(path)
-                            valid_count += 1
-                    except:
-                        pass
-            print(f"紧急监控 最终有效加载: {valid_count}/{count} 张")
+                tmpl = self.engine.template(f"emergency_handler.images.{i}")
+                if tmpl is not None:
+                    self.image_paths.append(tmpl.path)
+            log.info(0, "紧急监控 最终有效加载: %s/%s 张", len(self.image_paths), count)
         
         # 独立检测线程
         self.running = False
@@ -51,9 +43,9 @@ class EmergencyModule:
             return
         self.running = True
         self.windows = windows
-        self._thread = threading.Thread(target=self._detection_loop, daemon=True)
+        self._thread = threading.Thread(target=self._detection_loop, name="emergency", daemon=True)
         self._thread.start()
-        print("紧急监控 独立检测线程已启动")
+        log.info(0, "紧急监控 独立检测线程已启动")
 
     def stop(self):
         """停止检测线程"""
@@ -89,14 +81,20 @@ class EmergencyModule:
             if now - last_time < 0.5:  # 0.5秒内不重复处理同一窗口
                 return False
 
-        # 快速匹配所有弹窗图片
+        # 每个窗口只取一帧，所有弹窗图片在同一帧上匹配（帧拷贝次数与图片数量无关）
+        if not self.image_paths:
+            return False
+        screen = self.engine.current_frame(hwnd)
+        if screen is None:
+            return False
         for img_path in self.image_paths:
             try:
-                is_match, score, _ = self.engine.match_template(hwnd, img_path, self.threshold)
+                is_match, score, _ = self.engine.match_in_frame(screen, img_path, self.threshold)
                 
                 if is_match:
                     img_name = os.path.basename(img_path)
-                    print(f"紧急监控 窗口 {hwnd} 捕获弹窗: {img_name} (置信度:{score:.2f})")
+                    log.info(hwnd, "紧急监控 窗口 %s 捕获弹窗: %s (置信度:%.2f)", hwnd, img_name, score)
+                    metrics.inc("emergency_hit", img_name)
                     
                     # 发送空格键消除
                     key_str = self.cfg.get("action_key", "space").lower()
@@ -142,12 +140,14 @@ class EmergencyModule:
         # 开始视觉检测（快速匹配）
         # ==================================================
         try:
-            for img_path in self.image_paths:
-                is_match, _, _ = self.engine.match_template(hwnd, img_path, self.threshold)
+            screen = self.engine.current_frame(hwnd) if self.image_paths else None
+            for img_path in (self.image_paths if screen is not None else []):
+                is_match, _, _ = self.engine.match_in_frame(screen, img_path, self.threshold)
                 
                 if is_match:
                     img_name = os.path.basename(img_path)
-                    print(f"🚨 [全局监控] 窗口 {hwnd} 捕获异常弹窗: {img_name}")
+                    log.warn(hwnd, "🚨 [全局监控] 窗口 %s 捕获异常弹窗: %s", hwnd, img_name)
+                    metrics.inc("emergency_hit", img_name)
                     
                     key_str = self.cfg.get("action_key", "space").lower()
                     vk_code = win32con.VK_SPACE
@@ -19,18 +19,13 @@ class JoinRoomModule(QThread):
         self.logger = logger
 
     def run(self):
-        session_path = self.config.get_path('room_session')
-        if not os.path.exists(session_path):
+        # 过期的 Session 由 SessionStore 直接视为空
+        data = self.config.session_store.get()
+        if not data:
             self.log_signal.emit(0, "ERROR", "未发现有效的房间Session")
             return
-
-        with open(session_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if time.time() - data.get('timestamp', 0) > 600:
-                self.log_signal.emit(0, "ERROR", "房间Session已过期")
-                return
-            room_id = data.get('room_id')
-            host_hwnd = data.get('host_hwnd')
+        room_id = data.get('room_id')
+        host_hwnd = data.get('host_hwnd')
 
         password = self.config.get_config('room_password', '9527')
         chat_coord = self.config.get_config('chat_input_coord', [300, 1060])
@@ -53,15 +48,13 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     cfg = ConfigManager()
     log = SimpleLogger()
-    res_path = cfg.get_path('window_results')
+    data = cfg.load_window_results()
     
-    if os.path.exists(res_path):
-        with open(res_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            window_data = [(i['index'], i['hwnd'], {'user':i['username']}) for i in data]
-            worker = JoinRoomModule(window_data, cfg, log)
-            worker.start()
-            worker.finished.connect(app.quit)
-            sys.exit(app.exec())
+    if data:
+        window_data = [(i['index'], i['hwnd'], {'user':i['username']}) for i in data]
+        worker = JoinRoomModule(window_data, cfg, log)
+        worker.start()
+        worker.finished.connect(app.quit)
+        sys.exit(app.exec())
     else:
         print("未找到窗口数据")
@@ -28,7 +28,10 @@ class LauncherModule(QThread):
         self.target_window_title = config_manager.get_config('target_window_title', '疯狂赛车怀旧版')
 
     def log(self, level, msg):
-        print(f"[{level}] {msg}")
+        if self.logger:
+            self.logger.log(0, level, msg)
+        else:
+            print(f"[{level}] {msg}")
         self.log_signal.emit(0, level, msg)
 
     def get_hwnds_by_title(self, title_part):
@@ -175,9 +178,7 @@ class LauncherModule(QThread):
                 self.arrange_top_right(hwnds)
 
             # 保存结果
-            json_path = self.config_manager.get_path('window_results')
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(final_results, f, ensure_ascii=False, indent=4)
+            self.config_manager.save_window_results(final_results)
             
             self.log("INFO", "所有任务启动完毕并已排列")
             self.all_ready.emit()
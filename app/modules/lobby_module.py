@@ -164,13 +164,11 @@ if __name__ == "__main__":
     cfg = ConfigManager()
     log = SimpleLogger()
 
-    res_path = cfg.get_path('window_results')
+    data = cfg.load_window_results()
     
-    if os.path.exists(res_path):
-        with open(res_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # 确保这里解析出来的 hwnd 是正确的
-            window_results = [(i['index'], i['hwnd'], {'user': i['username'], 'pass': i.get('password','')}) for i in data]
+    if data:
+        # 确保这里解析出来的 hwnd 是正确的
+        window_results = [(i['index'], i['hwnd'], {'user': i['username'], 'pass': i.get('password','')}) for i in data]
         
         worker = LobbyModule(window_results, cfg, log) 
         
@@ -184,6 +182,6 @@ if __name__ == "__main__":
         
         sys.exit(app.exec()) # 保持主进程不退出
     else:
-        print(f"错误: 找不到结果文件 {res_path}")
+        print("错误: 没有窗口记录，请先启动游戏")
 
 
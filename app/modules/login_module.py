@@ -104,39 +104,34 @@ if __name__ == "__main__":
     cfg = ConfigManager()
     log = SimpleLogger()
 
-    # 1. 检查路径
-    res_path = cfg.get_path('window_results')
-    print(f"尝试读取路径: {res_path}") # 调试信息
+    # 1. 读取窗口记录
+    data = cfg.load_window_results()
+    print(f"窗口记录: {len(data)} 个") # 调试信息
     
-    if os.path.exists(res_path):
-        try:
-            with open(res_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # 转换格式以匹配 LoginModule 的输入
-                window_results = [(i['index'], i['hwnd'], {'user': i['username'], 'pass': i.get('password','')}) for i in data]
-            
-            if not window_results:
-                print("错误: json 文件内没有数据。")
-                sys.exit()
-
-            # 2. 实例化
-            worker = LoginModule(window_results, cfg, log)
-
-            # 3. 【核心】连接信号，否则你看不到报错和日志
-            worker.log_signal.connect(lambda hwnd, level, msg: print(f"[{level}] [窗口:{hwnd}] {msg}"))
-            worker.progress_update.connect(lambda idx, msg: print(f"[进度] {msg}"))
-            
-            # 4. 线程结束时退出程序
-            worker.finished.connect(app.quit)
-
-            # 5. 启动
-            print("--- 开始执行登录模块 ---")
-            worker.start()
-
-            # 6. 进入事件循环，等待线程执行完毕
-            sys.exit(app.exec())
-
-        except Exception as e:
-            print(f"启动失败: {e}")
-    else:
-        print(f"错误: 找不到窗口数据文件 {res_path}，请先运行 launcher_module.py")
+    try:
+        # 转换格式以匹配 LoginModule 的输入
+        window_results = [(i['index'], i['hwnd'], {'user': i['username'], 'pass': i.get('password','')}) for i in data]
+        
+        if not window_results:
+            print("错误: 状态库内没有窗口记录。")
+            sys.exit()
+
+        # 2. 实例化
+        worker = LoginModule(window_results, cfg, log)
+
+        # 3. 【核心】连接信号，否则你看不到报错和日志
+        worker.log_signal.connect(lambda hwnd, level, msg: print(f"[{level}] [窗口:{hwnd}] {msg}"))
+        worker.progress_update.connect(lambda idx, msg: print(f"[进度] {msg}"))
+        
+        # 4. 线程结束时退出程序
+        worker.finished.connect(app.quit)
+
+        # 5. 启动
+        print("--- 开始执行登录模块 ---")
+        worker.start()
+
+        # 6. 进入事件循环，等待线程执行完毕
+        sys.exit(app.exec())
+
+    except Exception as e:
+        print(f"启动失败: {e}")
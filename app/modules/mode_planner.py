@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+模式顺序规划
+根据各模式剩余局数、实测的模式切换耗时和每局平均用时，
+规划切换次数最少、总耗时最短的模式顺序（替代按 mode_configs 轮询）
+"""
+
+import json
+import time
+from itertools import permutations
+
+from app.core.run_report import build_report
+from app.logger import get_logger
+
+log = get_logger()
+
+
+class ModePlanner:
+    """模式顺序规划器
+
+    当前模式没做完时留在当前模式（不切换代价为 0），
+    其余有剩余的模式各做一次、连续做完，只需决定它们的先后顺序：
+    枚举排列，取切换耗时之和最小的顺序（模式数较多时退化为贪心）
+    """
+
+    MAX_PERMUTE = 6      # 超过该数量的待做模式改用贪心
+    EMA_ALPHA = 0.3      # 切换耗时的指数平滑系数
+    DURATION_TTL = 60.0  # 每局用时的统计缓存（秒），避免每次起跑判断都查库
+
+    def __init__(self, config_manager, store, progress):
+        """
+        Args:
+            config_manager: ConfigManager 实例
+            store: StateStore 实例（读取对局历史、保存实测切换耗时）
+            progress: ProgressService 实例（剩余局数）
+        """
+        self.cfg = config_manager
+        self.store = store
+        self.progress = progress
+
+        planner_cfg = self.cfg.get_config("mode_planner", {}) or {}
+        self.default_switch_sec = planner_cfg.get("default_switch_sec", 7.0)
+        self.default_game_sec = planner_cfg.get("default_game_sec", 240.0)
+        self.history_hours = planner_cfg.get("history_hours", 24.0)
+
+        try:
+            self._switch_costs = json.loads(self.store.get_meta("switch_costs", "{}"))
+        except Exception:
+            self._switch_costs = {}
+        self._last_order = None
+        self._durations = None
+        self._durations_at = 0.0
+
+    # ------------------ 代价 ------------------
+
+    def switch_cost(self, from_id, to_id):
+        """从 from_id 切到 to_id 的耗时（秒）；同一模式为 0"""
+        if from_id == to_id:
+            return 0.0
+        return self._switch_costs.get(f"{from_id}>{to_id}", self.default_switch_sec)
+
+    def observe_switch(self, from_id, to_id, seconds):
+        """记录一次实测的切换耗时（指数平滑后存入状态库）"""
+        if not from_id or not to_id or from_id == to_id:
+            return
+        key = f"{from_id}>{to_id}"
+        old = self._switch_costs.get(key)
+        self._switch_costs[key] = seconds if old is None else old + self.EMA_ALPHA * (seconds - old)
+        try:
+            self.store.set_meta("switch_costs", json.dumps(self._switch_costs))
+        except Exception as e:
+            log.error(0, "[模式规划] 保存切换耗时失败: %s", e)
+
+    def game_durations(self):
+        """{mode_id: 平均每局周期(秒)}，没有历史时用默认值"""
+        now = time.time()
+        if self._durations is None or now - self._durations_at > self.DURATION_TTL:
+            try:
+                report = build_report(self.store, self.progress, hours=self.history_hours)
+                self._durations = {m["id"]: m["avg_cycle_sec"] or self.default_game_sec for m in report["modes"]}
+            except Exception:
+                self._durations = {}
+            self._durations_at = now
+        return self._durations
+
+    # ------------------ 规划 ------------------
+
+    def plan(self, current_id):
+        """
+        Returns:
+            dict: {"steps": [{"id", "games", "switch_sec", "game_sec"}], "switches", "total_sec"}
+                  steps 为空表示全部完成
+        """
+        snap = self.progress.snapshot()
+        remaining = {m["id"]: m["target"] - m["done"] for m in snap["modes"] if m["target"] > m["done"]}
+        if not remaining:
+            return {"steps": [], "switches": 0, "total_sec": 0.0}
+
+        others = [m for m in remaining if m != current_id]
+        if len(others) <= self.MAX_PERMUTE:
+            order = min(permutations(others), key=lambda seq: self._path_cost(current_id, seq))
+        else:
+            order = self._greedy(current_id, others)
+        if current_id in remaining:
+            order = (current_id,) + tuple(order)
+
+        durations = self.game_durations()
+        steps, prev, total = [], current_id, 0.0
+        for mode_id in order:
+            game_sec = durations.get(mode_id, self.default_game_sec)
+            switch_sec = self.switch_cost(prev, mode_id)
+            steps.append({"id": mode_id, "games": remaining[mode_id],
+                          "switch_sec": switch_sec, "game_sec": game_sec})
+            total += switch_sec + remaining[mode_id] * game_sec
+            prev = mode_id
+        return {"steps": steps, "switches": sum(1 for s in steps if s["switch_sec"] > 0),
+                "total_sec": total}
+
+    def next_mode(self, current_id):
+        """规划中的下一个模式（应该正在跑的模式），全部完成时返回 None"""
+        result = self.plan(current_id)
+        if not result["steps"]:
+            return None
+        order = [s["id"] for s in result["steps"]]
+        if order != self._last_order:
+            self._last_order = order
+            summary = " -> ".join(f"{s['id']}x{s['games']}" for s in result["steps"])
+            log.info(0, "[模式规划] %s | 切换 %s 次，预计 %.1f 分钟", summary, result['switches'], result['total_sec'] / 60)
+        return order[0]
+
+    def _path_cost(self, start_id, seq):
+        cost, prev = 0.0, start_id
+        for mode_id in seq:
+            cost += self.switch_cost(prev, mode_id)
+            prev = mode_id
+        return cost
+
+    def _greedy(self, start_id, modes):
+        order, prev, left = [], start_id, list(modes)
+        while left:
+            nxt = min(left, key=lambda m: self.switch_cost(prev, m))
+            order.append(nxt)
+            left.remove(nxt)
+            prev = nxt
+        return tuple(order)
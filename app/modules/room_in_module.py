@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-import os
+import cv2
 
 class RoomModule:
     def __init__(self, config, engine):
@@ -9,17 +9,11 @@ class RoomModule:
         self.hwnd_ctx = None
 
     def _is_feature_present(self, config_key, threshold=0.8):
-        """通用特征检测函数"""
-        img_name = self.config.get_config(config_key)
-        if not img_name: 
+        """通用特征检测函数（模板按配置键从注册表取，缺失时启动阶段已记录）"""
+        tmpl = self.engine.template(config_key)
+        if tmpl is None:
             return False
-        
-        path = self.config.get_template_path(img_name)
-        
-        if not path or not os.path.exists(path):
-            return False
-        
-        return self.engine.match_template(self.hwnd_ctx, path, threshold)[0]
+        return self.engine.match_template(self.hwnd_ctx, tmpl.path, threshold)[0]
 
     def is_in_room(self, hwnd):
         self.hwnd_ctx = hwnd
@@ -29,17 +23,46 @@ class RoomModule:
         self.hwnd_ctx = hwnd
         return self._is_feature_present('start_button_img', 0.8)
 
+    def locate_start_button(self, hwnd, roi=None):
+        """定位开始按钮，返回 (是否找到, 中心坐标)；roi 可限定在学到的位置附近"""
+        tmpl = self.engine.template('start_button_img')
+        if tmpl is None:
+            return False, None
+        found, _, center = self.engine.match_template(hwnd, tmpl.path, 0.8, roi)
+        return found, center
+
+    def locate_start_buttons(self, hwnds):
+        """批量定位多个窗口的开始按钮（一次 mosaic 匹配），返回 {hwnd: (是否找到, 中心坐标)}"""
+        tmpl = self.engine.template('start_button_img')
+        if tmpl is None:
+            return {hwnd: (False, None) for hwnd in hwnds}
+        results = self.engine.match_batch(hwnds, tmpl.path, 0.8)
+        return {hwnd: (found, center) for hwnd, (found, _, center) in results.items()}
+
+    def start_button_size(self):
+        """开始按钮模板尺寸 (w, h)，模板缺失时返回 (0, 0)"""
+        tmpl = self.engine.template('start_button_img')
+        if tmpl is None:
+            return 0, 0
+        return tmpl.size
+
     def is_member_ready(self, hwnd):
         self.hwnd_ctx = hwnd
         return self._is_feature_present('ready_success_img', 0.8)
 
+    def members_ready(self, hwnds):
+        """批量检测多个成员窗口的准备状态，返回 {hwnd: 是否已准备}"""
+        tmpl = self.engine.template('ready_success_img')
+        if tmpl is None:
+            return {hwnd: False for hwnd in hwnds}
+        return {hwnd: r[0] for hwnd, r in self.engine.match_batch(hwnds, tmpl.path, 0.8).items()}
+
     def is_in_lobby(self, hwnd):
         self.hwnd_ctx = hwnd
         return self._is_feature_present('lobby_entry_img', 0.75)
 
-    def click_start(self, hwnd):
-        path = self.config.get_template_path(self.config.get_config('start_button_img'))
-        found, _, center = self.engine.match_template(hwnd, path, threshold=0.8)
+    def click_start(self, hwnd, roi=None):
+        found, center = self.locate_start_button(hwnd, roi)
         if found:
             self.engine.click(hwnd, center[0], center[1])
             return True
@@ -53,4 +76,62 @@ class RoomModule:
         import time
         time.sleep(0.5)
         # 返回点击后是否准备就绪
-        return self.is_member_ready(hwnd)
\ No newline at end of file
+        return self.is_member_ready(hwnd)
+
+    def read_roster(self, hwnd):
+        """
+        从房主窗口的一帧画面读取全部玩家槽位（player_status ROI）
+        返回 {"slots": [{"occupied", "ready"}], "occupied": n, "ready": n}；
+        未启用、准备模板缺失或截图失败时返回 None，由调用方回退到逐窗口检测
+        """
+        cfg = self.config.get_config("room_roster", {}) or {}
+        if not cfg.get("enabled"):
+            return None
+
+        slots = cfg.get("slots") or self._grid_slots(cfg)
+        if not slots:
+            return None
+
+        # 准备标记从注册表取（启动时已校验、随热重载更新），未单独配置时用 ready_success_img
+        ready_tmpl = self.engine.template("room_roster.ready_img") or self.engine.template("ready_success_img")
+        if ready_tmpl is None:
+            return None
+
+        screen = self.engine.current_frame(hwnd)
+        if screen is None or screen.size == 0:
+            return None
+
+        ready_path = ready_tmpl.path
+        ready_thr = cfg.get("ready_threshold", ready_tmpl.threshold)
+        occupied_std = cfg.get("occupied_std", 18.0)
+
+        result = []
+        for slot in slots:
+            x, y, w, h = self.engine.roi_to_xywh(slot)
+            cell = screen[y:y+h, x:x+w]
+            if cell.size == 0:
+                result.append({"occupied": False, "ready": False})
+                continue
+            # 空槽位是平整的底色，有玩家时头像/昵称带来明显的灰度起伏
+            gray_code = cv2.COLOR_BGRA2GRAY if cell.ndim == 3 and cell.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            occupied = float(cv2.cvtColor(cell, gray_code).std()) >= occupied_std
+            ready = occupied and self.engine.match_in_frame(screen, ready_path, ready_thr, slot)[0]
+            result.append({"occupied": occupied, "ready": bool(ready)})
+
+        return {
+            "slots": result,
+            "occupied": sum(1 for r in result if r["occupied"]),
+            "ready": sum(1 for r in result if r["ready"]),
+        }
+
+    def _grid_slots(self, cfg):
+        """未单独配置 slots 时，把 ROI 按 slot_grid [行, 列] 等分为槽位"""
+        roi = self.config.get_config("rois", {}).get(cfg.get("roi", "player_status"))
+        rect = self.engine.roi_to_xywh(roi)
+        if not rect:
+            return []
+        x, y, w, h = rect
+        rows, cols = cfg.get("slot_grid", [1, 1])
+        cw, ch = w // cols, h // rows
+        return [[x + c * cw, y + r * ch, x + (c + 1) * cw, y + (r + 1) * ch]
+                for r in range(rows) for c in range(cols)]
@@ -22,7 +22,11 @@ if project_root not in sys.path:
 from app.core.config_manager import ConfigManager
 from app.core.game_engine import GameEngine
 from app.controllers.task_controller import TaskController
+from app.controllers.account_rotation import AccountRotation
 from app.modules.launcher_module import LauncherModule
+from app.logger import get_logger
+
+log = get_logger()
 
 
 class AutoGameStateMachine:
@@ -42,7 +46,7 @@ class AutoGameStateMachine:
     def execute_full_flow(self) -> bool:
         """执行完整的启动‑调度流程，返回成功与否"""
         os.system('cls' if os.name == 'nt' else 'clear')
-        print("自动游戏全集成启动流程")
+        log.info(0, "自动游戏全集成启动流程")
         try:
             self._cleanup_environment()
             if not self._launch_windows():
@@ -51,23 +55,18 @@ class AutoGameStateMachine:
                 return False
             return True
         except Exception as e:
-            print(f"流程异常中断: {e}")
-            traceback.print_exc()
+            log.error(0, "流程异常中断: %s\n%s", e, traceback.format_exc())
             return False
 
     # ---------------------------------------------------------------------
     # 私有帮助方法
     # ---------------------------------------------------------------------
     def _cleanup_environment(self) -> None:
-        """删除旧的 session / 结果文件，以防干扰"""
-        for key in ("room_session", "window_results"):
-            p = self.cfg_mgr.get_path(key)
-            if p and os.path.exists(p):
-                try:
-                    os.remove(p)
-                    print(f"清理旧文件: {os.path.basename(p)}")
-                except Exception:
-                    pass
+        """清理旧的 session / 窗口记录，以防干扰"""
+        if self.cfg_mgr.reset_session():
+            log.info(0, "清理旧 Session")
+        if self.cfg_mgr.clear_window_results():
+            log.info(0, "清理旧窗口记录")
 
     def _launch_windows(self) -> bool:
         """读取账号并启动游戏窗口，返回是否成功"""
@@ -81,8 +80,10 @@ class AutoGameStateMachine:
                         u, p = line.strip().split(",")
                         accounts.append({"username": u, "password": p})
         if not accounts:
-            print("❌ 错误: accounts.txt 为空或不存在")
+            log.error(0, "❌ 错误: accounts.txt 为空或不存在")
             return False
+        # 启用账号轮换时只启动固定数量的窗口，其余账号排队
+        accounts = AccountRotation(self.cfg_mgr, self.cfg_mgr.state_store).launch_accounts(accounts)
         # 配置路径（若未在 user_config 中设置则使用默认硬编码）
         box_path = self.cfg_mgr.get_user_config('paths.box_path',
                                                r'D:\DataBase\game\auto_game\app\2Box.exe')
@@ -108,31 +109,24 @@ class AutoGameStateMachine:
             self.launcher.start()
             timeout = 300  # 5 分钟超时
             start_time = time.time()
-            results_path = self.cfg_mgr.get_path("window_results")
             while time.time() - start_time < timeout and not self.launcher_finished:
                 if self.qapp:
                     self.qapp.processEvents()
-                if results_path and os.path.exists(results_path):
-                    try:
-                        with open(results_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                        if len(data) >= len(accounts):
-                            print(f"所有窗口已就绪 ({len(data)}/{len(accounts)})")
-                            self.launcher_finished = True
-                            self.launcher_success = True
-                    except Exception:
-                        pass
+                data = self.cfg_mgr.load_window_results()
+                if data and len(data) >= len(accounts):
+                    log.info(0, "所有窗口已就绪 (%s/%s)", len(data), len(accounts))
+                    self.launcher_finished = True
+                    self.launcher_success = True
                 time.sleep(0.5)
             if self.launcher_finished and self.launcher_success:
                 return True
             if not self.launcher_finished:
-                print("⏳ 启动窗口超时")
+                log.error(0, "⏳ 启动窗口超时")
             else:
-                print("❌ Launcher 执行失败")
+                log.error(0, "❌ Launcher 执行失败")
             return False
         except Exception as e:
-            print(f"❌ Launcher 运行异常: {e}")
-            traceback.print_exc()
+            log.error(0, "❌ Launcher 运行异常: %s\n%s", e, traceback.format_exc())
             return False
 
     def _on_launcher_ready(self) -> None:
@@ -146,16 +140,14 @@ class AutoGameStateMachine:
 
     def _start_controller(self) -> bool:
         """读取窗口信息并启动任务调度中心"""
-        results_path = self.cfg_mgr.get_path("window_results")
-        if not results_path or not os.path.exists(results_path):
+        data = self.cfg_mgr.load_window_results()
+        if not data:
             return False
         try:
-            with open(results_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
             combined_list = [(i["index"], i["hwnd"], i) for i in data]
             if not combined_list:
                 return False
-            print(f"调度中心接管 {len(combined_list)} 个窗口任务")
+            log.info(0, "调度中心接管 %s 个窗口任务", len(combined_list))
             self.controller = TaskController(combined_list, self.cfg_mgr, self.engine)
             self.controller.start_monitor()
             return True
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+日志面板
+日志管线的写线程只往缓冲区追加记录，UI 线程每 100ms 取一次、一批插入模型；
+模型行数有上限，按窗口/级别筛选由代理模型完成，不重新渲染文本；
+完整历史保留在磁盘日志（含滚动压缩文件）中，可在面板里搜索
+"""
+
+import time
+import threading
+from collections import deque
+
+from PyQt6.QtWidgets import (
+    QGroupBox, QVBoxLayout, QHBoxLayout, QListView, QPushButton, QCheckBox,
+    QComboBox, QLineEdit, QLabel, QDialog, QPlainTextEdit, QFileDialog, QMessageBox,
+    QAbstractItemView
+)
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QFont
+
+from app.logger import DEBUG, INFO, WARN, ERROR, search_logs
+
+LEVEL_COLORS = {
+    DEBUG: QColor("#808080"),
+    WARN: QColor("#dcdcaa"),
+    ERROR: QColor("#f48771"),
+}
+
+
+class LogModel(QAbstractListModel):
+    """有上限的日志行模型：每行 (text, level, hwnd)"""
+
+    LevelRole = Qt.ItemDataRole.UserRole + 1
+    HwndRole = Qt.ItemDataRole.UserRole + 2
+
+    def __init__(self, max_rows=5000, parent=None):
+        super().__init__(parent)
+        self.max_rows = max_rows
+        self._rows = deque()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        text, level, hwnd = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return text
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return LEVEL_COLORS.get(level)
+        if role == self.LevelRole:
+            return level
+        if role == self.HwndRole:
+            return hwnd
+        return None
+
+    def append_rows(self, rows):
+        """一次插入一批行，超出上限时从头部整块删除"""
+        if not rows:
+            return
+        rows = rows[-self.max_rows:]
+        overflow = len(self._rows) + len(rows) - self.max_rows
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._rows.popleft()
+            self.endRemoveRows()
+        start = len(self._rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows.clear()
+        self.endResetModel()
+
+
+class LogFilterProxy(QSortFilterProxyModel):
+    """按窗口句柄和最低级别筛选"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hwnd = None      # None 表示全部窗口
+        self.min_level = DEBUG
+
+    def set_filter(self, hwnd=None, min_level=DEBUG):
+        self.hwnd = hwnd
+        self.min_level = min_level
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        model = self.sourceModel()
+        index = model.index(row, 0, parent)
+        if model.data(index, LogModel.LevelRole) < self.min_level:
+            return False
+        return self.hwnd is None or model.data(index, LogModel.HwndRole) == self.hwnd
+
+
+class LogPanel(QGroupBox):
+    """运行日志面板"""
+
+    FLUSH_INTERVAL_MS = 100
+
+    search_done = pyqtSignal(str, list)
+
+    def __init__(self, max_rows=5000, parent=None):
+        super().__init__("运行日志", parent)
+        self.pipeline = None
+        self._unsubscribe = None
+        # 写线程 -> UI 线程的缓冲区（deque 的 append/popleft 线程安全）
+        self._pending = deque()
+        self._hwnds = set()
+
+        self.model = LogModel(max_rows, self)
+        self.proxy = LogFilterProxy(self)
+        self.proxy.setSourceModel(self.model)
+        self._build_ui()
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start(self.FLUSH_INTERVAL_MS)
+        self.search_done.connect(self._show_search_result)
+
+    def _build_ui(self):
+        layout = QVBoxLayout(self)
+
+        # 筛选
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("窗口:"))
+        self.hwnd_combo = QComboBox()
+        self.hwnd_combo.addItem("全部", None)
+        self.hwnd_combo.addItem("系统", 0)
+        self.hwnd_combo.currentIndexChanged.connect(self._apply_filter)
+        filter_layout.addWidget(self.hwnd_combo)
+        filter_layout.addWidget(QLabel("级别:"))
+        self.level_combo = QComboBox()
+        for name, level in (("DEBUG", DEBUG), ("INFO", INFO), ("WARN", WARN), ("ERROR", ERROR)):
+            self.level_combo.addItem(name, level)
+        self.level_combo.currentIndexChanged.connect(self._apply_filter)
+        filter_layout.addWidget(self.level_combo)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+
+        self.view = QListView()
+        self.view.setModel(self.proxy)
+        self.view.setUniformItemSizes(True)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.view.setFont(QFont("Consolas", 9))
+        self.view.setStyleSheet("""
+            QListView {
+                background-color: #1e1e1e;
+                color: #d4d4d4;
+                font-family: Consolas, Monaco, monospace;
+                font-size: 12px;
+                border: 1px solid #3e3e3e;
+            }
+        """)
+        layout.addWidget(self.view)
+
+        # 日志操作按钮
+        log_btn_layout = QHBoxLayout()
+
+        clear_btn = QPushButton("清空日志")
+        clear_btn.clicked.connect(self.model.clear)
+        log_btn_layout.addWidget(clear_btn)
+
+        save_log_btn = QPushButton("保存日志")
+        save_log_btn.clicked.connect(self.save_log)
+        log_btn_layout.addWidget(save_log_btn)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("搜索历史日志...")
+        self.search_edit.returnPressed.connect(self.search_history)
+        log_btn_layout.addWidget(self.search_edit, 1)
+
+        self.search_btn = QPushButton("搜索")
+        self.search_btn.clicked.connect(self.search_history)
+        log_btn_layout.addWidget(self.search_btn)
+
+        auto_scroll_check = QCheckBox("自动滚动")
+        auto_scroll_check.setChecked(True)
+        self.auto_scroll = True
+        auto_scroll_check.stateChanged.connect(lambda state: setattr(self, 'auto_scroll', bool(state)))
+        log_btn_layout.addWidget(auto_scroll_check)
+
+        layout.addLayout(log_btn_layout)
+
+    # ------------------ 数据 ------------------
+
+    def attach(self, pipeline):
+        """订阅日志管线（回调在写线程中执行，只做入队）"""
+        self.pipeline = pipeline
+        self._unsubscribe = pipeline.subscribe(self._pending.append)
+
+    def detach(self):
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self._timer.stop()
+
+    def flush(self):
+        """取出缓冲区中的全部批次，一次插入模型并滚动一次"""
+        rows = []
+        try:
+            while True:
+                rows.extend((r.text, r.level, r.hwnd) for r in self._pending.popleft())
+        except IndexError:
+            pass
+        if not rows:
+            return
+        for _, _, hwnd in rows:
+            if hwnd and hwnd not in self._hwnds:
+                self._hwnds.add(hwnd)
+                self.hwnd_combo.addItem(str(hwnd), hwnd)
+        self.model.append_rows(rows)
+        if self.auto_scroll:
+            self.view.scrollToBottom()
+
+    def _apply_filter(self):
+        self.proxy.set_filter(self.hwnd_combo.currentData(), self.level_combo.currentData())
+
+    def visible_text(self):
+        return "\n".join(self.proxy.data(self.proxy.index(i, 0)) for i in range(self.proxy.rowCount()))
+
+    def save_log(self):
+        """保存当前显示（已筛选）的日志"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "保存日志", f"log_{time.strftime('%Y%m%d_%H%M%S')}.txt",
+            "文本文件 (*.txt)"
+        )
+        if file_path:
+            try:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    f.write(self.visible_text())
+                QMessageBox.information(self, "成功", "日志已保存！")
+            except Exception as e:
+                QMessageBox.critical(self, "错误", f"保存失败: {e}")
+
+    # ------------------ 历史搜索 ------------------
+
+    def search_history(self):
+        keyword = self.search_edit.text().strip()
+        if not keyword or not self.pipeline or not self.pipeline.log_path:
+            return
+        self.search_btn.setEnabled(False)
+        path = self.pipeline.log_path
+
+        # 压缩文件解压较慢，放到后台线程
+        def worker():
+            try:
+                lines = search_logs(path, keyword)
+            except Exception as e:
+                lines = [f"搜索失败: {e}"]
+            self.search_done.emit(keyword, lines)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_search_result(self, keyword, lines):
+        self.search_btn.setEnabled(True)
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"历史日志搜索: {keyword} ({len(lines)} 条)")
+        dialog.resize(1000, 600)
+        layout = QVBoxLayout(dialog)
+        text = QPlainTextEdit()
+        text.setReadOnly(True)
+        text.setPlainText("\n".join(lines) if lines else "没有匹配的日志")
+        layout.addWidget(text)
+        dialog.show()
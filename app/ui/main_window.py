@@ -29,24 +29,13 @@ if str(project_root) not in sys.path:
 
 from app.core.config_manager import ConfigManager
 from app.core.game_engine import GameEngine
+from app.core.run_report import build_report, format_report, fmt_sec
+from app.core.profiler import toggle_profiler
+from app.logger import configure_logging, get_logger
+from app.ui.log_view import LogPanel
 from app.modules.state_machine import AutoGameStateMachine
 
 
-class LogRedirector:
-    """重定向标准输出到UI日志框"""
-    def __init__(self, signal):
-        self.signal = signal
-        self.original_stdout = sys.stdout
-        
-    def write(self, text):
-        if text.strip():
-            self.signal.emit(text)
-        self.original_stdout.write(text)
-        
-    def flush(self):
-        self.original_stdout.flush()
-
-
 class FlowWorker(QThread):
     """后台运行游戏流程的工作线程（启动+运行）"""
     log_signal = pyqtSignal(str)
@@ -62,9 +51,6 @@ class FlowWorker(QThread):
     def run(self):
         self.running = True
         try:
-            redirector = LogRedirector(self.log_signal)
-            sys.stdout = redirector
-
             # 确保使用最新的分辨率配置
             from app.core.game_engine import GameEngine
             GameEngine._update_resolution()
@@ -82,7 +68,6 @@ class FlowWorker(QThread):
             self.progress_signal.emit(0, f"运行错误: {str(e)}")
             self.finished_signal.emit(False)
         finally:
-            sys.stdout = sys.__stdout__
             self.running = False
 
     def stop(self):
@@ -106,9 +91,6 @@ class LaunchOnlyWorker(QThread):
     def run(self):
         self.running = True
         try:
-            redirector = LogRedirector(self.log_signal)
-            sys.stdout = redirector
-
             # 读取账号
             accounts_path = self.cfg_mgr.get_path('accounts')
             accounts = []
@@ -124,6 +106,10 @@ class LaunchOnlyWorker(QThread):
                 self.finished_signal.emit(False, 0)
                 return
 
+            # 启用账号轮换时只启动固定数量的窗口，其余账号排队
+            from app.controllers.account_rotation import AccountRotation
+            accounts = AccountRotation(self.cfg_mgr, self.cfg_mgr.state_store).launch_accounts(accounts)
+
             self.progress_signal.emit(10, "正在启动游戏...")
 
             # 获取路径配置
@@ -140,11 +126,7 @@ class LaunchOnlyWorker(QThread):
                 game_path=game_path,
                 accounts=accounts,
                 config_manager=self.cfg_mgr,
-                logger=None,
-            )
-
-            self.launcher.log_signal.connect(
-                lambda hwnd, level, msg: self.log_signal.emit(f"[{level}] {msg}")
+                logger=get_logger(),
             )
 
             # 启动 launcher
@@ -159,7 +141,6 @@ class LaunchOnlyWorker(QThread):
             # 等待启动完成
             timeout = 300
             start_time = time.time()
-            results_path = self.cfg_mgr.get_path("window_results")
             success = False
             window_count = 0
 
@@ -167,17 +148,12 @@ class LaunchOnlyWorker(QThread):
                 if self.qapp:
                     self.qapp.processEvents()
 
-                if results_path and os.path.exists(results_path):
-                    try:
-                        with open(results_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                        if len(data) >= len(accounts):
-                            window_count = len(data)
-                            self.progress_signal.emit(100, f"启动完成: {window_count} 个窗口")
-                            success = True
-                            break
-                    except:
-                        pass
+                data = self.cfg_mgr.load_window_results()
+                if data and len(data) >= len(accounts):
+                    window_count = len(data)
+                    self.progress_signal.emit(100, f"启动完成: {window_count} 个窗口")
+                    success = True
+                    break
 
                 time.sleep(0.5)
 
@@ -192,7 +168,6 @@ class LaunchOnlyWorker(QThread):
             self.log_signal.emit(traceback.format_exc())
             self.finished_signal.emit(False, 0)
         finally:
-            sys.stdout = sys.__stdout__
             self.running = False
 
     def stop(self):
@@ -256,20 +231,9 @@ class TaskOnlyWorker(QThread):
     def run(self):
         self.running = True
         try:
-            redirector = LogRedirector(self.log_signal)
-            sys.stdout = redirector
-
-            # 检查 window_results.json 是否存在
-            results_path = self.cfg_mgr.get_path("window_results")
-            if not results_path or not os.path.exists(results_path):
-                self.log_signal.emit("[错误] 未找到已启动的窗口，请先启动游戏")
-                self.finished_signal.emit(False)
-                return
-
             # 读取窗口信息
             try:
-                with open(results_path, 'r', encoding='utf-8') as f:
-                    window_data = json.load(f)
+                window_data = self.cfg_mgr.load_window_results()
 
                 if not window_data:
                     self.log_signal.emit("[错误] 窗口数据为空，请重新启动游戏")
@@ -307,8 +271,7 @@ class TaskOnlyWorker(QThread):
                         return
                     
                     # 保存新的窗口信息
-                    with open(results_path, 'w', encoding='utf-8') as f:
-                        json.dump(valid_windows, f, ensure_ascii=False, indent=4)
+                    self.cfg_mgr.save_window_results(valid_windows)
                     self.log_signal.emit("[信息] 窗口信息已更新")
 
                 self.log_signal.emit(f"[信息] {len(valid_windows)} 个窗口有效，开始任务...")
@@ -339,65 +302,44 @@ class TaskOnlyWorker(QThread):
             engine = GameEngine(self.cfg_mgr)
             self.controller = TaskController(window_results, self.cfg_mgr, engine)
 
-            # 获取总目标局数用于计算进度
-            mode_control = self.cfg_mgr.user_config_data.get('mode_control', {})
-            tasks = mode_control.get('tasks', [])
-            total_target = 0
-            mode_targets = {}
-            for task in tasks:
-                target = task.get('target', 0)
-                total_target += target
-                mode_targets[task.get('id', '')] = target
-            
-            if total_target == 0:
-                total_target = 20  # 默认值
-                mode_targets = {'mode_item': 5, 'mode_speed': 15}
-
             self.progress_signal.emit(20, "任务控制器运行中...")
-            
+
+            # 进度由 ProgressService 推送（不再轮询进度文件）
+            all_done = threading.Event()
+            last_progress = [20]
+
+            def on_progress(snap):
+                # 计算进度百分比 (20%起始, 到100%)
+                if snap["target"] > 0:
+                    current_progress = int(20 + min(snap["done"] / snap["target"], 1.0) * 80)
+                else:
+                    current_progress = 20
+
+                # 只更新进度变化时
+                if current_progress != last_progress[0]:
+                    parts = " ".join(f"{m['name']}:{m['done']}/{m['target']}" for m in snap["modes"])
+                    self.progress_signal.emit(current_progress, f"进行中 - {parts}")
+                    last_progress[0] = current_progress
+
+                if snap["all_done"]:
+                    all_done.set()
+
+            unsubscribe = self.cfg_mgr.progress.subscribe(on_progress, replay=False)
+
             # 在单独线程中运行控制器
-            import threading
-            controller_thread = threading.Thread(target=self.controller.start_monitor)
+            controller_thread = threading.Thread(target=self.controller.start_monitor, name="controller")
             controller_thread.daemon = True
             controller_thread.start()
-            
-            # 实时更新进度
-            last_progress = 20
-            while controller_thread.is_alive() and self.running:
-                try:
-                    # 读取当前进度
-                    state_path = os.path.join(self.cfg_mgr.DATA_DIR, "switcher_state.json")
-                    if os.path.exists(state_path):
-                        with open(state_path, 'r', encoding='utf-8') as f:
-                            state = json.load(f)
-                        daily_progress = state.get('daily_progress', {})
-                        
-                        # 计算已完成局数
-                        item_done = daily_progress.get('mode_item', 0)
-                        speed_done = daily_progress.get('mode_speed', 0)
-                        total_done = item_done + speed_done
-                        
-                        # 计算进度百分比 (20%起始, 到100%)
-                        if total_target > 0:
-                            game_progress = min(total_done / total_target, 1.0)
-                            current_progress = int(20 + game_progress * 80)
-                        else:
-                            current_progress = 20
-                        
-                        # 只更新进度变化时
-                        if current_progress != last_progress:
-                            self.progress_signal.emit(current_progress, 
-                                f"进行中 - 道具赛:{item_done}/{mode_targets.get('mode_item', 5)} 疾爽赛:{speed_done}/{mode_targets.get('mode_speed', 15)}")
-                            last_progress = current_progress
-                        
-                        # 检查是否已完成所有任务
-                        if total_done >= total_target:
-                            self.progress_signal.emit(100, "所有任务已完成")
-                            break
-                except Exception as e:
-                    pass
-                
-                time.sleep(2)  # 每2秒检查一次
+
+            try:
+                while controller_thread.is_alive() and self.running and not all_done.is_set():
+                    controller_thread.join(timeout=0.5)
+            finally:
+                unsubscribe()
+
+            # 检查是否已完成所有任务
+            if all_done.is_set():
+                self.progress_signal.emit(100, "所有任务已完成")
             
             # 等待控制器结束
             controller_thread.join(timeout=5)
@@ -413,7 +355,6 @@ class TaskOnlyWorker(QThread):
             self.progress_signal.emit(0, f"运行错误: {str(e)}")
             self.finished_signal.emit(False)
         finally:
-            sys.stdout = sys.__stdout__
             self.running = False
 
     def stop(self):
@@ -424,18 +365,22 @@ class TaskOnlyWorker(QThread):
 
 class MainWindow(QMainWindow):
     """主窗口类"""
+
+    # ProgressService 的回调可能来自任意线程，经信号切回 UI 线程
+    progress_changed = pyqtSignal(dict)
     
     def __init__(self):
         super().__init__()
         self.cfg_mgr = ConfigManager()
+        self.log = get_logger()
         self.flow_worker = None
         self.launch_worker = None
         self.task_worker = None
-        self.stats_timer = None
         self.init_ui()
         self.apply_modern_style()
+        self.init_log_subscription()
         self.load_data()
-        self.init_stats_timer()
+        self.init_progress_subscription()
 
         
     def apply_modern_style(self):
@@ -632,6 +577,12 @@ class MainWindow(QMainWindow):
         stats_layout.addWidget(speed_card)
         
         card_layout.addLayout(stats_layout)
+
+        # 运行分析（最近 24 小时的对局记录）
+        self.run_stats_label = QLabel("每小时: -- 局 | 预计完成: --")
+        self.run_stats_label.setStyleSheet("font-size: 13px; color: #9aa5ce;")
+        self.run_stats_label.setWordWrap(True)
+        card_layout.addWidget(self.run_stats_label)
         layout.addWidget(card)
         
         # === 操作按钮区域 ===
@@ -686,6 +637,16 @@ class MainWindow(QMainWindow):
         # 签到功能预留，暂时禁用（等待模块实现）
         # self.check_in_btn.setEnabled(False)
         manual_layout.addWidget(self.check_in_btn)
+
+        self.run_report_btn = QPushButton("📊 运行报告")
+        self.run_report_btn.setToolTip("最近 24 小时的对局耗时分析")
+        self.run_report_btn.clicked.connect(self.show_run_report)
+        manual_layout.addWidget(self.run_report_btn)
+
+        self.profile_btn = QPushButton("🔥 性能采样")
+        self.profile_btn.setToolTip("对运行中的任务采样调用栈，结果写入 data/profiles（再点一次提前结束）")
+        self.profile_btn.clicked.connect(lambda: toggle_profiler(self.cfg_mgr))
+        manual_layout.addWidget(self.profile_btn)
         
         manual_layout.addStretch()
         layout.addLayout(manual_layout)
@@ -826,46 +787,10 @@ class MainWindow(QMainWindow):
         return tab
         
     def create_log_group(self):
-        """创建日志显示组"""
-        group = QGroupBox("运行日志")
-        layout = QVBoxLayout(group)
-        
-        self.log_text: QPlainTextEdit = QPlainTextEdit()
-        self.log_text.setReadOnly(True)
-        self.log_text.setMaximumBlockCount(1000)  # 限制最大行数
-        self.log_text.setStyleSheet("""
-            QPlainTextEdit {
-                background-color: #1e1e1e;
-                color: #d4d4d4;
-                font-family: Consolas, Monaco, monospace;
-                font-size: 12px;
-                border: 1px solid #3e3e3e;
-            }
-        """)
-        layout.addWidget(self.log_text)
-        
-        # 日志操作按钮
-        log_btn_layout = QHBoxLayout()
-        
-        clear_btn = QPushButton("清空日志")
-        clear_btn.clicked.connect(self.clear_log)
-        log_btn_layout.addWidget(clear_btn)
-        
-        save_log_btn = QPushButton("保存日志")
-        save_log_btn.clicked.connect(self.save_log)
-        log_btn_layout.addWidget(save_log_btn)
-        
-        log_btn_layout.addStretch()
-        
-        auto_scroll_check = QCheckBox("自动滚动")
-        auto_scroll_check.setChecked(True)
-        self.auto_scroll = True
-        auto_scroll_check.stateChanged.connect(lambda state: setattr(self, 'auto_scroll', bool(state)))
-        log_btn_layout.addWidget(auto_scroll_check)
-        
-        layout.addLayout(log_btn_layout)
-        
-        return group
+        """创建日志显示组（批量刷新、行数有上限、可按窗口/级别筛选）"""
+        max_rows = self.cfg_mgr.get_config("logging.ui_max_lines", 5000)
+        self.log_panel = LogPanel(max_rows)
+        return self.log_panel
         
     def load_data(self):
         """加载现有数据"""
@@ -915,45 +840,52 @@ class MainWindow(QMainWindow):
         # 加载统计
         self.load_stats()
         
-    def load_stats(self):
-        """加载任务统计"""
+    def load_stats(self, snapshot=None):
+        """加载任务统计（数据来自 ProgressService，不读文件）"""
         try:
-            state_path = os.path.join(self.cfg_mgr.DATA_DIR, "switcher_state.json")
-            if os.path.exists(state_path):
-                with open(state_path, 'r', encoding='utf-8') as f:
-                    state = json.load(f)
-                    # 使用 daily_progress 字段（与 module_switcher.py 保持一致）
-                    progress = state.get("daily_progress", {})
-                    item_done = progress.get('mode_item', 0)
-                    speed_done = progress.get('mode_speed', 0)
-                    
-                    # 从配置管理标签页获取当前目标值
-                    item_target = self.item_target_spin.value()
-                    speed_target = self.speed_target_spin.value()
-                    
-                    # 更新UI
-                    self.mode_item_count.setText(f"{item_done} / {item_target}")
-                    self.mode_speed_count.setText(f"{speed_done} / {speed_target}")
-                    
-                    # 调试日志（每10次刷新输出一次，避免日志过多）
-                    if not hasattr(self, '_stats_refresh_count'):
-                        self._stats_refresh_count = 0
-                    self._stats_refresh_count += 1
-                    if self._stats_refresh_count % 10 == 0:
-                        self.append_log(f"[调试] 统计刷新 - 道具赛: {item_done}/{item_target}, 疾爽赛: {speed_done}/{speed_target}")
-            else:
-                # 如果没有状态文件，显示 0 / 目标值
-                self.mode_item_count.setText(f"0 / {self.item_target_spin.value()}")
-                self.mode_speed_count.setText(f"0 / {self.speed_target_spin.value()}")
+            if snapshot is None:
+                snapshot = self.cfg_mgr.progress.snapshot()
+            done = {m["id"]: m["done"] for m in snapshot["modes"]}
+
+            # 从配置管理标签页获取当前目标值
+            item_target = self.item_target_spin.value()
+            speed_target = self.speed_target_spin.value()
+
+            # 更新UI
+            self.mode_item_count.setText(f"{done.get('mode_item', 0)} / {item_target}")
+            self.mode_speed_count.setText(f"{done.get('mode_speed', 0)} / {speed_target}")
+            self.load_run_stats()
         except Exception as e:
             self.append_log(f"[警告] 加载统计失败: {e}")
 
-    def init_stats_timer(self):
-        """初始化统计刷新定时器"""
-        self.stats_timer = QTimer(self)
-        self.stats_timer.timeout.connect(self.load_stats)
-        self.stats_timer.start(2000)  # 每2秒刷新一次统计
-        self.append_log("[系统] 统计定时器已启动 (每2秒刷新)")
+    def load_run_stats(self):
+        """刷新运行分析摘要：每小时局数、最耗时的阶段、预计完成时间"""
+        report = build_report(self.cfg_mgr.state_store, self.cfg_mgr.progress)
+        gph = report["games_per_hour"]
+        parts = [f"每小时: {f'{gph:.1f}' if gph else '--'} 局"]
+        for p in report["phases"]:
+            if p["count"]:
+                parts.append(f"{p['label']} {fmt_sec(p['avg_sec'])}")
+        parts.append(f"预计完成: {fmt_sec(report['eta_sec'])}")
+        self.run_stats_label.setText(" | ".join(parts))
+
+    def show_run_report(self):
+        """弹窗显示完整的运行分析报告"""
+        try:
+            report = build_report(self.cfg_mgr.state_store, self.cfg_mgr.progress)
+            QMessageBox.information(self, "运行报告", format_report(report))
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"生成报告失败: {e}")
+
+    def init_log_subscription(self):
+        """日志管线 -> 日志面板：print 和各模块日志统一经写线程入队，面板定时成批刷新"""
+        configure_logging(self.cfg_mgr)
+        self.log_panel.attach(self.log.pipeline)
+
+    def init_progress_subscription(self):
+        """订阅进度变化：对局计数改变时才刷新统计"""
+        self.progress_changed.connect(self.load_stats)
+        self._unsubscribe_progress = self.cfg_mgr.progress.subscribe(self.progress_changed.emit)
 
     def launch_game_only(self):
         """仅启动游戏窗口"""
@@ -1052,9 +984,8 @@ class MainWindow(QMainWindow):
 
     def start_task(self):
         """开始任务（使用已启动的窗口）"""
-        # 检查 window_results.json 是否存在
-        results_path = self.cfg_mgr.get_path("window_results")
-        if not results_path or not os.path.exists(results_path):
+        # 检查是否有已启动的窗口记录
+        if not self.cfg_mgr.load_window_results():
             QMessageBox.warning(self, "警告", "未找到已启动的游戏窗口！\n\n请先点击「启动游戏」按钮启动游戏窗口。")
             return
 
@@ -1118,8 +1049,6 @@ class MainWindow(QMainWindow):
         self.progress_bar.setValue(progress)
         if message:
             self.status_bar.showMessage(message)
-        # 同时刷新统计
-        self.load_stats()
         
     def reset_progress(self):
         """重置进度"""
@@ -1131,16 +1060,9 @@ class MainWindow(QMainWindow):
         
         if reply == QMessageBox.StandardButton.Yes:
             try:
-                state_path = os.path.join(self.cfg_mgr.DATA_DIR, "switcher_state.json")
-                if os.path.exists(state_path):
-                    os.remove(state_path)
-                
-                session_path = self.cfg_mgr.get_path("room_session")
-                if session_path and os.path.exists(session_path):
-                    os.remove(session_path)
-                    
-                self.mode_item_count.setText(f"0 / {self.item_target_spin.value()}")
-                self.mode_speed_count.setText(f"0 / {self.speed_target_spin.value()}")
+                # 重置后 ProgressService 会推送新的快照刷新统计
+                self.cfg_mgr.progress.reset()
+                self.cfg_mgr.reset_session()
                 
                 self.append_log("[系统] 任务进度已重置")
                 QMessageBox.information(self, "成功", "进度已重置！")
@@ -1150,15 +1072,12 @@ class MainWindow(QMainWindow):
     def manual_claim_reward(self):
         """手动领取任务奖励"""
         # 检查是否有已启动的窗口
-        results_path = self.cfg_mgr.get_path("window_results")
-        if not results_path or not os.path.exists(results_path):
+        window_data = self.cfg_mgr.load_window_results()
+        if not window_data:
             QMessageBox.warning(self, "警告", "未找到已启动的游戏窗口！\n\n请先启动游戏窗口。")
             return
         
         try:
-            with open(results_path, 'r', encoding='utf-8') as f:
-                window_data = json.load(f)
-            
             if not window_data:
                 QMessageBox.warning(self, "警告", "窗口数据为空！")
                 return
@@ -1221,15 +1140,12 @@ class MainWindow(QMainWindow):
     def manual_check_in(self):
         """手动签到功能"""
         # 检查是否有已启动的窗口
-        results_path = self.cfg_mgr.get_path("window_results")
-        if not results_path or not os.path.exists(results_path):
+        window_data = self.cfg_mgr.load_window_results()
+        if not window_data:
             QMessageBox.warning(self, "警告", "未找到已启动的游戏窗口！\n\n请先启动游戏窗口。")
             return
         
         try:
-            with open(results_path, 'r', encoding='utf-8') as f:
-                window_data = json.load(f)
-            
             if not window_data:
                 QMessageBox.warning(self, "警告", "窗口数据为空！")
                 return
@@ -1380,31 +1296,15 @@ class MainWindow(QMainWindow):
             line_edit.setText(file_path)
             
     def append_log(self, text):
-        """添加日志"""
-        self.log_text.appendPlainText(text.strip())
-        if self.auto_scroll:
-            scrollbar = self.log_text.verticalScrollBar()
-            if scrollbar:
-                scrollbar.setValue(scrollbar.maximum())
-            
+        """添加日志（写入日志管线，由日志面板成批显示）"""
+        text = text.strip()
+        if text:
+            self.log.info(0, text)
+
     def clear_log(self):
         """清空日志"""
-        self.log_text.clear()
-        
-    def save_log(self):
-        """保存日志"""
-        file_path, _ = QFileDialog.getSaveFileName(
-            self, "保存日志", f"log_{time.strftime('%Y%m%d_%H%M%S')}.txt",
-            "文本文件 (*.txt)"
-        )
-        if file_path:
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(self.log_text.toPlainText())
-                QMessageBox.information(self, "成功", "日志已保存！")
-            except Exception as e:
-                QMessageBox.critical(self, "错误", f"保存失败: {e}")
-                
+        self.log_panel.model.clear()
+
     def open_data_directory(self):
         """打开数据目录"""
         import subprocess
@@ -1438,9 +1338,15 @@ class MainWindow(QMainWindow):
                 a0.accept()
             else:
                 a0.ignore()
+                return
         else:
             a0.accept()
 
+        # 退出前把尚未落盘的 Session 写入状态库
+        self.cfg_mgr.session_store.flush()
+        self.log_panel.detach()
+        self.log.pipeline.flush()
+
 
 def main():
     """主入口"""
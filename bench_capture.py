@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+截图基准测试 - 对比帧缓冲池开启/关闭时的截图耗时和峰值内存
+每种模式在独立子进程中运行，峰值内存互不影响
+
+用法:
+    python bench_capture.py                       # 所有游戏窗口，每窗口 100 帧
+    python bench_capture.py --frames 300 --base   # 缩放到基准分辨率
+    python bench_capture.py --hwnd 123456
+"""
+
+import os
+import sys
+import json
+import time
+import ctypes
+import argparse
+import subprocess
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+
+class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+    _fields_ = [
+        ("cb", ctypes.c_uint32), ("PageFaultCount", ctypes.c_uint32),
+        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+    ]
+
+
+def memory_mb():
+    """(当前 RSS, 峰值 RSS)，单位 MB"""
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                             ctypes.byref(counters), counters.cb)
+    return counters.WorkingSetSize / 1048576.0, counters.PeakWorkingSetSize / 1048576.0
+
+
+def find_windows(title):
+    import win32gui
+    hwnds = []
+
+    def callback(hwnd, _):
+        if win32gui.IsWindowVisible(hwnd) and title in win32gui.GetWindowText(hwnd):
+            hwnds.append(hwnd)
+        return True
+
+    win32gui.EnumWindows(callback, None)
+    return hwnds
+
+
+def run_once(hwnds, frames, pool, rescale):
+    """在当前进程中截图 frames 轮（每轮所有窗口各一帧），返回统计结果"""
+    from app.core.game_engine import GameEngine
+
+    GameEngine._use_pool = pool
+    GameEngine.grab_screen(hwnds[0], rescale_to_base=rescale)  # 预热
+    rss_start, _ = memory_mb()
+    times, failed = [], 0
+    for _ in range(frames):
+        for hwnd in hwnds:
+            t0 = time.perf_counter()
+            if GameEngine.grab_screen(hwnd, rescale_to_base=rescale) is None:
+                failed += 1
+            times.append((time.perf_counter() - t0) * 1000.0)
+    rss_end, peak = memory_mb()
+    times.sort()
+    return {
+        "pool": pool,
+        "captures": len(times),
+        "failed": failed,
+        "avg_ms": sum(times) / len(times),
+        "p50_ms": times[len(times) // 2],
+        "p95_ms": times[int(len(times) * 0.95)],
+        "rss_start_mb": rss_start,
+        "rss_end_mb": rss_end,
+        "peak_rss_mb": peak,
+        "allocations": GameEngine._frame_pool.allocations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图耗时 / 内存基准测试")
+    parser.add_argument("--hwnd", type=int, action="append", help="窗口句柄（可多次指定），默认按标题查找")
+    parser.add_argument("--title", default="疯狂赛车怀旧版", help="按标题查找窗口")
+    parser.add_argument("--frames", type=int, default=100, help="每个窗口截图次数")
+    parser.add_argument("--base", action="store_true", help="缩放到基准分辨率（与运行时一致）")
+    parser.add_argument("--child", choices=["on", "off"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    hwnds = args.hwnd or find_windows(args.title)
+    if not hwnds:
+        print(f"❌ 没有找到窗口: {args.title}")
+        return
+
+    if args.child:
+        result = run_once(hwnds, args.frames, args.child == "on", args.base)
+        print(json.dumps(result))
+        return
+
+    print(f"窗口 {len(hwnds)} 个 | 每窗口 {args.frames} 帧 | 缩放到基准: {args.base}")
+    results = []
+    for mode in ("off", "on"):
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", mode, "--frames", str(args.frames)]
+        cmd += sum((["--hwnd", str(h)] for h in hwnds), [])
+        if args.base:
+            cmd.append("--base")
+        out = subprocess.run(cmd, capture_output=True, text=True, cwd=BASE_DIR)
+        lines = [ln for ln in out.stdout.splitlines() if ln.startswith("{")]
+        if not lines:
+            print(f"❌ 子进程失败 ({mode}):\n{out.stderr}")
+            return
+        results.append(json.loads(lines[-1]))
+
+    print(f"{'缓冲池':<6}{'截图数':>8}{'失败':>6}{'平均ms':>9}{'p50ms':>9}{'p95ms':>9}{'峰值RSS':>10}{'RSS增长':>10}{'分配次数':>9}")
+    for r in results:
+        print(f"{'开' if r['pool'] else '关':<6}{r['captures']:>8}{r['failed']:>6}{r['avg_ms']:>9.2f}"
+              f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['peak_rss_mb']:>9.1f}M"
+              f"{r['rss_end_mb'] - r['rss_start_mb']:>9.1f}M{r['allocations']:>9}")
+
+
+if __name__ == "__main__":
+    main()
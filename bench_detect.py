@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+并行检测基准测试 - 测量 GameEngine.detect_all 在不同线程数下的单 tick 耗时和加速比
+每个 tick 对所有窗口按给定状态跑一遍检测计划（与控制器 _get_global_context 的检测步骤一致）
+
+用法:
+    python bench_detect.py                          # 所有游戏窗口，状态 UNKNOWN（探针最多），线程数 1/2/4/8
+    python bench_detect.py --ticks 50 --workers 1 2 4 8 16
+    python bench_detect.py --state LOBBY --hwnd 123456 --hwnd 234567
+"""
+
+import os
+import sys
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from bench_capture import find_windows
+
+
+def run_ticks(engine, plan, pairs, ticks, workers):
+    """workers=1 时串行检测（即未开启并行时的行为），返回每个 tick 的耗时列表（ms）"""
+    engine.shutdown_executor()
+    engine._max_workers = workers
+    times = []
+    for _ in range(ticks):
+        t0 = time.perf_counter()
+        if workers == 1:
+            for hwnd, state in pairs:
+                plan.detect(hwnd, state)
+        else:
+            engine.detect_all(pairs, plan)
+        times.append((time.perf_counter() - t0) * 1000.0)
+    engine.shutdown_executor()
+    times.sort()
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行检测加速比测试")
+    parser.add_argument("--hwnd", type=int, action="append", help="窗口句柄（可多次指定），默认按标题查找")
+    parser.add_argument("--title", default="疯狂赛车怀旧版", help="按标题查找窗口")
+    parser.add_argument("--state", default="UNKNOWN", help="检测时假定的窗口状态")
+    parser.add_argument("--ticks", type=int, default=30, help="每种线程数测量的 tick 数")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="要测量的线程数")
+    args = parser.parse_args()
+
+    hwnds = args.hwnd or find_windows(args.title)
+    if not hwnds:
+        print(f"❌ 没有找到窗口: {args.title}")
+        return
+
+    from app.core.config_manager import ConfigManager
+    from app.core.game_engine import GameEngine
+    from app.controllers.detection_plan import DetectionPlan
+
+    cfg_mgr = ConfigManager()
+    engine = GameEngine(cfg_mgr)
+    plan = DetectionPlan(cfg_mgr, engine)
+    pairs = [(hwnd, args.state) for hwnd in hwnds]
+    run_ticks(engine, plan, pairs, 2, 1)  # 预热：加载模板、分配缓冲
+
+    print(f"窗口 {len(hwnds)} 个 | 状态 {args.state} | 每组 {args.ticks} tick | CPU {os.cpu_count()} 核")
+    print(f"{'线程数':<6}{'平均ms':>9}{'p50ms':>9}{'p95ms':>9}{'每窗口ms':>10}{'加速比':>8}")
+    baseline = None
+    for workers in args.workers:
+        times = run_ticks(engine, plan, pairs, args.ticks, workers)
+        avg = sum(times) / len(times)
+        baseline = baseline or avg
+        print(f"{workers:<6}{avg:>9.1f}{times[len(times) // 2]:>9.1f}{times[int(len(times) * 0.95)]:>9.1f}"
+              f"{avg / len(hwnds):>10.1f}{baseline / avg:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+模板 bundle 构建 - 把模板目录下所有 PNG 预解码打包进 app/data/templates.bundle（+ .json 索引）
+
+控制器启动时发现源文件变化会自动重建，这个脚本用于打包发布前或替换模板后提前构建，
+避免第一次启动时付出解码时间；未变化的条目直接从旧 bundle 复制
+
+用法:
+    python build_template_bundle.py
+    python build_template_bundle.py --force     # 全部重新解码
+    python build_template_bundle.py --list      # 列出 bundle 中的条目
+"""
+
+import os
+import sys
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from app.core.template_bundle import TemplateBundle
+from app.core.template_registry import bundle_sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预解码模板并打包成可内存映射的 bundle")
+    parser.add_argument("--force", action="store_true", help="忽略已有 bundle，全部重新解码")
+    parser.add_argument("--list", action="store_true", help="构建后列出每个条目")
+    args = parser.parse_args()
+
+    from app.core.config_manager import ConfigManager
+    cfg_mgr = ConfigManager()
+    path = os.path.join(cfg_mgr.DATA_DIR, cfg_mgr.get_config("template_bundle.file", "templates.bundle"))
+    bundle = TemplateBundle(path, cfg_mgr.paths["templates"])
+
+    sources = bundle_sources(cfg_mgr)
+    t0 = time.perf_counter()
+    rebuilt = bundle.sync(sources, force=args.force)
+    ms = (time.perf_counter() - t0) * 1000.0
+    stats = bundle.stats()
+    state = "已重建" if rebuilt else "已是最新"
+    print(f"{state}: {path} | {stats['entries']}/{len(sources)} 个文件 | "
+          f"{stats['bytes'] / 1048576.0:.1f} MB | {ms:.0f} ms")
+
+    if args.list:
+        for key, entry in sorted(bundle.entries().items()):
+            h, w, _ = entry["shape"]
+            print(f"  {key:<32}{w:>6} x {h:<6}@{entry['offset']}")
+    bundle.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+像素指纹推导 - 从录制画面为每种游戏画面推导最少的 (x, y, 颜色, 容差) 探针，写入 config.json 的 fingerprints 段
+
+画面标注两种方式:
+    --labeled   录制目录下每个子目录是一种画面（目录名即画面名，如 lobby / room / ready / claim / login_1）
+    默认        用检测计划的模板自动标注（room / lobby / login_ui，与 DetectionPlan 探针同名，可直接作为第一道检测），
+                哪个模板都不命中的帧只作为反例
+
+推导方法（网格采样 + 贪心集合覆盖）:
+    1. 按 --step 间隔采样像素；本画面所有帧中颜色稳定（最大色差 <= MAX_DEV）的点作为候选，
+       容差 = 最大色差 + TOL_MARGIN，保证本画面的录制帧全部通过
+    2. 每轮选一个能排除最多剩余反例帧（其他画面）的候选，直到反例全部被排除或达到 --max-probes
+    3. 仍有反例无法排除的画面不写入（指纹会误判）
+
+用法:
+    python screenshot_tool.py --record 900
+    python derive_fingerprints.py --dry-run
+    python derive_fingerprints.py --frames app/data/recordings/labeled --labeled
+"""
+
+import os
+import sys
+import glob
+import json
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import cv2
+import numpy as np
+
+from app.core.fingerprint import bgr_to_hex
+
+MAX_DEV = 40       # 候选点在本画面各帧间允许的最大色差
+TOL_MARGIN = 10    # 容差在实测最大色差上额外留的余量
+MIN_TOL = 16
+AUTO_PROBES = ("room", "lobby", "login_ui")
+
+
+def label_frames(paths, labeled, cfg_mgr, step):
+    """返回 [(画面名或 None, 网格采样像素)]；整帧只在标注时使用，不常驻内存"""
+    engine = plan = None
+    if not labeled:
+        from app.core.game_engine import GameEngine
+        from app.controllers.detection_plan import DetectionPlan
+        engine = GameEngine(cfg_mgr)
+        plan = DetectionPlan(cfg_mgr, engine)
+
+    result = []
+    shape = None
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        if shape is None:
+            shape = img.shape
+        elif img.shape != shape:
+            print(f"  跳过尺寸不一致的画面: {path}")
+            continue
+        if labeled:
+            label = os.path.basename(os.path.dirname(path))
+        else:
+            label = None
+            for name in AUTO_PROBES:
+                probe = plan.probes.get(name)
+                if probe and any(engine.match_in_frame(img, p, thr, roi)[0] for p, thr, roi in probe.templates):
+                    label = name
+                    break
+        result.append((label, img[::step, ::step].astype(np.int16)))
+    return result
+
+
+def derive(samples, labels, screen, max_probes, step):
+    """
+    Args:
+        samples: (帧数, 网格行, 网格列, 3) int16 采样像素
+        labels: 每帧的画面名
+    Returns:
+        (探针列表或 None, 说明)
+    """
+    pos = samples[[lb == screen for lb in labels]]
+    neg = samples[[lb != screen for lb in labels]]
+    median = np.median(pos, axis=0).astype(np.int16)
+    dev = np.abs(pos - median).max(axis=(0, 3))
+    stable = dev <= MAX_DEV
+    if not stable.any():
+        return None, "没有颜色稳定的像素"
+    tol = np.maximum(dev + TOL_MARGIN, MIN_TOL).astype(np.int16)
+    if len(neg) == 0:
+        return None, "没有其他画面的帧作为反例"
+
+    # rejects[i, r, c]: 候选点 (r, c) 能排除第 i 个反例帧
+    rejects = (np.abs(neg - median).max(axis=3) > tol) & stable
+    rejects = rejects.reshape(len(neg), -1)
+    remaining = np.ones(len(neg), dtype=bool)
+    chosen = []
+    while remaining.any() and len(chosen) < max_probes:
+        gain = rejects[remaining].sum(axis=0)
+        best = int(gain.argmax())
+        if gain[best] == 0:
+            break
+        chosen.append(best)
+        remaining &= ~rejects[:, best]
+    if remaining.any():
+        return None, f"{int(remaining.sum())} 帧其他画面无法区分"
+
+    cols = samples.shape[2]
+    probes = []
+    for idx in chosen:
+        r, c = divmod(idx, cols)
+        probes.append([c * step, r * step, bgr_to_hex(median[r, c]), int(tol[r, c])])
+    return probes, f"{len(pos)} 帧 / 反例 {len(neg)} 帧"
+
+
+def _dumps(obj, level):
+    """与 config.json 一致的缩进；纯数值/字符串的短列表（坐标、探针）写在一行"""
+    pad, end = "    " * (level + 1), "    " * level
+    if isinstance(obj, dict):
+        items = [f"{pad}{json.dumps(k, ensure_ascii=False)}: {_dumps(v, level + 1)}" for k, v in obj.items()]
+        return "{\n" + ",\n".join(items) + "\n" + end + "}" if items else "{}"
+    if isinstance(obj, list) and any(isinstance(v, (dict, list)) for v in obj):
+        return "[\n" + ",\n".join(pad + _dumps(v, level + 1) for v in obj) + "\n" + end + "]"
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def replace_block(text, key, value):
+    """只替换 config.json 中顶层 key 的内容（保留文件其余部分的排版）"""
+    body = _dumps(value, 1)
+    marker = f'\n    "{key}": '
+    start = text.find(marker)
+    if start < 0:
+        end = text.rstrip().rfind("}")
+        return text[:end].rstrip() + f",{marker}{body}\n}}\n"
+    i = start + len(marker)
+    depth, in_str, esc = 0, False, False
+    for j in range(i, len(text)):
+        ch = text[j]
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[:i] + body + text[j + 1:]
+    raise ValueError(f"config.json 中 {key} 段不完整")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从录制画面推导像素指纹")
+    parser.add_argument("--frames", default=os.path.join(BASE_DIR, "app", "data", "recordings"),
+                        help="录制画面目录（递归查找 png）")
+    parser.add_argument("--labeled", action="store_true", help="按子目录名标注画面（默认用模板自动标注）")
+    parser.add_argument("--step", type=int, default=8, help="像素采样间隔")
+    parser.add_argument("--max-probes", type=int, default=8, help="每种画面最多的探针数")
+    parser.add_argument("--min-frames", type=int, default=3, help="每种画面最少的录制帧数")
+    parser.add_argument("--dry-run", action="store_true", help="只打印结果，不写入 config.json")
+    args = parser.parse_args()
+
+    from app.core.config_manager import ConfigManager
+    cfg_mgr = ConfigManager()
+
+    paths = sorted(glob.glob(os.path.join(args.frames, "**", "*.png"), recursive=True))
+    frames = label_frames(paths, args.labeled, cfg_mgr, args.step)
+    if not frames:
+        print(f"❌ 没有录制画面: {args.frames}（先运行 python screenshot_tool.py --record 秒数）")
+        return
+
+    labels = [lb for lb, _ in frames]
+    samples = np.stack([grid for _, grid in frames])
+    counts = {lb: labels.count(lb) for lb in set(labels) if lb}
+    print(f"录制画面 {len(frames)} 帧 | 采样间隔 {args.step}px | "
+          + ", ".join(f"{k}:{v}" for k, v in sorted(counts.items())) + f" | 未标注:{labels.count(None)}")
+
+    screens = {}
+    for screen, n in sorted(counts.items()):
+        if n < args.min_frames:
+            print(f"  - {screen:<12} 跳过：只有 {n} 帧")
+            continue
+        probes, note = derive(samples, labels, screen, args.max_probes, args.step)
+        if probes is None:
+            print(f"  ✗ {screen:<12} {note}")
+            continue
+        screens[screen] = {"probes": probes, "min_match": len(probes)}
+        print(f"  ✓ {screen:<12} {len(probes)} 个探针 ({note})")
+
+    if args.dry_run or not screens:
+        print(json.dumps(screens, ensure_ascii=False, indent=2))
+        return
+
+    fp_cfg = dict(cfg_mgr.get_config("fingerprints", {}) or {})
+    fp_cfg.setdefault("description", "")
+    fp_cfg.setdefault("enabled", False)
+    fp_cfg["screens"] = screens
+    path = cfg_mgr.paths["config"]
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    text = replace_block(text, "fingerprints", fp_cfg)
+    json.loads(text)  # 写入前确认仍是合法 JSON
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    print(f"\n✅ 已写入 {len(screens)} 种画面的指纹 -> {path}（fingerprints.enabled 开启后生效）")
+
+
+if __name__ == "__main__":
+    main()
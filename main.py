@@ -10,6 +10,7 @@ from app.controllers.task_controller import TaskController
 from app.modules.room_in_module import RoomModule
 from app.modules.module_switcher import ModeSwitcher
 from app.modules.emergency_module import EmergencyModule
+from app.logger import configure_logging
 
 # 1. 设置路径
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -19,18 +20,16 @@ if BASE_DIR not in sys.path:
 
 def get_accurate_window_list(cfg_manager):
     """
-    优先从 window_results.json 获取带账号信息的窗口列表
+    优先从状态库的窗口记录获取带账号信息的窗口列表
     """
-    results_path = cfg_manager.get_path("window_results")
+    data = cfg_manager.load_window_results()
 
-    if os.path.exists(results_path):
-        print(f"发现窗口记录文件: {results_path}")
-        with open(results_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # 这里的 i 包含: index, hwnd, username, password
-            return [(i["index"], i["hwnd"], i) for i in data]
+    if data:
+        print(f"发现窗口记录: {len(data)} 个")
+        # 这里的 i 包含: index, hwnd, username, password
+        return [(i["index"], i["hwnd"], i) for i in data]
 
-    # 如果没找到 json，说明可能是手动开启的，尝试通过标题查找
+    # 如果没有窗口记录，说明可能是手动开启的，尝试通过标题查找
     print("未发现窗口记录文件，将通过标题查找（此时不支持自动登录输入）")
     title = cfg_manager.get_config("target_window_title", "疯狂赛车怀旧版")
     hwnds = []
@@ -49,6 +48,8 @@ def get_accurate_window_list(cfg_manager):
 def main():
     # 1. 初始化配置和引擎
     cfg_mgr = ConfigManager() # 假设你的配置类名
+    # 日志统一走异步管线（控制台 + 滚动文件），剩余的 print 也会被接入
+    log = configure_logging(cfg_mgr)
     engine = GameEngine(cfg_mgr)
     
     try:
@@ -72,6 +73,7 @@ def main():
         print("正在执行退出清理...")
         cfg_mgr.reset_session()
         print("房间 Session 已清理，脚本已安全退出。")
+        log.flush()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
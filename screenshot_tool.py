@@ -55,7 +55,7 @@ def capture_window(hwnd, output_path, resize_to_base=True, region=None):
         return False
 
     # 截图
-    screenshot = GameEngine.grab_screen(hwnd, rescale_to_base=resize_to_base)
+    screenshot = GameEngine.grab_screen(hwnd, rescale_to_base=resize_to_base, bgra=False)
 
     if screenshot is None:
         print("❌ 截图失败")
@@ -207,6 +207,44 @@ def capture_all_windows(keyword="疯狂赛车", output_dir=None):
     print(f"\n✅ 所有窗口截图完成: {output_dir}")
 
 
+def record_frames(keyword="疯狂赛车", duration=600, interval=1.0, output_dir=None):
+    """
+    录制模式：按间隔截取所有匹配窗口的基准分辨率画面，供 validate_prefilter.py 验证模板预筛
+    与上一张几乎相同的画面不重复保存
+    """
+    import time
+
+    windows = list_windows(keyword)
+    if not windows:
+        print("❌ 未找到匹配的窗口")
+        return
+    if output_dir is None:
+        output_dir = os.path.join(BASE_DIR, "app", "data", "recordings", time.strftime("%Y%m%d_%H%M%S"))
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"\n开始录制: {len(windows)} 个窗口, {duration} 秒, 间隔 {interval} 秒 -> {output_dir}")
+    print("   录制期间请正常操作，尽量覆盖登录、大厅、房间、准备、对局、领奖和各种弹窗")
+
+    last = {}
+    saved = 0
+    deadline = time.time() + duration
+    try:
+        while time.time() < deadline:
+            for i, win in enumerate(windows):
+                frame = GameEngine.grab_screen(win['hwnd'], rescale_to_base=True, bgra=False)
+                if frame is None:
+                    continue
+                prev = last.get(win['hwnd'])
+                if prev is not None and prev.shape == frame.shape and float(cv2.absdiff(prev, frame).mean()) < 1.0:
+                    continue
+                last[win['hwnd']] = frame.copy()
+                cv2.imwrite(os.path.join(output_dir, f"win{i}_{time.strftime('%H%M%S')}_{saved:05d}.png"), frame)
+                saved += 1
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n用户中断录制")
+    print(f"\n✅ 录制完成: 共保存 {saved} 帧 -> {output_dir}")
+
+
 def test_template_matching(hwnd, template_path):
     """测试模板匹配效果"""
     if not os.path.exists(template_path):
@@ -214,7 +252,7 @@ def test_template_matching(hwnd, template_path):
         return
 
     # 截图
-    screenshot = GameEngine.grab_screen(hwnd, rescale_to_base=True)
+    screenshot = GameEngine.grab_screen(hwnd, rescale_to_base=True, bgra=False)
     if screenshot is None:
         print("❌ 截图失败")
         return
@@ -257,6 +295,9 @@ def main():
                         help='批量截图数量')
     parser.add_argument('-t', '--test', metavar='TEMPLATE', help='测试模板匹配')
     parser.add_argument('--all', action='store_true', help='截取所有匹配窗口')
+    parser.add_argument('--record', metavar='SECONDS', type=int,
+                        help='录制模式：按间隔截取所有窗口画面（用于验证模板预筛）')
+    parser.add_argument('--interval', type=float, default=1.0, help='录制/批量截图间隔（秒）')
     parser.add_argument('-i', '--interactive', action='store_true', help='交互模式')
 
     args = parser.parse_args()
@@ -276,6 +317,9 @@ def main():
     elif args.all:
         capture_all_windows(args.keyword)
 
+    elif args.record:
+        record_frames(args.keyword, duration=args.record, interval=args.interval, output_dir=args.output)
+
     elif args.capture:
         try:
             # 尝试解析为索引或句柄
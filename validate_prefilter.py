@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+模板预筛验证 - 在录制画面上为每个模板生成并验证预筛规则，写入 app/data/prefilter.json
+
+对每个模板 x 每帧录制画面做一次完整 NCC：
+- 得分 >= 验证阈值的帧是"正样本"，预筛必须全部放行（不允许假阴性）
+- 其余是负样本，用来统计预筛能省掉多少次完整匹配
+
+像素探针：所有正样本都出现在同一位置（±2 像素）时才启用，max_fail 取正样本中最多的不符探针数
+颜色直方图：在正样本的匹配框上计算包含率（任何包含匹配框的 ROI 的包含率都不会更低），
+            hist_min 取最小值再留余量
+正样本不足 --min-positives 的模板不生成规则（没见过它出现就无法证明不会误杀）
+规则带上正样本匹配框的外接矩形 box，运行时搜索区域不包含 box 时不做预筛
+
+用法:
+    python screenshot_tool.py --record 900              # 先录制画面
+    python validate_prefilter.py                          # 使用 app/data/recordings 下所有录制
+    python validate_prefilter.py --frames D:/rec --threshold 0.65
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import cv2
+
+from app.core.prefilter import (TemplateSignature, color_hist, containment, probe_failures,
+                                HIST_MAX_PIXELS)
+
+PROBE_TOL = 40        # 探针颜色容差（每通道）
+HIST_MARGIN = 0.05    # 直方图阈值在正样本最小包含率上再留的余量
+HIST_USEFUL = 0.3     # 低于该值的直方图阈值几乎拒绝不了什么，不启用
+LOC_SLACK = 2         # 正样本位置允许的抖动（像素）
+
+
+def load_frames(paths):
+    frames = []
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is not None:
+            frames.append((os.path.basename(path), img))
+    return frames
+
+
+def validate_template(template, frames, threshold, min_positives):
+    """返回 (规则或 None, 统计信息)"""
+    th, tw = template.shape[:2]
+    sig = TemplateSignature(template)
+    positives, negatives = [], []
+    for name, frame in frames:
+        if frame.shape[0] < th or frame.shape[1] < tw:
+            continue
+        res = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(res)
+        (positives if max_val >= threshold else negatives).append((name, frame, max_loc, max_val))
+
+    stats = {"positives": len(positives), "negatives": len(negatives), "probe": False, "hist": False,
+             "rejected": 0}
+    if len(positives) < min_positives:
+        return None, stats
+
+    # 正样本匹配框的外接矩形：运行时搜索区域包含它才做预筛（验证只覆盖这些位置）
+    x0 = min(p[2][0] for p in positives)
+    y0 = min(p[2][1] for p in positives)
+    x1 = max(p[2][0] for p in positives) + tw
+    y1 = max(p[2][1] for p in positives) + th
+    rule = {"threshold": threshold, "box": [int(x0), int(y0), int(x1 - x0), int(y1 - y0)]}
+
+    # 1. 像素探针：位置固定才启用
+    locs = Counter(p[2] for p in positives)
+    loc = locs.most_common(1)[0][0]
+    fixed = all(abs(p[2][0] - loc[0]) <= LOC_SLACK and abs(p[2][1] - loc[1]) <= LOC_SLACK for p in positives)
+    if fixed and sig.probes:
+        max_fail = max(probe_failures(p[1], loc, sig.probes, PROBE_TOL) for p in positives)
+        if max_fail < len(sig.probes) // 2:
+            rule["probe"] = {"loc": [int(loc[0]), int(loc[1])], "tol": PROBE_TOL, "max_fail": max_fail}
+            stats["probe"] = True
+
+    # 2. 颜色直方图：匹配框上的包含率是任何 ROI 的下界（模板大于 ROI 上限时运行时不会用到）
+    if th * tw <= HIST_MAX_PIXELS:
+        lowest = min(containment(color_hist(p[1][p[2][1]:p[2][1] + th, p[2][0]:p[2][0] + tw]), sig.hist)
+                     for p in positives)
+        hist_min = round(lowest - HIST_MARGIN, 3)
+        if hist_min >= HIST_USEFUL:
+            rule["hist_min"] = hist_min
+            stats["hist"] = True
+
+    if not (stats["probe"] or stats["hist"]):
+        return None, stats
+
+    # 3. 复核：正样本必须全部放行；统计负样本的拒绝率（直方图按整帧计算，是运行时 ROI 场景的保守估计）
+    for name, frame, _, score in positives:
+        if _rejects(rule, sig, frame):
+            raise AssertionError(f"正样本被预筛拒绝: {name} ({score:.3f})")
+    stats["rejected"] = sum(1 for _, frame, _, _ in negatives if _rejects(rule, sig, frame))
+    return rule, stats
+
+
+def _rejects(rule, sig, frame):
+    probe = rule.get("probe")
+    if probe and probe_failures(frame, probe["loc"], sig.probes, probe["tol"]) > probe["max_fail"]:
+        return True
+    hist_min = rule.get("hist_min")
+    return bool(hist_min and containment(color_hist(frame), sig.hist) < hist_min)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在录制画面上生成并验证模板预筛规则")
+    parser.add_argument("--frames", default=os.path.join(BASE_DIR, "app", "data", "recordings"),
+                        help="录制画面目录（递归查找 png）")
+    parser.add_argument("--templates", default=os.path.join(BASE_DIR, "app", "templates"), help="模板目录")
+    parser.add_argument("--threshold", type=float, default=0.6,
+                        help="验证阈值：低于配置中最低的匹配阈值，运行时调用阈值低于它时不做预筛")
+    parser.add_argument("--min-positives", type=int, default=3, help="生成规则所需的最少正样本数")
+    parser.add_argument("--output", default=os.path.join(BASE_DIR, "app", "data", "prefilter.json"))
+    args = parser.parse_args()
+
+    frames = load_frames(sorted(glob.glob(os.path.join(args.frames, "**", "*.png"), recursive=True)))
+    if not frames:
+        print(f"❌ 没有录制画面: {args.frames}（先运行 python screenshot_tool.py --record 秒数）")
+        return
+    print(f"录制画面 {len(frames)} 帧 | 验证阈值 {args.threshold}")
+
+    rules = {}
+    print(f"{'模板':<28}{'正样本':>7}{'负样本':>7}{'探针':>6}{'直方图':>7}{'负样本拒绝率':>12}")
+    for path in sorted(glob.glob(os.path.join(args.templates, "*.png"))):
+        template = cv2.imread(path, cv2.IMREAD_COLOR)
+        if template is None:
+            continue
+        name = os.path.basename(path)
+        rule, stats = validate_template(template, frames, args.threshold, args.min_positives)
+        if rule:
+            rules[name] = rule
+        rate = stats["rejected"] / stats["negatives"] if stats["negatives"] else 0.0
+        print(f"{name:<28}{stats['positives']:>7}{stats['negatives']:>7}{'✓' if stats['probe'] else '-':>6}"
+              f"{'✓' if stats['hist'] else '-':>7}{rate:>11.0%}")
+
+    data = {
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "frames": len(frames),
+        "templates": rules,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ {len(rules)} 个模板生成预筛规则 -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()